@@ -0,0 +1,82 @@
+"""
+Search the policy gate audit log through its sidecar index (no full-file scan).
+
+The index (logs/policy_gate_audit.index.sqlite) is brought up to date incrementally first;
+matching records are printed as JSON lines (or a one-line summary per record with --brief).
+
+Usage:
+    python scripts/audit_search.py --since 2026-01-01 --regime risk_off --limit 20
+    python scripts/audit_search.py --policy-hash <hash> --investor buffett --brief
+    python scripts/audit_search.py --rule-id <rule_id> --count
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from tools.audit_index import AuditIndex, parse_time  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Indexed policy gate audit search")
+    parser.add_argument("--audit_path", type=str, default=str(PROJECT_ROOT / "logs" / "policy_gate_audit.jsonl"), help="Active audit JSONL (rotated segments are found next to it)")
+    parser.add_argument("--since", type=str, default=None, help="Start time (epoch seconds or ISO date/datetime)")
+    parser.add_argument("--until", type=str, default=None, help="End time, exclusive (epoch seconds or ISO date/datetime)")
+    parser.add_argument("--regime", type=str, default=None)
+    parser.add_argument("--policy-hash", dest="policy_hash", type=str, default=None)
+    parser.add_argument("--input-hash", dest="input_hash", type=str, default=None)
+    parser.add_argument("--investor", type=str, default=None, help="investor_id in router or rule hits")
+    parser.add_argument("--rule-id", dest="rule_id", type=str, default=None)
+    parser.add_argument("--scenario", type=str, default=None, help="Primary scenario id")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--asc", action="store_true", help="Oldest first")
+    parser.add_argument("--count", action="store_true", help="Only print the number of matches")
+    parser.add_argument("--brief", action="store_true", help="One summary line per record")
+    args = parser.parse_args()
+
+    index = AuditIndex(args.audit_path)
+    t0 = time.perf_counter()
+    refreshed = index.refresh(force=True)
+    res = index.search(
+        start_ts=parse_time(args.since),
+        end_ts=parse_time(args.until),
+        regime=args.regime,
+        policy_hash=args.policy_hash,
+        investor=args.investor,
+        rule_id=args.rule_id,
+        input_hash=args.input_hash,
+        scenario=args.scenario,
+        limit=args.limit,
+        offset=args.offset,
+        order="asc" if args.asc else "desc",
+        refresh=False,
+    )
+    elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+    if args.count:
+        print(res["total"])
+        return 0
+    for rec in res["records"]:
+        if args.brief:
+            ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(rec.get("ts") or 0))
+            regime = (rec.get("regime") or {}).get("id")
+            primary = (rec.get("scenario") or {}).get("primary")
+            print(f"{ts}  regime={regime}  scenario={primary}  policy={rec.get('policy_hash')}  input={rec.get('input_hash')}")
+        else:
+            print(json.dumps(rec, ensure_ascii=False))
+    print(
+        f"# {len(res['records'])}/{res['total']} matches, indexed {refreshed['records']} new records, {elapsed_ms} ms",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+"""
+Microbenchmark: investor router throughput (routes/sec).
+
+Compares the original per-request router (tools.router_index.route_reference) with the
+precompiled RouterIndex used by /api/route and /api/policy/gate, and checks that both
+return identical rankings and reasons.
+
+Usage:
+    python scripts/bench_router.py [--seconds 2.0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from services.rag_service import _load_index, _match_scenarios  # noqa: E402
+from tools.router_index import RouterIndex, route_reference  # noqa: E402
+
+
+QUERIES: List[str] = [
+    "现在该买入 NVDA 吗？估值是不是太贵了？",
+    "市场恐慌暴跌，流动性危机，要不要止损减仓？",
+    "Fed 加息周期快结束了，利率转向时债券怎么配？",
+    "护城河怎么评估？这家公司有没有定价权？",
+    "Is the market overvalued? Howard Marks on cycles and risk.",
+    "黄金、比特币能抗通胀吗？现金流和被动收入怎么建立？",
+    "量化因子模型回测结果不稳定，怎么看？",
+    "创业产品化，特定知识和杠杆怎么积累财富？",
+]
+
+
+def _bench(fn: Callable[[str], object], seconds: float) -> float:
+    n = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for q in QUERIES:
+            fn(q)
+        n += len(QUERIES)
+    return n / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Router microbenchmark (routes/sec)")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time budget per variant")
+    parser.add_argument("--top_k", type=int, default=5)
+    args = parser.parse_args()
+
+    idx = _load_index()
+    t0 = time.perf_counter()
+    compiled = RouterIndex(idx)
+    build_ms = (time.perf_counter() - t0) * 1000.0
+
+    scen = {q: _match_scenarios(q) for q in QUERIES}
+    for q in QUERIES:
+        if compiled.route(q, args.top_k, scen[q]) != route_reference(idx, q, args.top_k, scen[q]):
+            print(f"MISMATCH: {q}")
+            return 1
+
+    before = _bench(lambda q: route_reference(idx, q, args.top_k, scen[q]), args.seconds)
+    after = _bench(lambda q: compiled.route(q, args.top_k, scen[q]), args.seconds)
+
+    print(f"investors={len(compiled.investors)} patterns={compiled.pattern_count} build={build_ms:.1f}ms")
+    print(f"before (per-request scan): {before:,.0f} routes/sec")
+    print(f"after  (RouterIndex):      {after:,.0f} routes/sec")
+    print(f"speedup: {after / before:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
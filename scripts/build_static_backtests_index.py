@@ -10,7 +10,7 @@ This enables a **pure static** backtest history viewer (no /api/backtest/* requi
 from __future__ import annotations
 
 import json
-import os
+import sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -19,84 +19,25 @@ PROJECT_ROOT = Path(__file__).parent.parent
 STATIC_ROOT = PROJECT_ROOT / "web" / "public" / "backtests"
 INDEX_PATH = STATIC_ROOT / "index.json"
 
+sys.path.append(str(PROJECT_ROOT))
+from tools.run_catalog import RUN_MARKER_FILES, RunCatalog  # noqa: E402
 
-def _read_json(path: Path) -> Optional[Dict[str, Any]]:
-    try:
-        if not path.exists():
-            return None
-        data = json.loads(path.read_text(encoding="utf-8") or "{}")
-        return data if isinstance(data, dict) else None
-    except Exception:
-        return None
-
-
-def _iso_from_mtime(ts: float) -> str:
-    # localtime ISO without timezone suffix (matches existing API style)
-    import time
-
-    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts or 0.0))
 
-
-def _list_runs(static_root: Path) -> List[Dict[str, Any]]:
-    runs: List[Dict[str, Any]] = []
+def _list_runs(static_root: Path, db_path: Optional[str] = None) -> List[Dict[str, Any]]:
     if not static_root.exists():
-        return runs
-
-    for child in sorted(static_root.iterdir()):
-        if not child.is_dir():
-            continue
-        run_id = child.name
-        if run_id.startswith("."):
-            continue
-
-        metrics_a = _read_json(child / "metrics_A.json")
-        metrics_b = _read_json(child / "metrics_B.json")
-
-        modes: List[str] = []
-        metrics: Dict[str, Any] = {}
-        if metrics_a is not None:
-            modes.append("A")
-            metrics["A"] = metrics_a
-        if metrics_b is not None:
-            modes.append("B")
-            metrics["B"] = metrics_b
-
-        # only list folders that look like a run
-        has_any = any(
-            (child / fn).exists()
-            for fn in (
-                "metrics_A.json",
-                "metrics_B.json",
-                "equity_curve_A.csv",
-                "equity_curve_B.csv",
-                "history_A.csv",
-                "history_B.csv",
-                "comparison.md",
-                "run_config.json",
-            )
-        )
-        if not has_any:
-            continue
-
-        try:
-            st = child.stat()
-            mtime = float(st.st_mtime)
-        except Exception:
-            mtime = 0.0
-
-        runs.append(
-            {
-                "run_id": run_id,
-                "root": "static",
-                "last_modified_ts": mtime,
-                "last_modified_iso": _iso_from_mtime(mtime),
-                "modes": modes,
-                "metrics": metrics,
-            }
-        )
-
-    runs.sort(key=lambda r: float(r.get("last_modified_ts") or 0.0), reverse=True)
-    return runs
+        return []
+    # Same catalog as /api/backtest/runs; in-memory by default so nothing extra is published.
+    catalog = RunCatalog(
+        static_root,
+        db_path=db_path or ":memory:",
+        root_label="static",
+        marker_files=RUN_MARKER_FILES + ("run_config.json",),
+    )
+    try:
+        catalog.reconcile(force=True)
+        return catalog.list_runs(reconcile=False)["runs"]
+    finally:
+        catalog.close()
 
 
 def main() -> int:
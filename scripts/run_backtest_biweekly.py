@@ -13,6 +13,8 @@ sys.path.append(str(PROJECT_ROOT))
 from tools.backtest_engine import BacktestEngine
 from tools.llm_bridge import LLMConfig
 from tools.rag_core import load_vectorstore
+from tools.run_catalog import RunCatalog
+from tools.run_sidecar import write_run_sidecar
 
 def main():
     parser = argparse.ArgumentParser(description="Biweekly Allocation Backtest (LLM-in-loop)")
@@ -23,6 +25,8 @@ def main():
     parser.add_argument("--end", type=str, default="2024-12-31", help="End date (YYYY-MM-DD)")
     parser.add_argument("--tickers", type=str, default="SPY,SHY,GLD,BIL", help="Comma-separated tickers for Stocks,Bonds,Gold,Cash")
     parser.add_argument("--step_days", type=int, default=10, help="Rebalance every N trading days")
+    parser.add_argument("--workers", type=int, default=1, help="Mode A: prefetch committee decisions with N parallel LLM calls")
+    parser.add_argument("--drop_current_alloc", action="store_true", help="Mode A: omit current allocation from the committee prompt (dates become independent)")
     
     # LLM Config
     parser.add_argument("--provider", type=str, default="openai", help="LLM provider")
@@ -31,6 +35,9 @@ def main():
     
     parser.add_argument("--run_id", type=str, default=None, help="Unique ID for this run (defaults to timestamp)")
     parser.add_argument("--results_dir", type=str, default="results", help="Directory to save results")
+    parser.add_argument("--llm_cache_dir", type=str, default=None, help="Shared LLM response cache (default: <results_dir>/.llm_cache)")
+    parser.add_argument("--price_store_dir", type=str, default=None, help="Local price store (default: <results_dir>/.price_store)")
+    parser.add_argument("--offline", action="store_true", help="Use cached prices only, never download (also IMH_PRICES_OFFLINE=1)")
     
     args = parser.parse_args()
     
@@ -47,7 +54,8 @@ def main():
         model=args.model,
         api_key=os.getenv(args.api_key_env)
     )
-    engine = BacktestEngine(results_dir=args.results_dir, llm_config=llm_cfg)
+    engine = BacktestEngine(results_dir=args.results_dir, llm_config=llm_cfg, llm_cache_dir=args.llm_cache_dir,
+                            price_store_dir=args.price_store_dir, offline_prices=args.offline or None)
     
     # 2. Load Prices
     tickers = [t.strip() for t in args.tickers.split(",") if t.strip()]
@@ -66,6 +74,8 @@ def main():
                     "start": args.start,
                     "end": args.end,
                     "step_days": int(args.step_days),
+                    "workers": int(args.workers),
+                    "drop_current_alloc": bool(args.drop_current_alloc),
                     "tickers": ticker_map,
                     "results_dir": args.results_dir,
                     "provider": args.provider,
@@ -108,15 +118,26 @@ def main():
     
     if args.mode in ["A", "AB"]:
         print("\n>>> Running Backtest A (Committee)...")
-        curve_a, hist_a = engine.run_backtest_A(args.run_id, prices, news_data, vs, step_days=args.step_days, ticker_map=ticker_map)
+        curve_a, hist_a = engine.run_backtest_A(
+            args.run_id,
+            prices,
+            news_data,
+            vs,
+            step_days=args.step_days,
+            ticker_map=ticker_map,
+            workers=args.workers,
+            include_current_allocation=not args.drop_current_alloc,
+        )
         metrics_a = engine.compute_metrics(curve_a)
         
         curve_a.to_csv(os.path.join(run_dir, "equity_curve_A.csv"))
         hist_a.to_csv(os.path.join(run_dir, "history_A.csv"), index=False)
+        write_run_sidecar(run_dir, "A", curve_a, hist_a)
         with open(os.path.join(run_dir, "metrics_A.json"), "w") as f:
             json.dump(metrics_a, f, indent=2)
         results["A"] = metrics_a
         print(f"Mode A Sharpe: {metrics_a.get('sharpe_ratio', 0):.2f}")
+        print(f"LLM cache: {engine.llm_cache.stats()}")
 
     if args.mode in ["B", "AB"]:
         print("\n>>> Running Backtest B (Strategy Signals)...")
@@ -125,6 +146,7 @@ def main():
         
         curve_b.to_csv(os.path.join(run_dir, "equity_curve_B.csv"))
         hist_b.to_csv(os.path.join(run_dir, "history_B.csv"), index=False)
+        write_run_sidecar(run_dir, "B", curve_b, hist_b)
         with open(os.path.join(run_dir, "metrics_B.json"), "w") as f:
             json.dump(metrics_b, f, indent=2)
         results["B"] = metrics_b
@@ -148,6 +170,12 @@ def main():
                 
         print(f"\nComparison report saved to {comp_path}")
 
+    # 6. Register the finished run in the catalog behind /api/backtest/runs
+    try:
+        RunCatalog(args.results_dir).update_run(args.run_id)
+    except Exception as e:
+        print(f"Warning: failed to update run catalog: {e}")
+
 if __name__ == "__main__":
     main()
 
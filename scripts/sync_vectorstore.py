@@ -0,0 +1,40 @@
+"""
+Incrementally sync the persisted Chroma vectorstore with investors/*.md + decision rules.
+
+Only new/changed chunks are embedded; removed chunks are deleted (manifest: imh_manifest.json
+inside the persist dir). A store without a manifest is rebuilt once.
+
+Usage:
+    python scripts/sync_vectorstore.py [--persist_dir vectorstore] [--dry-run] [--full]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from tools.vectorstore_sync import open_and_sync  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Incremental vectorstore sync (hash manifest)")
+    parser.add_argument("--persist_dir", type=str, default=str(PROJECT_ROOT / "vectorstore"), help="Chroma persist directory")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--full", action="store_true", help="Force a full rebuild")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    _vs, stats = open_and_sync(args.persist_dir, full=args.full, dry_run=args.dry_run)
+    stats["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
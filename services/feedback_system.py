@@ -2,7 +2,7 @@
 Investment Masters Handbook - 精簡反饋閉環系統
 
 設計理念:
-1. 輕量級：基於 JSON 文件存儲，無需數據庫
+1. 輕量級：單個 SQLite 文件 (標準庫, WAL 追加寫入)，無需外部數據庫
 2. 實用：聚焦核心功能 (評分 + 點贊/倒讚)
 3. 簡單：NPS 計算 + 基本統計
 
@@ -16,6 +16,55 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import json
 import random
+import sqlite3
+import threading
+
+
+RECORD_FIELDS = ("id", "session_id", "query", "response_id", "feedback_type", "rating", "comment", "timestamp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    session_id TEXT,
+    query TEXT,
+    response_id TEXT,
+    feedback_type TEXT,
+    rating INTEGER,
+    comment TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_ts ON feedback (ts);
+CREATE TABLE IF NOT EXISTS feedback_meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS feedback_hourly (bucket TEXT PRIMARY KEY, {agg});
+CREATE TABLE IF NOT EXISTS feedback_daily (bucket TEXT PRIMARY KEY, {agg});
+""".format(agg=", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in (
+    "total", "thumbs_up", "thumbs_down", "ratings", "rating_sum", "promoters", "detractors"
+)))
+
+# 聚合欄位：與 FeedbackAnalyzer.analyze 的計數口徑一致
+# (評分只統計 feedback_type == "rating" 且 rating 非空非 0 的記錄)
+AGG_FIELDS = ("total", "thumbs_up", "thumbs_down", "ratings", "rating_sum", "promoters", "detractors")
+_RATED = "(feedback_type = 'rating' AND rating IS NOT NULL AND rating != 0)"
+_AGG_SELECT = (
+    "COUNT(*), "
+    "COALESCE(SUM(feedback_type = 'thumbs_up'), 0), "
+    "COALESCE(SUM(feedback_type = 'thumbs_down'), 0), "
+    f"COALESCE(SUM({_RATED}), 0), "
+    f"COALESCE(SUM(CASE WHEN {_RATED} THEN rating ELSE 0 END), 0), "
+    f"COALESCE(SUM({_RATED} AND rating >= 4), 0), "
+    f"COALESCE(SUM({_RATED} AND rating <= 2), 0)"
+)
+AGG_VERSION = "1"
+
+
+def _ts_key(timestamp: str) -> str:
+    """可排序的時間鍵：本地無時區時間，固定到微秒 (字串比較 == 時間比較)"""
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt.isoformat(timespec="microseconds")
 
 
 # ============================================
@@ -29,17 +78,58 @@ class FeedbackCollector:
     def __init__(self, storage_dir: str = ".feedback"):
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
+        # 追加寫入的 SQLite 日誌 (WAL)：提交 = 一次 INSERT，與歷史記錄數量無關；
+        # 多個寫入者 (線程 / 進程) 由 SQLite 鎖保證不丟記錄
+        self.db_file = self.storage_dir / "feedback.sqlite"
+        # 舊版 read-modify-write JSON 文件，首次啟動時導入一次
         self.feedback_file = self.storage_dir / "feedback.json"
-        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        self._ensure_aggregates()
+        self._import_legacy_json()
+
+    def _ensure_aggregates(self):
+        """按小時 / 按天的聚合桶；若是舊庫 (尚無聚合) 則從日誌重建一次"""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT value FROM feedback_meta WHERE key = 'aggregates_version'").fetchone()
+            if row is not None and row[0] == AGG_VERSION:
+                return
+            for table, width in (("feedback_hourly", 13), ("feedback_daily", 10)):
+                self._conn.execute(f"DELETE FROM {table}")
+                self._conn.execute(
+                    f"INSERT INTO {table} (bucket, {', '.join(AGG_FIELDS)}) "
+                    f"SELECT substr(ts, 1, {width}), {_AGG_SELECT} FROM feedback GROUP BY substr(ts, 1, {width})"
+                )
+            self._conn.execute("INSERT OR REPLACE INTO feedback_meta VALUES ('aggregates_version', ?)", (AGG_VERSION,))
+
+    def _import_legacy_json(self):
+        """把舊版 feedback.json 的記錄導入日誌 (只做一次)，原文件改名為 feedback.json.imported"""
         if not self.feedback_file.exists():
-            self._init_storage()
-    
-    def _init_storage(self):
-        """初始化存儲文件"""
-        data = {"feedback_records": [], "metadata": {"created_at": datetime.now().isoformat()}}
-        with open(self.feedback_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    
+            return
+        try:
+            with open(self.feedback_file, 'r', encoding='utf-8') as f:
+                records = (json.load(f) or {}).get("feedback_records") or []
+        except (OSError, ValueError):
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")  # 多進程同時啟動時只導入一次
+            done = self._conn.execute("SELECT value FROM feedback_meta WHERE key = 'legacy_json_imported'").fetchone()
+            if done is None:
+                for record in records:
+                    self._insert(record)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO feedback_meta VALUES ('legacy_json_imported', ?)", (datetime.now().isoformat(),)
+                )
+        try:
+            self.feedback_file.replace(self.feedback_file.with_name("feedback.json.imported"))
+        except OSError:
+            pass
+
     def submit_feedback(
         self,
         session_id: str,
@@ -85,36 +175,101 @@ class FeedbackCollector:
         print(f"✅ 反饋已保存：{record['id']}")
         return record
     
+    def _insert(self, record: Dict[str, Any]):
+        ts = _ts_key(record["timestamp"])
+        feedback_type, rating = record.get("feedback_type"), record.get("rating")
+        self._conn.execute(
+            "INSERT INTO feedback (id, ts, session_id, query, response_id, feedback_type, rating, comment, timestamp)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                record["id"], ts, record.get("session_id"), record.get("query"),
+                record.get("response_id"), feedback_type, rating, record.get("comment"),
+                record["timestamp"],
+            ),
+        )
+        # 同一事務內更新小時 / 日聚合桶
+        rated = feedback_type == "rating" and bool(rating)
+        delta = (
+            1,
+            int(feedback_type == "thumbs_up"),
+            int(feedback_type == "thumbs_down"),
+            int(rated),
+            rating if rated else 0,
+            int(rated and rating >= 4),
+            int(rated and rating <= 2),
+        )
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in AGG_FIELDS)
+        for table, bucket in (("feedback_hourly", ts[:13]), ("feedback_daily", ts[:10])):
+            self._conn.execute(
+                f"INSERT INTO {table} (bucket, {', '.join(AGG_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT(bucket) DO UPDATE SET {updates}",
+                (bucket, *delta),
+            )
+
     def _save_record(self, record: Dict[str, Any]):
-        """保存記錄到文件"""
-        with open(self.feedback_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        data["feedback_records"].append(record)
-        
-        with open(self.feedback_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    
+        """追加一條記錄 (O(1)，不重寫歷史數據)"""
+        with self._lock, self._conn:
+            self._insert(record)
+
+    def get_feedback_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """時間範圍 [start, end) 內的反饋 (按提交順序)，只掃描時間索引命中的部分"""
+        where, params = [], []
+        if start is not None:
+            where.append("ts >= ?")
+            params.append(_ts_key(start.isoformat()))
+        if end is not None:
+            where.append("ts < ?")
+            params.append(_ts_key(end.isoformat()))
+        sql = f"SELECT {', '.join(RECORD_FIELDS)} FROM feedback"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY seq", params).fetchall()
+        return [dict(zip(RECORD_FIELDS, row)) for row in rows]
+
     def get_recent_feedback(self, days: int = 7) -> List[Dict[str, Any]]:
         """獲取最近的反饋"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        with open(self.feedback_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        records = []
-        for record_data in data["feedback_records"]:
-            record_time = datetime.fromisoformat(record_data["timestamp"])
-            if record_time >= cutoff_date:
-                records.append(record_data)
-        
-        return records
-    
+        return self.get_feedback_range(start=datetime.now() - timedelta(days=days))
+
+    def aggregate_since(self, start: datetime) -> Dict[str, int]:
+        """
+        [start, ∞) 內的計數 (AGG_FIELDS)：
+        start 所在的不完整小時掃描日誌 (索引範圍)，其後到當天結束用小時桶，之後用日桶。
+        成本 O(天數 + 24)，與記錄數無關。
+        """
+        start_key = _ts_key(start.isoformat())
+        hour = datetime.fromisoformat(start_key).replace(minute=0, second=0, microsecond=0)
+        next_hour = hour + timedelta(hours=1)
+        next_day = hour.replace(hour=0) + timedelta(days=1)
+        next_hour_key = next_hour.isoformat(timespec="microseconds")
+        totals = dict.fromkeys(AGG_FIELDS, 0)
+        agg_sum = ", ".join(f"COALESCE(SUM({c}), 0)" for c in AGG_FIELDS)
+        with self._lock:
+            parts = [
+                self._conn.execute(f"SELECT {_AGG_SELECT} FROM feedback WHERE ts >= ? AND ts < ?", (start_key, next_hour_key)).fetchone(),
+                self._conn.execute(
+                    f"SELECT {agg_sum} FROM feedback_hourly WHERE bucket >= ? AND bucket < ?",
+                    (next_hour_key[:13], next_day.isoformat()[:10] if next_hour < next_day else next_hour_key[:13]),
+                ).fetchone(),
+                self._conn.execute(f"SELECT {agg_sum} FROM feedback_daily WHERE bucket >= ?", (next_day.isoformat()[:10],)).fetchone(),
+            ]
+        for row in parts:
+            for c, v in zip(AGG_FIELDS, row):
+                totals[c] += int(v or 0)
+        return totals
+
     def clear_feedback(self):
         """清空所有反饋"""
-        self._init_storage()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM feedback")
+            self._conn.execute("DELETE FROM feedback_hourly")
+            self._conn.execute("DELETE FROM feedback_daily")
         print("✅ 反饋數據已清空")
 
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
 
 # ============================================
 # 反饋分析器
@@ -137,9 +292,10 @@ class FeedbackAnalyzer:
         Returns:
             統計數據字典
         """
-        records = self.collector.get_recent_feedback(days)
+        # 由小時 / 日聚合桶求和 (O(天數))，結果與逐條統計相同
+        agg = self.collector.aggregate_since(datetime.now() - timedelta(days=days))
         
-        if not records:
+        if not agg["total"]:
             return {
                 "total_feedback": 0,
                 "average_rating": 0.0,
@@ -149,22 +305,22 @@ class FeedbackAnalyzer:
                 "total_thumbs_down": 0
             }
         
-        total = len(records)
+        total = agg["total"]
         
         # 點贊/倒讚
-        thumbs_up = sum(1 for r in records if r["feedback_type"] == "thumbs_up")
-        thumbs_down = sum(1 for r in records if r["feedback_type"] == "thumbs_down")
+        thumbs_up = agg["thumbs_up"]
+        thumbs_down = agg["thumbs_down"]
         thumbs_up_ratio = thumbs_up / total if total > 0 else 0.0
         
         # 評分
-        ratings = [r["rating"] for r in records if r["feedback_type"] == "rating" and r["rating"]]
-        avg_rating = sum(ratings) / len(ratings) if ratings else 0.0
+        n_ratings = agg["ratings"]
+        avg_rating = agg["rating_sum"] / n_ratings if n_ratings else 0.0
         
         # NPS (Net Promoter Score)
         # 5 星=10 分，4 星=9 分，3 星=7-8 分，2 星=5-6 分，1 星=0-6 分
-        promoters = sum(1 for r in ratings if r >= 4)  # 4-5 星
-        detractors = sum(1 for r in ratings if r <= 2)  # 1-2 星
-        nps = ((promoters - detractors) / len(ratings) * 100) if ratings else 0.0
+        promoters = agg["promoters"]  # 4-5 星
+        detractors = agg["detractors"]  # 1-2 星
+        nps = ((promoters - detractors) / n_ratings * 100) if n_ratings else 0.0
         
         return {
             "total_feedback": total,
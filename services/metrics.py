@@ -189,6 +189,19 @@ class IMHMetricsRegistry:
             ['event_type', 'severity'],
             registry=self.registry
         )
+        
+        self.audit_sink_records_total = Counter(
+            'imh_audit_sink_records_total',
+            'Audit records handled by the batched audit writer',
+            ['status'],  # status: written, dropped, error
+            registry=self.registry
+        )
+        
+        self.audit_sink_queue_depth = Gauge(
+            'imh_audit_sink_queue_depth',
+            'Audit records queued for the background writer',
+            registry=self.registry
+        )
     
     def get_registry(self) -> CollectorRegistry:
         """獲取指標註冊表"""
@@ -312,6 +325,15 @@ def track_audit_event(event_type: str, severity: str = 'info'):
     registry.audit_events_total.labels(event_type=event_type, severity=severity).inc()
 
 
+def track_audit_sink(status: str, count: int = 1, queue_depth: Optional[int] = None):
+    """追蹤審計日誌寫入器 (寫入 / 丟棄 / 錯誤條數, 隊列深度)"""
+    registry = get_metrics_registry()
+    if count:
+        registry.audit_sink_records_total.labels(status=status).inc(count)
+    if queue_depth is not None:
+        registry.audit_sink_queue_depth.set(queue_depth)
+
+
 # 系統資源追蹤
 def update_system_metrics(memory_rss: int, memory_vms: int, memory_percent: float, cpu_percent: float):
     """更新系統資源指標"""
@@ -1,20 +1,20 @@
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import os
 import sys
 import re
 import json
 import hashlib
 import asyncio
+import threading
 import time
 import traceback
+from datetime import date
 from pathlib import Path
 import yaml
-import csv
-import ast
 
 # 添加项目根目录到路径
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -27,13 +27,28 @@ from tools.rag_core import (
     load_vectorstore,
     create_vectorstore,
     query_vectorstore,
+    query_vectorstore_batch,
     ensemble_reasoning,
     build_committee_prompt,
-    run_ensemble_committee,
+    arun_ensemble_committee,
+    astream_ensemble_committee,
+    get_embedding_cache,
     TieredEnsembleResponse,
 )
 
-from tools.llm_bridge import LLMBridge, LLMBridgeError, extract_json_block
+from tools.llm_bridge import LLMBridge, LLMBridgeError, aclose_async_pool, extract_json_block
+from tools.keyword_matcher import match_scenarios_and_intents
+from tools.router_index import RouterIndex
+from tools.vectorstore_sync import build_corpus, open_and_sync, sync_vectorstore
+from tools.audit_index import AuditIndex, parse_time
+from tools.audit_log import AuditSink
+from tools.config_registry import get_config_registry
+from tools.policy_engine import CompiledPolicy, compile_policy
+from tools.response_cache import ResponseCache
+from tools.policy_replay import DEFAULT_CHUNK_SIZE, read_feature_table, replay_policy
+from tools.run_catalog import RunCatalog
+from tools.downsample import METHODS as DOWNSAMPLE_METHODS
+from tools.run_sidecar import read_equity, read_history
 from tools.reasoning_core import get_master_personality, EnsembleAdjudicator, ExpertOpinion as AdjudicatorOpinion
 from services.feedback_system import FeedbackCollector, FeedbackAnalyzer
 
@@ -69,6 +84,7 @@ VECTORSTORE_STATUS: Dict[str, Any] = {
     "last_success_ts": None,
     "last_error": None,
     "next_retry_in_s": None,
+    "last_sync": None,
 }
 PERSIST_DIR = str(PROJECT_ROOT / "vectorstore")
 WEB_OUT_DIR = PROJECT_ROOT / "web" / "out"
@@ -77,9 +93,45 @@ POLICY_PATH = PROJECT_ROOT / "config" / "policy_gate.yaml"
 SCENARIOS_PATH = PROJECT_ROOT / "config" / "scenarios.yaml"
 AUDIT_DIR = PROJECT_ROOT / "logs"
 AUDIT_PATH = AUDIT_DIR / "policy_gate_audit.jsonl"
-DEFAULT_BACKTEST_RESULTS_ROOT = "results"
+_audit_sink: Optional[AuditSink] = None
+
+
+def get_audit_sink() -> AuditSink:
+    """Batched, rotating writer for AUDIT_PATH (tools/audit_log.py, IMH_AUDIT_* env)."""
+    global _audit_sink
+    if _audit_sink is None:
+        _audit_sink = AuditSink.from_env(AUDIT_PATH)
+    return _audit_sink
+
+
+_audit_index: Optional[AuditIndex] = None
+
+
+def get_audit_index() -> AuditIndex:
+    """Sidecar SQLite index over the audit segments (tools/audit_index.py)."""
+    global _audit_index
+    if _audit_index is None or _audit_index.audit_path != AUDIT_PATH:
+        _audit_index = AuditIndex(AUDIT_PATH)
+    return _audit_index
 
-_index_cache: Optional[Dict[str, Any]] = None
+
+_gate_cache: Optional[ResponseCache] = None
+
+
+def get_gate_cache() -> ResponseCache:
+    """Whole-response cache for /api/policy/gate (IMH_GATE_CACHE_SIZE, IMH_GATE_CACHE_TTL_S; 0 = off)."""
+    global _gate_cache
+    if _gate_cache is None:
+        try:
+            size = int(os.getenv("IMH_GATE_CACHE_SIZE") or 512)
+            ttl = float(os.getenv("IMH_GATE_CACHE_TTL_S") or 300)
+        except ValueError:
+            size, ttl = 512, 300.0
+        _gate_cache = ResponseCache(max_entries=size, ttl_s=ttl)
+    return _gate_cache
+
+
+DEFAULT_BACKTEST_RESULTS_ROOT = "results"
 
 
 def _require_bearer_token(authorization: Optional[str]) -> str:
@@ -117,6 +169,17 @@ def _require_bearer_token(authorization: Optional[str]) -> str:
     raise HTTPException(status_code=401, detail="Unauthorized: Invalid token")
 
 
+def _require_admin_token(authorization: Optional[str]) -> str:
+    """
+    Admin endpoints: only the instance token (IMH_API_TOKEN) is accepted, never an LLM key.
+    """
+    token = _require_bearer_token(authorization)
+    expected = (os.getenv("IMH_API_TOKEN") or "").strip()
+    if not expected or token != expected:
+        raise HTTPException(status_code=403, detail="Forbidden: admin endpoints require IMH_API_TOKEN")
+    return token
+
+
 def _get_vectorstore_doc_count(vs: Any) -> Optional[int]:
     """
     Best-effort: Chroma exposes _collection.count(). Keep it defensive.
@@ -181,93 +244,6 @@ def _read_text_file(path: Path, max_chars: int = 200_000) -> Optional[str]:
         return None
 
 
-def _read_equity_curve_csv(path: Path, max_points: int = 800) -> List[Dict[str, Any]]:
-    """
-    Read Series-like CSV (date,index -> value) produced by pandas Series.to_csv().
-    Returns downsampled points: [{date, equity}].
-    """
-    if not path.exists():
-        return []
-    pts: List[Dict[str, Any]] = []
-    try:
-        with path.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.reader(f)
-            _header = next(reader, None)
-            for row in reader:
-                if not row or len(row) < 2:
-                    continue
-                date_s = str(row[0]).strip()
-                if not date_s:
-                    continue
-                try:
-                    v = float(row[1])
-                except Exception:
-                    continue
-                pts.append({"date": date_s, "equity": v})
-    except Exception:
-        return []
-
-    if max_points > 0 and len(pts) > max_points:
-        # Evenly sample and keep the last point for correct end-of-period display.
-        step = max(1, int((len(pts) + max_points - 1) / max_points))
-        ds = pts[::step]
-        if ds and pts and ds[-1].get("date") != pts[-1].get("date"):
-            ds.append(pts[-1])
-        pts = ds
-
-    return pts
-
-
-def _read_history_csv(path: Path, max_rows: int = 500) -> List[Dict[str, Any]]:
-    """
-    Read history_A.csv / history_B.csv and normalize allocation fields to dict.
-    """
-    if not path.exists():
-        return []
-    out: List[Dict[str, Any]] = []
-    try:
-        with path.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            for i, row in enumerate(reader):
-                if max_rows > 0 and i >= max_rows:
-                    break
-                r = dict(row or {})
-                # allocation is stored as python dict string in CSV by pandas
-                alloc_raw = r.get("allocation")
-                alloc: Optional[Dict[str, Any]] = None
-                if isinstance(alloc_raw, str) and alloc_raw.strip():
-                    s = alloc_raw.strip()
-                    try:
-                        alloc = json.loads(s)
-                    except Exception:
-                        try:
-                            v = ast.literal_eval(s)
-                            alloc = v if isinstance(v, dict) else None
-                        except Exception:
-                            alloc = None
-                if alloc is not None:
-                    r["allocation"] = alloc
-                # equity numeric
-                if "equity" in r:
-                    try:
-                        r["equity"] = float(r["equity"])
-                    except Exception:
-                        pass
-                out.append(r)
-    except Exception:
-        return []
-    return out
-
-
-class BacktestRunSummary(BaseModel):
-    run_id: str
-    root: str
-    last_modified_ts: float
-    last_modified_iso: str
-    modes: List[str] = []
-    metrics: Dict[str, Any] = {}
-
-
 class BacktestRunDetail(BaseModel):
     run_id: str
     root: str
@@ -279,74 +255,56 @@ class BacktestRunDetail(BaseModel):
     comparison_md: Optional[str] = None
 
 
+_RUN_CATALOGS: Dict[str, RunCatalog] = {}
+_RUN_CATALOGS_LOCK = threading.Lock()
+
+
+def _get_run_catalog(root_dir: Path) -> RunCatalog:
+    key = str(root_dir)
+    with _RUN_CATALOGS_LOCK:
+        cat = _RUN_CATALOGS.get(key)
+        if cat is None:
+            cat = _RUN_CATALOGS[key] = RunCatalog(root_dir)
+        return cat
+
+
 @app.get("/api/backtest/runs", response_model=Dict[str, Any])
-async def list_backtest_runs(root: Optional[str] = None, authorization: Optional[str] = Header(None)):
+async def list_backtest_runs(
+    root: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 0,
+    sort: str = "last_modified_ts",
+    order: str = "desc",
+    mode: Optional[str] = None,
+    q: Optional[str] = None,
+    filter: List[str] = Query(default=[]),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Runs from the persistent catalog (tools/run_catalog.py), reconciled by mtime.
+    - sort: last_modified_ts | run_id | <mode>.<metric> (e.g. A.sharpe_ratio); order: asc|desc
+    - filter (repeatable): <mode>.<metric><op><value>, e.g. A.sharpe_ratio>=1
+    - limit=0 returns all runs (previous behaviour)
+    """
     _maybe_require_token(authorization)
     root_dir = _safe_results_root(root)
     if not root_dir.exists():
-        return {"root": str(root_dir.name), "runs": []}
-
-    runs: List[BacktestRunSummary] = []
+        return {"root": str(root_dir.name), "total": 0, "offset": offset, "limit": limit, "runs": []}
     try:
-        for child in root_dir.iterdir():
-            if not child.is_dir():
-                continue
-            run_id = child.name
-            try:
-                st = child.stat()
-                mtime = float(st.st_mtime)
-            except Exception:
-                mtime = 0.0
-
-            metrics_a = _read_json_file(child / "metrics_A.json")
-            metrics_b = _read_json_file(child / "metrics_B.json")
-            modes = []
-            metrics: Dict[str, Any] = {}
-            if metrics_a is not None:
-                modes.append("A")
-                metrics["A"] = metrics_a
-            if metrics_b is not None:
-                modes.append("B")
-                metrics["B"] = metrics_b
-
-            # Only list folders that look like a backtest run (has any known file)
-            has_any = any(
-                (child / fn).exists()
-                for fn in (
-                    "metrics_A.json",
-                    "metrics_B.json",
-                    "equity_curve_A.csv",
-                    "equity_curve_B.csv",
-                    "history_A.csv",
-                    "history_B.csv",
-                    "comparison.md",
-                )
-            )
-            if not has_any:
-                continue
-
-            iso = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(mtime))
-            runs.append(
-                BacktestRunSummary(
-                    run_id=run_id,
-                    root=str(root_dir.name),
-                    last_modified_ts=mtime,
-                    last_modified_iso=iso,
-                    modes=modes,
-                    metrics=metrics,
-                )
-            )
+        catalog = _get_run_catalog(root_dir)
+        return await asyncio.to_thread(
+            catalog.list_runs, offset, limit, sort, order, mode, q, filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list backtest runs: {e}")
 
-    runs.sort(key=lambda r: r.last_modified_ts, reverse=True)
-    return {"root": str(root_dir.name), "runs": [r.model_dump() for r in runs]}
 
+MAX_EQUITY_POINTS = 10000
 
-@app.get("/api/backtest/runs/{run_id}", response_model=BacktestRunDetail)
-async def get_backtest_run(run_id: str, root: Optional[str] = None, authorization: Optional[str] = Header(None)):
-    _maybe_require_token(authorization)
-    root_dir = _safe_results_root(root)
+
+def _resolve_run_dir(root_dir: Path, run_id: str) -> Path:
     if not run_id or "/" in run_id or "\\" in run_id or ".." in run_id:
         raise HTTPException(status_code=400, detail="Invalid run_id")
     run_dir = (root_dir / run_id).resolve()
@@ -355,6 +313,43 @@ async def get_backtest_run(run_id: str, root: Optional[str] = None, authorizatio
         raise HTTPException(status_code=400, detail="Invalid run path")
     if not run_dir.exists() or not run_dir.is_dir():
         raise HTTPException(status_code=404, detail="Backtest run not found")
+    return run_dir
+
+
+def _check_equity_window(max_points: int, start: Optional[str], end: Optional[str], downsample: str) -> None:
+    if not 0 <= max_points <= MAX_EQUITY_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be between 0 and {MAX_EQUITY_POINTS}")
+    if downsample not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"downsample must be one of {', '.join(DOWNSAMPLE_METHODS)}")
+    for d in (start, end):
+        if not d:
+            continue
+        try:
+            if not re.match(r"^\d{4}-\d{2}-\d{2}$", d):
+                raise ValueError(d)
+            date.fromisoformat(d)  # rejects 2020-02-30 etc.
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date {d!r} (expected YYYY-MM-DD)")
+
+
+@app.get("/api/backtest/runs/{run_id}", response_model=BacktestRunDetail)
+async def get_backtest_run(
+    run_id: str,
+    root: Optional[str] = None,
+    max_points: int = 900,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    downsample: str = "lttb",
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Run detail. The equity curves honour max_points (0 = all points), an optional
+    start/end date window (YYYY-MM-DD, inclusive) and downsample=lttb|minmax|stride.
+    """
+    _maybe_require_token(authorization)
+    root_dir = _safe_results_root(root)
+    run_dir = _resolve_run_dir(root_dir, run_id)
+    _check_equity_window(max_points, start, end, downsample)
 
     files = {
         "metrics_A": (run_dir / "metrics_A.json").exists(),
@@ -376,17 +371,20 @@ async def get_backtest_run(run_id: str, root: Optional[str] = None, authorizatio
     if mb is not None:
         metrics["B"] = mb
 
+    # Served from the memory-mapped sidecar (tools/run_sidecar.py); legacy runs are
+    # converted from their CSVs once, on first read.
     equity = {}
-    if files["equity_curve_A"]:
-        equity["A"] = _read_equity_curve_csv(run_dir / "equity_curve_A.csv", max_points=900)
-    if files["equity_curve_B"]:
-        equity["B"] = _read_equity_curve_csv(run_dir / "equity_curve_B.csv", max_points=900)
-
     history = {}
-    if files["history_A"]:
-        history["A"] = _read_history_csv(run_dir / "history_A.csv", max_rows=800)
-    if files["history_B"]:
-        history["B"] = _read_history_csv(run_dir / "history_B.csv", max_rows=800)
+    for mode in ("A", "B"):
+        if not (files[f"equity_curve_{mode}"] or files[f"history_{mode}"]):
+            continue
+        try:
+            if files[f"equity_curve_{mode}"]:
+                equity[mode] = await asyncio.to_thread(read_equity, run_dir, mode, max_points, start, end, downsample)
+            if files[f"history_{mode}"]:
+                history[mode] = await asyncio.to_thread(read_history, run_dir, mode, 800)
+        except Exception as e:
+            print(f"Warning: backtest run {run_id}: failed to read mode {mode} outputs: {e}")
 
     comparison_md = _read_text_file(run_dir / "comparison.md")
     return BacktestRunDetail(
@@ -401,38 +399,67 @@ async def get_backtest_run(run_id: str, root: Optional[str] = None, authorizatio
     )
 
 
+@app.get("/api/backtest/runs/{run_id}/equity", response_model=Dict[str, Any])
+async def get_backtest_equity(
+    run_id: str,
+    mode: str = "A",
+    root: Optional[str] = None,
+    max_points: int = 900,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    downsample: str = "lttb",
+    authorization: Optional[str] = Header(None),
+):
+    """Equity curve only, for cheap zooming in the web UI (same parameters as the run detail)."""
+    _maybe_require_token(authorization)
+    root_dir = _safe_results_root(root)
+    run_dir = _resolve_run_dir(root_dir, run_id)
+    _check_equity_window(max_points, start, end, downsample)
+    if mode not in ("A", "B") or not (run_dir / f"equity_curve_{mode}.csv").exists():
+        raise HTTPException(status_code=404, detail=f"No equity curve for mode {mode}")
+    points = await asyncio.to_thread(read_equity, run_dir, mode, max_points, start, end, downsample)
+    return {"run_id": run_id, "mode": mode, "start": start, "end": end, "points": points}
+
+
+CONFIG = get_config_registry()
+ROUTER_CONFIG_PATH = PROJECT_ROOT / "config" / "router_config.yaml"
+
+
+def _register_configs() -> None:
+    # Idempotent; re-reads the module-level paths so they can be pointed elsewhere (tests).
+    CONFIG.register("policy", POLICY_PATH, compile=compile_policy)
+    CONFIG.register("index", INDEX_PATH, compile=RouterIndex)
+    CONFIG.register("scenarios", SCENARIOS_PATH)
+    CONFIG.register("router", ROUTER_CONFIG_PATH)
+
+
+_register_configs()
+
+
 def _load_index() -> Dict[str, Any]:
-    global _index_cache
-    if _index_cache is not None:
-        return _index_cache
-    if not INDEX_PATH.exists():
-        _index_cache = {}
-        return _index_cache
-    data = yaml.safe_load(INDEX_PATH.read_text(encoding="utf-8")) or {}
-    _index_cache = data
-    return data
+    """
+    investor_index.yaml via the config registry; the compiled RouterIndex is kept
+    alongside it (CONFIG.compiled("index")) and rebuilt only when the file changes.
+    """
+    _register_configs()
+    return CONFIG.get("index")
 
 
-_policy_cache: Optional[Dict[str, Any]] = None
-_policy_cache_hash: Optional[str] = None
+def _get_router_index() -> RouterIndex:
+    _register_configs()
+    return CONFIG.compiled("index")
 
 
 def _load_policy() -> Dict[str, Any]:
-    global _policy_cache, _policy_cache_hash
-    if not POLICY_PATH.exists():
-        _policy_cache = {}
-        _policy_cache_hash = None
-        return {}
+    """policy_gate.yaml via the config registry (no file I/O in steady state)."""
+    _register_configs()
+    return CONFIG.get("policy")
 
-    raw = POLICY_PATH.read_text(encoding="utf-8")
-    h = hashlib.sha256(raw.encode("utf-8")).hexdigest()
-    if _policy_cache is not None and _policy_cache_hash == h:
-        return _policy_cache
 
-    data = yaml.safe_load(raw) or {}
-    _policy_cache = data
-    _policy_cache_hash = h
-    return data
+def _get_policy_engine() -> CompiledPolicy:
+    """policy_gate.yaml compiled into NumPy tables (recompiled only when the file changes)."""
+    _register_configs()
+    return CONFIG.compiled("policy")
 
 
 def _safe_float(x: Any) -> Optional[float]:
@@ -471,10 +498,6 @@ def _cmp_expectation(op: str, actual: float, expected: float, tol: Optional[floa
     return _cmp(op, actual, expected)
 
 
-def _clamp(x: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, x))
-
-
 def _hash_input(obj: Any) -> str:
     try:
         s = json.dumps(obj, ensure_ascii=False, sort_keys=True)
@@ -484,31 +507,9 @@ def _hash_input(obj: Any) -> str:
 
 
 def _match_scenarios(text: str) -> List[str]:
-    t = (text or "").strip()
-    t_low = t.lower()
-
-    scenario_keywords = {
-        "市场恐慌": ["恐慌", "暴跌", "崩盘", "踩踏", "流动性危机", "挤兑", "panic", "crash", "selloff", "limit down", "跌停"],
-        "市场狂热": ["狂热", "fomo", "all in", "追高", "过热", "疯涨", "逼空", "挤空", "meme", "热钱"],
-        "经济衰退": ["衰退", "萧条", "失业", "经济下行", "recession", "hard landing", "soft landing"],
-        "利率转向": ["降息", "加息", "利率", "yield", "rates", "转向", "拐点", "会议纪要", "点阵图"],
-        "流动性收紧": ["缩表", "收紧", "紧缩", "流动性", "tga", "rrp", "qt", "qe", "融资", "保证金"],
-        "估值泡沫": ["估值", "泡沫", "过高", "市盈率", "pe", "ps", "pb", "ev/ebitda", "估值扩张"],
-        "创业与产品化": ["创业", "合伙人", "产品化", "股权", "特定知识", "不可替代", "MVP", "startup"],
-        "杠杆与财富": ["杠杆", "代码", "媒体", "劳动力", "财富积累", "所有权", "leverage", "equity"],
-        "幸福哲学": ["幸福", "宁静", "欲望", "习惯", "冥想", "身心系统", "happiness"],
-        "政策与法案": ["政策", "法案", "立法", "补贴", "加税", "披露", "对冲", "policy", "bill", "legislation", "disclosure"],
-        "地产与交易": ["地产", "谈判", "筹码艺术", "地段", "再融资", "地标", "real estate", "negotiation", "deal"],
-        "财商与现金流": ["财商", "现金流", "资产负债", "被动收入", "老鼠赛跑", "esbi", "cash flow", "rich dad"],
-        "叙事与风投": ["叙事", "趋势", "科技风口", "反身性", "非对称", "舆论杠杆", "vc", "narrative", "chamath"],
-        "硬资产": ["黄金", "白银", "比特币", "抗通胀", "印钞", "gold", "silver", "bitcoin", "btc", "inflation"],
-    }
-
-    matched: List[str] = []
-    for scen, keys in scenario_keywords.items():
-        if any(k.lower() in t_low for k in keys):
-            matched.append(scen)
-    return matched
+    # Single pass over the shared scenario/intent automaton (tools/keyword_matcher.py).
+    scenarios, _intents = match_scenarios_and_intents(text)
+    return scenarios
 
 
 def _route_investors(text: str, top_k: int = 5) -> List[Dict[str, Any]]:
@@ -517,197 +518,13 @@ def _route_investors(text: str, top_k: int = 5) -> List[Dict[str, Any]]:
     - scenario keyword match -> consult_order boosts
     - per-investor keyword match from tags_zh / key_concepts / style / best_for / fund boosts
     Returns ranked investors with reasons.
-    """
-    idx = _load_index()
-    investors = idx.get("investors", []) or []
-    scenario_routing = idx.get("scenario_routing", {}) or {}
-
-    t = (text or "").strip()
-    t_low = t.lower()
-
-    quick_lookup = (idx.get("quick_lookup", {}) or {}).get("by_question", {}) or {}
-
-    # Scenario keyword heuristics (Chinese + English-ish)
-    matched_scenarios = _match_scenarios(t)
-
-    # Decision intent keywords -> investor boosts (very novice-friendly)
-    intent_keywords = {
-        "买入/追高": (["买", "买入", "开仓", "追", "追吗", "chase", "enter"], ["warren_buffett", "peter_lynch", "charlie_munger"]),
-        "卖出/止盈": (["卖", "卖出", "止盈", "take profit", "exit"], ["howard_marks", "stanley_druckenmiller", "george_soros"]),
-        "止损/风控": (["止损", "风控", "回撤", "仓位", "max drawdown", "risk", "position sizing"], ["george_soros", "stanley_druckenmiller", "seth_klarman", "naval_ravikant"]),
-        "宏观/政策": (["宏观", "利率", "通胀", "就业", "美元", "政策", "fed", "cpi", "ppi", "法案", "立法", "国会"], ["ray_dalio", "stanley_druckenmiller", "george_soros", "nancy_pelosi"]),
-        "周期/情绪": (["周期", "情绪", "极端", "恐慌", "狂热", "sentiment", "cycle"], ["howard_marks", "ray_dalio", "charlie_munger", "donald_trump"]),
-        # Valuation (novice-friendly)
-        "估值/安全边际": (
-            [
-                "估值",
-                "高估",
-                "低估",
-                "贵不贵",
-                "便不便宜",
-                "值不值",
-                "合理吗",
-                "溢价",
-                "折价",
-                "安全边际",
-                "内在价值",
-                "价值陷阱",
-                "pe",
-                "pb",
-                "ps",
-                "ev/ebitda",
-                "intrinsic value",
-                "undervalued",
-                "overvalued",
-                "cheap",
-                "expensive",
-            ],
-            ["warren_buffett", "seth_klarman", "howard_marks", "charlie_munger"],
-        ),
-        "成长/PEG": (["成长", "peg", "营收增长", "增速", "tenbagger"], ["peter_lynch", "warren_buffett"]),
-        "量化/因子": (["量化", "因子", "模型", "回测", "因子投资", "factor"], ["james_simons", "ed_thorp", "cliff_asness"]),
-        "事件/激进": (["并购", "分拆", "回购", "重组", "股东行动", "proxy fight", "activist"], ["carl_icahn", "seth_klarman"]),
-        "创业/杠杆": (["创业", "产品化", "杠杆", "特定知识", "股权", "所有权", "天使投资", "自由", "wealth"], ["naval_ravikant", "charlie_munger"]),
-        "地产/谈判": (["地产", "房子", "写字楼", "谈判", "筹码", "品牌溢价", "再融资", "杠杆经营", "real estate"], ["donald_trump"]),
-        "期权/披露": (["期权", "看涨", "看跌", "披露", "国会交易", "内幕", "跟单", "options", "leaps"], ["nancy_pelosi", "ed_thorp"]),
-        "财商/通胀": (["财商", "现金流", "硬资产", "通胀", "黄金", "比特币", "资产负债", "被动收入"], ["robert_kiyosaki", "ray_dalio"]),
-        "叙事/科技": (["叙事", "风口", "科技趋势", "反身性", "非对称", "跨周期"], ["chamath_palihapitiya", "naval_ravikant"]),
-    }
-
-    # Base score table
-    scores: Dict[str, float] = {}
-    reasons: Dict[str, List[str]] = {}
-
-    def add(iid: str, delta: float, why: str):
-        scores[iid] = scores.get(iid, 0.0) + delta
-        reasons.setdefault(iid, []).append(why)
-
-    # Quick lookup exact phrases (from YAML)
-    for q, ids in quick_lookup.items():
-        if q and q in t:
-            for iid in (ids or []):
-                add(iid, 3.5, f"匹配快速问题「{q}」")
-
-    # Scenario match boosts consult_order
-    for scen in matched_scenarios:
-        route = scenario_routing.get(scen, {}) or {}
-        consult = route.get("consult_order", []) or []
-        for rank, iid in enumerate(consult):
-            add(iid, 3.0 - min(rank, 3) * 0.5, f"匹配情境「{scen}」")
-
-    # Intent boosts (buy/sell/stoploss/macro etc.)
-    for intent, (keys, ids) in intent_keywords.items():
-        if any(k.lower() in t_low for k in keys):
-            for iid in ids:
-                add(iid, 1.8, f"匹配意图「{intent}」")
-
-    # Explicit over/under valuation routing (stronger signal)
-    underval_keys = ["低估", "便宜", "折价", "underpriced", "undervalued", "cheap"]
-    overval_keys = ["高估", "太贵", "贵", "溢价", "overpriced", "overvalued", "expensive"]
-    if any(k.lower() in t_low for k in underval_keys):
-        for iid in ["seth_klarman", "warren_buffett", "howard_marks"]:
-            add(iid, 2.6, "判断是否低估/有安全边际")
-    if any(k.lower() in t_low for k in overval_keys):
-        for iid in ["charlie_munger", "michael_burry", "howard_marks", "george_soros"]:
-            add(iid, 2.6, "判断是否高估/泡沫与风险")
-
-    # Ticker hints (AAPL/TSLA/NVDA etc.) -> treat as stock selection
-    if re.search(r"\b[A-Z]{1,5}\b", text or ""):
-        for iid in ["warren_buffett", "peter_lynch", "charlie_munger"]:
-            add(iid, 1.2, "识别到代码/股票缩写，偏向选股视角")
-
-    # Per-investor keyword match
-    for inv in investors:
-        iid = inv.get("id")
-        if not iid:
-            continue
-
-        # Name direct match
-        cn = (inv.get("chinese_name") or "").strip()
-        en = (inv.get("full_name") or "").strip()
-        if cn and cn in t:
-            add(iid, 5.0, "文本中直接提到该大师姓名")
-        if en and en.lower() in t_low:
-            add(iid, 5.0, "文本中直接提到该大师英文名")
-
-        # Field matchers
-        fields: List[str] = []
-        for k in ("tags_zh", "style", "best_for"):
-            vals = inv.get(k) or []
-            if isinstance(vals, list):
-                fields.extend([str(x) for x in vals if x])
-
-        # key_concepts items may contain "moat (护城河)" -> both tokens
-        key_concepts = inv.get("key_concepts") or []
-        if isinstance(key_concepts, list):
-            for x in key_concepts:
-                s = str(x)
-                fields.append(s)
-                m = re.search(r"\(([^)]+)\)", s)
-                if m:
-                    fields.append(m.group(1))
-
-        # fund/company
-        fund = inv.get("fund")
-        if fund:
-            fields.append(str(fund))
-
-        # score if any field token appears in text
-        matched = []
-        for token in set(fields):
-            if not token:
-                continue
-            token_low = token.lower()
-            if (len(token) >= 2 and token in t) or (len(token_low) >= 3 and token_low in t_low):
-                matched.append(token)
-        if matched:
-            add(iid, min(3.0, 0.6 * len(matched)), f"匹配关键词：{', '.join(matched[:6])}" + ("…" if len(matched) > 6 else ""))
-
-    # Build output
-    by_id = {inv.get("id"): inv for inv in investors if inv.get("id")}
-    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
-    out: List[Dict[str, Any]] = []
-    for iid, sc in ranked[: max(1, min(int(top_k or 5), 10))]:
-        inv = by_id.get(iid) or {}
-        out.append(
-            {
-                "investor_id": iid,
-                "chinese_name": inv.get("chinese_name") or iid,
-                "full_name": inv.get("full_name") or iid,
-                "nationality": inv.get("nationality"),
-                "fund": inv.get("fund"),
-                "intro_zh": inv.get("intro_zh"),
-                "score": round(sc, 3),
-                "reasons": reasons.get(iid, [])[:5],
-                "matched_scenarios": matched_scenarios,
-            }
-        )
 
-    # Ensure we always return enough candidates for novices (fill with sensible defaults).
-    target_n = max(1, min(int(top_k or 5), 10))
-    defaults = ["warren_buffett", "charlie_munger", "howard_marks", "ray_dalio", "seth_klarman"]
-    existing = {x.get("investor_id") for x in out}
-    if len(out) < target_n:
-        for iid in defaults:
-            if len(out) >= target_n:
-                break
-            if iid in existing:
-                continue
-            inv = by_id.get(iid) or {}
-            out.append(
-                {
-                    "investor_id": iid,
-                    "chinese_name": inv.get("chinese_name") or iid,
-                    "full_name": inv.get("full_name") or iid,
-                    "nationality": inv.get("nationality"),
-                    "fund": inv.get("fund"),
-                    "intro_zh": inv.get("intro_zh"),
-                    "score": 0.0,
-                    "reasons": ["信息不足/关键词不明显，补齐通用组合（价值/周期/宏观/风控）"],
-                    "matched_scenarios": matched_scenarios,
-                }
-            )
-    return out
+    Scoring runs on the precompiled RouterIndex (built in _load_index), so a request
+    only scans the text; see tools/router_index.py for the rule table.
+    """
+    router_index = _get_router_index()
+    scenarios, intents = match_scenarios_and_intents(text)
+    return router_index.route(text, top_k=top_k, matched_scenarios=scenarios, matched_intents=intents)
 
 class QueryRequest(BaseModel):
     query: str
@@ -749,6 +566,7 @@ class ValidationItem(BaseModel):
     passed: bool
     details: List[str]
     results: Optional[Dict[str, Any]] = None
+    elapsed_ms: Optional[float] = None
 
 
 class ValidationReport(BaseModel):
@@ -756,6 +574,8 @@ class ValidationReport(BaseModel):
     passed_count: int
     failed_count: int
     items: List[ValidationItem]
+    elapsed_ms: Optional[float] = None
+    timing: Optional[Dict[str, float]] = None
 
 
 # ---------------- Policy Gate (Fund Stack) ----------------
@@ -813,11 +633,9 @@ async def rag_ensemble(req: EnsembleRequest, authorization: Optional[str] = Head
 
     try:
         # Step 2: call shared ensemble committee logic
-        # We wrap this in to_thread because it involves synchronous network calls (LLM) 
-        # and vectorstore queries.
-        from tools.rag_core import run_ensemble_committee
-        result = await asyncio.to_thread(
-            run_ensemble_committee,
+        # Retrieval runs in a worker thread; the LLM call is async on the pooled session
+        # (LLM_MAX_CONCURRENCY), so in-flight ensembles don't each hold a thread.
+        result = await arun_ensemble_committee(
             vectorstore,
             req.query.strip(),
             bridge,
@@ -834,6 +652,54 @@ async def rag_ensemble(req: EnsembleRequest, authorization: Optional[str] = Head
         print(f"Ensemble error: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"ensemble llm error: {e}")
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/rag/ensemble/stream")
+async def rag_ensemble_stream(req: EnsembleRequest, authorization: Optional[str] = Header(None)):
+    """
+    Server-sent events variant of /api/rag/ensemble:
+    - event: retrieval  {experts, rule_hits}   (right after retrieval)
+    - event: delta      {text}                  (LLM token chunks)
+    - event: final      TieredEnsembleResponse  (after adjudication)
+    - event: error      {detail}
+    """
+    token = _require_bearer_token(authorization)
+    if not req.query or not req.query.strip():
+        raise HTTPException(status_code=400, detail="query is required")
+    if vectorstore is None:
+        raise HTTPException(status_code=503, detail="Vectorstore not ready")
+
+    bridge = LLMBridge()
+    if token.startswith("sk-") or token.startswith("or-"):
+        bridge.set_api_key(token)
+
+    async def _events():
+        try:
+            async for event, data in astream_ensemble_committee(
+                vectorstore,
+                req.query.strip(),
+                bridge,
+                req.top_n_rules,
+                req.top_k_experts,
+            ):
+                if event == "final":
+                    data = TieredEnsembleResponse(**data).model_dump()
+                yield _sse(event, data)
+        except Exception as e:
+            print(f"Ensemble stream error: {e}")
+            yield _sse("error", {"detail": f"{type(e).__name__}: {e}"})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.on_event("startup")
 async def startup_event():
     global vectorstore, vectorstore_init_task
@@ -845,6 +711,13 @@ async def startup_event():
         global vectorstore, VECTORSTORE_STATUS
 
         def _sync_init():
+            if os.getenv("IMH_VECTORSTORE_SYNC", "1").strip() != "0":
+                # 增量同步：只重算新增/变更的分块（manifest: chunk_id/rule_id + 内容哈希）
+                vs, stats = open_and_sync(PERSIST_DIR)
+                VECTORSTORE_STATUS["last_sync"] = dict(stats, ts=time.time())
+                print(f"向量库增量同步完成: {stats}")
+                return vs
+
             vs = None
             if os.path.exists(PERSIST_DIR):
                 print("发现已持久化的向量库，正在加载...")
@@ -893,6 +766,66 @@ async def startup_event():
     if vectorstore_init_task is None or vectorstore_init_task.done():
         vectorstore_init_task = asyncio.create_task(_init_vectorstore_bg())
 
+    # long-lived realtime feature pipeline: one pooled session for all auto-fill calls,
+    # plus background refresh (stale-while-revalidate) unless IMH_REALTIME_REFRESH=0
+    try:
+        from .realtime_data import get_pipeline
+        pipeline = get_pipeline()
+        await pipeline.start()
+        if os.getenv("IMH_REALTIME_REFRESH", "1").strip().lower() not in ("0", "false", "no"):
+            pipeline.start_scheduler()
+    except Exception as e:
+        print(f"⚠️ 實時數據管道啟動失敗：{e}")
+
+
+_vectorstore_sync_lock = asyncio.Lock()
+
+
+@app.post("/api/admin/vectorstore/sync", response_model=Dict[str, Any])
+async def admin_vectorstore_sync(full: bool = False, dry_run: bool = False, authorization: Optional[str] = Header(None)):
+    """
+    Incremental re-embed after editing investors/*.md or decision rules
+    (same as scripts/sync_vectorstore.py). full=true forces a rebuild.
+    """
+    global vectorstore
+    _require_admin_token(authorization)
+    if VECTORSTORE_STATUS.get("state") == "loading" or _vectorstore_sync_lock.locked():
+        raise HTTPException(status_code=409, detail="Vectorstore is loading or a sync is already running")
+
+    async with _vectorstore_sync_lock:
+        try:
+            if vectorstore is None:
+                vs, stats = await asyncio.to_thread(open_and_sync, PERSIST_DIR, full, dry_run)
+                if not dry_run:
+                    vectorstore = vs
+                    VECTORSTORE_STATUS["state"] = "ready"
+                    VECTORSTORE_STATUS["last_success_ts"] = time.time()
+            else:
+                vs = vectorstore
+                stats = await asyncio.to_thread(
+                    lambda: sync_vectorstore(vs, build_corpus(), PERSIST_DIR, full=full, dry_run=dry_run)
+                )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"vectorstore sync failed: {type(e).__name__}: {e}")
+
+    if not dry_run:
+        VECTORSTORE_STATUS["last_sync"] = dict(stats, ts=time.time())
+    return dict(stats, doc_count=_get_vectorstore_doc_count(vectorstore))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # close pooled keep-alive LLM connections (LLMBridge.acall_chat)
+    await aclose_async_pool()
+    try:
+        from .realtime_data import get_pipeline
+        await get_pipeline().stop()
+    except Exception as e:
+        print(f"⚠️ 實時數據管道關閉失敗：{e}")
+    # drain + fsync queued audit records
+    if _audit_sink is not None:
+        await asyncio.to_thread(_audit_sink.stop)
+
 @app.get("/health")
 async def health():
     # persistent dir stats (best-effort)
@@ -912,6 +845,11 @@ async def health():
             pass
 
     doc_count = _get_vectorstore_doc_count(vectorstore)
+    try:
+        from .realtime_data import get_pipeline
+        realtime = get_pipeline().feature_status()
+    except Exception:
+        realtime = None
     return {
         "status": "ok",
         "vectorstore_ready": vectorstore is not None,
@@ -921,6 +859,11 @@ async def health():
         "persist_dir_exists": persist_exists,
         "persist_dir_file_count": file_count,
         "persist_dir_total_bytes": total_bytes,
+        "embedding_cache": get_embedding_cache().stats(),
+        "config": {"version": CONFIG.version_hash(), "files": CONFIG.status()},
+        "realtime_features": realtime,
+        "audit_sink": _audit_sink.stats() if _audit_sink is not None else None,
+        "gate_cache": get_gate_cache().stats(),
     }
 
 
@@ -933,11 +876,10 @@ async def health_alias():
 
 @app.get("/api/policy/scenarios")
 async def get_scenarios():
-    if not SCENARIOS_PATH.exists():
-        return {"scenarios": []}
+    _register_configs()
     try:
-        data = yaml.safe_load(SCENARIOS_PATH.read_text(encoding="utf-8")) or {}
-        return data
+        data = CONFIG.get("scenarios")
+        return data if data else {"scenarios": []}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -947,113 +889,170 @@ async def save_scenarios(req: SaveScenariosRequest):
     try:
         data = {"scenarios": req.scenarios}
         SCENARIOS_PATH.write_text(yaml.dump(data, allow_unicode=True, sort_keys=False), encoding="utf-8")
+        CONFIG.invalidate("scenarios")
         return {"status": "success", "count": len(req.scenarios)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _check_expectations(expectations: Dict[str, Any], overlay: RiskOverlay) -> Tuple[bool, List[str]]:
+    details: List[str] = []
+    passed = True
+    for key, exp in expectations.items():
+        op = str(exp.get("op") or "").strip()
+        val = _safe_float(exp.get("value"))
+        tol = _safe_float(exp.get("tol"))
+        scope = str(exp.get("scope") or "").strip().lower()  # multipliers | absolute | ""
+        if not op or val is None:
+            continue
+
+        # Default: risk_multiplier is a multiplier; other guardrail keys are absolute.
+        if scope == "multipliers":
+            actual = _safe_float(overlay.multipliers.get(key))
+        elif scope == "absolute":
+            actual = _safe_float(overlay.absolute.get(key))
+        else:
+            if key == "risk_multiplier":
+                actual = _safe_float(overlay.multipliers.get(key))
+            else:
+                actual = _safe_float(overlay.absolute.get(key))
+                if actual is None:
+                    actual = _safe_float(overlay.multipliers.get(key))
+
+        if actual is None:
+            details.append(f"❌ {key}: 预期 {op} {val}, 但输出中未找到该指标")
+            passed = False
+            continue
+
+        if _cmp_expectation(op, actual, val, tol=tol):
+            if op in ("~", "≈", "approx"):
+                details.append(f"✅ {key}: 预期 {op} {val} ± {tol if tol is not None else 0.05}, 实际 {actual}")
+            else:
+                details.append(f"✅ {key}: 预期 {op} {val}, 实际 {actual}")
+        else:
+            if op in ("~", "≈", "approx"):
+                details.append(f"❌ {key}: 预期 {op} {val} ± {tol if tol is not None else 0.05}, 实际 {actual}")
+            else:
+                details.append(f"❌ {key}: 预期 {op} {val}, 实际 {actual}")
+            passed = False
+    return passed, details
+
+
+VALIDATE_CONCURRENCY = int(os.getenv("IMH_VALIDATE_CONCURRENCY", "8"))
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+
 @app.post("/api/policy/validate_all", response_model=ValidationReport)
-async def validate_all_scenarios():
-    if not SCENARIOS_PATH.exists():
-        return ValidationReport(total=0, passed_count=0, failed_count=0, items=[])
-    
+async def validate_all_scenarios(auto_fill_features: bool = True):
+    """
+    Run every scenario in config/scenarios.yaml through the Policy Gate and check expectations.
+
+    Validation mode: one realtime feature fetch and one batched rule retrieval shared by all
+    scenarios, scenarios evaluated concurrently (IMH_VALIDATE_CONCURRENCY), no audit records.
+    Reports per-scenario elapsed_ms plus the shared stages in `timing`.
+    """
+    t_start = time.perf_counter()
+    _register_configs()
     try:
-        scen_data = yaml.safe_load(SCENARIOS_PATH.read_text(encoding="utf-8")) or {}
+        scen_data = CONFIG.get("scenarios")
         scenarios = scen_data.get("scenarios", []) or []
+        if not scenarios:
+            return ValidationReport(total=0, passed_count=0, failed_count=0, items=[])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load scenarios: {e}")
 
-    items = []
-    passed_count = 0
-    
-    for s in scenarios:
-        sid = s.get("id", "unknown")
-        label = s.get("label", sid)
-        expectations = s.get("expectations", {}) or {}
-        
-        # Prepare request
-        gate_req = PolicyGateRequest(
+    # copies: auto-fill must not write into the cached scenarios config
+    gate_reqs = [
+        PolicyGateRequest(
             text=s.get("description") or s.get("label") or "",
-            features=s.get("features", {}),
-            portfolio_state=s.get("portfolio_state", {}),
+            features=dict(s.get("features", {}) or {}),
+            portfolio_state=dict(s.get("portfolio_state", {}) or {}),
             constraints={},
             top_k_router=5,
-            top_k_rule_hits=5
+            top_k_rule_hits=5,
         )
-        
+        for s in scenarios
+    ]
+    runnable = [i for i, r in enumerate(gate_reqs) if r.text and r.text.strip()]
+    timing: Dict[str, float] = {}
+
+    # 1) one realtime feature fetch for all scenarios
+    t0 = time.perf_counter()
+    if auto_fill_features and vectorstore is not None:
+        if any(f not in gate_reqs[i].features for i in runnable for f in AUTO_FILL_FIELDS):
+            realtime = await _fetch_realtime_features()
+            for i in runnable:
+                _fill_missing_features(gate_reqs[i].features, realtime, verbose=False)
+    timing["features_ms"] = _ms(t0)
+
+    # 2) one batched rule retrieval for all scenarios
+    t0 = time.perf_counter()
+    rule_hits: Dict[int, List[EvidenceItem]] = {}
+    shared_error: Optional[HTTPException] = None
+    if vectorstore is None:
+        shared_error = HTTPException(status_code=503, detail="Vectorstore not ready")
+    elif runnable:
+        batch = [
+            {"query": _policy_gate_query_text(gate_reqs[i]), "k": gate_reqs[i].top_k_rule_hits, "filter_dict": {"source_type": "rule"}}
+            for i in runnable
+        ]
         try:
-            # We call the existing endpoint logic internally
-            res = await policy_gate(gate_req)
-            
-            details = []
-            passed = True
-            
-            # Helper to check expectations
-            for key, exp in expectations.items():
-                op = str(exp.get("op") or "").strip()
-                val = _safe_float(exp.get("value"))
-                tol = _safe_float(exp.get("tol"))
-                scope = str(exp.get("scope") or "").strip().lower()  # multipliers | absolute | ""
-                if not op or val is None:
-                    continue
-
-                # Default: risk_multiplier is a multiplier; other guardrail keys are absolute.
-                if scope == "multipliers":
-                    actual = _safe_float(res.risk_overlay.multipliers.get(key))
-                elif scope == "absolute":
-                    actual = _safe_float(res.risk_overlay.absolute.get(key))
-                else:
-                    if key == "risk_multiplier":
-                        actual = _safe_float(res.risk_overlay.multipliers.get(key))
-                    else:
-                        actual = _safe_float(res.risk_overlay.absolute.get(key))
-                        if actual is None:
-                            actual = _safe_float(res.risk_overlay.multipliers.get(key))
-
-                if actual is None:
-                    details.append(f"❌ {key}: 预期 {op} {val}, 但输出中未找到该指标")
-                    passed = False
-                    continue
-
-                if _cmp_expectation(op, actual, val, tol=tol):
-                    if op in ("~", "≈", "approx"):
-                        details.append(f"✅ {key}: 预期 {op} {val} ± {tol if tol is not None else 0.05}, 实际 {actual}")
-                    else:
-                        details.append(f"✅ {key}: 预期 {op} {val}, 实际 {actual}")
-                else:
-                    if op in ("~", "≈", "approx"):
-                        details.append(f"❌ {key}: 预期 {op} {val} ± {tol if tol is not None else 0.05}, 实际 {actual}")
-                    else:
-                        details.append(f"❌ {key}: 预期 {op} {val}, 实际 {actual}")
-                    passed = False
-            
-            if passed:
-                passed_count += 1
-                
-            items.append(ValidationItem(
-                scenario_id=sid,
-                label=label,
-                passed=passed,
-                details=details,
-                results={
-                    "regime": res.regime,
-                    "risk_overlay": res.risk_overlay.model_dump()
-                }
-            ))
-            
+            results = await asyncio.to_thread(query_vectorstore_batch, vectorstore, batch)
+            rule_hits = {i: _to_evidence_items(hits) for i, hits in zip(runnable, results)}
         except Exception as e:
-            items.append(ValidationItem(
-                scenario_id=sid,
-                label=label,
-                passed=False,
-                details=[f"🔥 系统错误: {e}"]
-            ))
+            shared_error = HTTPException(status_code=500, detail=f"policy gate rag error: {e}")
+    timing["retrieval_ms"] = _ms(t0)
+
+    engine = _get_policy_engine()
+    sem = asyncio.Semaphore(max(1, VALIDATE_CONCURRENCY))
+
+    async def _validate_one(i: int, s: Dict[str, Any]) -> ValidationItem:
+        sid = s.get("id", "unknown")
+        label = s.get("label", sid)
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                if i not in runnable:
+                    raise HTTPException(status_code=400, detail="text is required")
+                if shared_error is not None:
+                    raise shared_error
+                res = await asyncio.to_thread(_evaluate_policy_gate, gate_reqs[i], engine, rule_hits.get(i, []), False)
+                passed, details = _check_expectations(s.get("expectations", {}) or {}, res.risk_overlay)
+                return ValidationItem(
+                    scenario_id=sid,
+                    label=label,
+                    passed=passed,
+                    details=details,
+                    results={
+                        "regime": res.regime,
+                        "risk_overlay": res.risk_overlay.model_dump()
+                    },
+                    elapsed_ms=_ms(t0),
+                )
+            except Exception as e:
+                return ValidationItem(
+                    scenario_id=sid,
+                    label=label,
+                    passed=False,
+                    details=[f"🔥 系统错误: {e}"],
+                    elapsed_ms=_ms(t0),
+                )
+
+    t0 = time.perf_counter()
+    items = await asyncio.gather(*[_validate_one(i, s) for i, s in enumerate(scenarios)])
+    timing["scenarios_ms"] = _ms(t0)
+    passed_count = sum(1 for it in items if it.passed)
 
     return ValidationReport(
         total=len(scenarios),
         passed_count=passed_count,
         failed_count=len(scenarios) - passed_count,
-        items=items
+        items=items,
+        elapsed_ms=_ms(t_start),
+        timing=timing,
     )
 
 
@@ -1067,11 +1066,7 @@ async def route(req: RouteRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/query", response_model=List[QueryResponse])
-async def query(req: QueryRequest):
-    if vectorstore is None:
-        raise HTTPException(status_code=503, detail="Vectorstore not ready")
-
+def _build_query_filter(req: QueryRequest) -> Optional[Dict[str, Any]]:
     # 构建过滤器 (Chroma 语法)
     filters = []
     if req.investor_id:
@@ -1086,18 +1081,30 @@ async def query(req: QueryRequest):
         filter_dict = filters[0]
     elif len(filters) > 1:
         filter_dict = {"$and": filters}
+    return filter_dict
+
+
+def _to_query_responses(results: List[Any]) -> List[QueryResponse]:
+    responses = []
+    for doc, score in results:
+        responses.append(QueryResponse(
+            content=doc.page_content,
+            metadata=doc.metadata,
+            similarity_estimate=round(1 - score, 4)
+        ))
+    return responses
+
+
+@app.post("/query", response_model=List[QueryResponse])
+async def query(req: QueryRequest):
+    if vectorstore is None:
+        raise HTTPException(status_code=503, detail="Vectorstore not ready")
+
+    filter_dict = _build_query_filter(req)
 
     try:
         results = query_vectorstore(vectorstore, req.query, k=req.top_k, filter_dict=filter_dict)
-        
-        responses = []
-        for doc, score in results:
-            responses.append(QueryResponse(
-                content=doc.page_content,
-                metadata=doc.metadata,
-                similarity_estimate=round(1 - score, 4)
-            ))
-        return responses
+        return _to_query_responses(results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1112,153 +1119,33 @@ async def query_alias(req: QueryRequest, authorization: Optional[str] = Header(N
     return await query(req)
 
 
-def _score_regimes(policy: Dict[str, Any], features: Dict[str, float]) -> Dict[str, Any]:
-    regimes = policy.get("regimes", []) or []
-    scores: Dict[str, float] = {}
-    reasons: Dict[str, List[str]] = {}
+QUERY_BATCH_MAX = 512
 
-    for r in regimes:
-        rid = r.get("id")
-        if not rid:
-            continue
-        total = 0.0
-        rs: List[str] = []
-        for rule in (r.get("rules", []) or []):
-            feat = rule.get("feature")
-            op = rule.get("op")
-            val = _safe_float(rule.get("value"))
-            w = _safe_float(rule.get("weight")) or 0.0
-            if not feat or not op or val is None:
-                continue
-            fv = _safe_float(features.get(str(feat)))
-            if fv is None:
-                continue
-            if _cmp(str(op), fv, val):
-                total += w
-                rs.append(f"{feat} {op} {val} (got {fv})")
-        if total > 0:
-            scores[rid] = total
-            reasons[rid] = rs
-
-    if not scores:
-        return {"id": "neutral", "label": "中性 / Neutral", "score": 0.0, "confidence": 0.0, "reasons": []}
-
-    best_id, best_score = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[0]
-    # confidence: normalized by sum
-    ssum = sum(scores.values())
-    conf = (best_score / ssum) if ssum > 0 else 0.0
-    label = best_id
-    for r in regimes:
-        if r.get("id") == best_id and r.get("label"):
-            label = r.get("label")
-            break
-
-    return {"id": best_id, "label": label, "score": round(best_score, 4), "confidence": round(conf, 4), "reasons": reasons.get(best_id, [])}
-
-
-def _compute_overlay(policy: Dict[str, Any], regime_id: str, scenarios: List[str], portfolio_state: Dict[str, float], constraints: Dict[str, float]) -> Dict[str, Any]:
-    base = (policy.get("base_guardrails", {}) or {}).copy()
-    clamps = policy.get("clamps", {}) or {}
-
-    regime_overlays = policy.get("regime_overlays", {}) or {}
-    overlay = (regime_overlays.get(regime_id) or regime_overlays.get("neutral") or {}).copy()
-
-    # Start multipliers
-    multipliers: Dict[str, float] = {}
-    for k in ["risk_multiplier", "max_leverage", "min_cash", "max_invest", "max_turnover", "max_corr"]:
-        multipliers[k] = float(_safe_float(overlay.get(k)) or 1.0)
-
-    # Scenario tweaks
-    scen_over = policy.get("scenario_overlays", {}) or {}
-    for s in scenarios:
-        m = scen_over.get(s) or {}
-        for k in ["max_leverage", "min_cash", "max_invest", "max_turnover", "max_corr"]:
-            if k in m:
-                multipliers[k] *= float(_safe_float(m.get(k)) or 1.0)
-
-    # Portfolio pressure tweaks
-    port_rules = policy.get("portfolio_overlays", {}) or {}
-    for feat, rules in port_rules.items():
-        pv = _safe_float(portfolio_state.get(str(feat)))
-        if pv is None:
-            continue
-        for rule in (rules or []):
-            op = str(rule.get("op") or "")
-            val = _safe_float(rule.get("value"))
-            if not op or val is None:
-                continue
-            if _cmp(op, pv, val):
-                for k in ["max_leverage", "min_cash", "max_invest", "max_turnover", "max_corr"]:
-                    if k in rule:
-                        multipliers[k] *= float(_safe_float(rule.get(k)) or 1.0)
-
-    # Build absolute guardrails
-    absolute: Dict[str, float] = {}
-    for k in ["max_leverage", "min_cash", "max_invest", "max_turnover", "max_corr"]:
-        b = float(_safe_float(base.get(k)) or 0.0)
-        abs_val = b * float(multipliers.get(k, 1.0))
-
-        c = clamps.get(k) or {}
-        lo = float(_safe_float(c.get("min")) or 0.0)
-        hi = float(_safe_float(c.get("max")) or 1e9)
-        abs_val = _clamp(abs_val, lo, hi)
-
-        # Apply user constraints if present
-        # Convention:
-        # - min_* means lower bound; max_* means upper bound
-        if k.startswith("min_"):
-            user_min = _safe_float(constraints.get(k))
-            if user_min is not None:
-                abs_val = max(abs_val, user_min)
-        else:
-            user_max = _safe_float(constraints.get(k))
-            if user_max is not None:
-                abs_val = min(abs_val, user_max)
-
-        absolute[k] = round(abs_val, 6)
 
-    multipliers = {k: round(v, 6) for k, v in multipliers.items()}
-    return {"multipliers": multipliers, "absolute": absolute}
-
-
-@app.post("/api/policy/gate", response_model=PolicyGateResponse)
-async def policy_gate(req: PolicyGateRequest, auto_fill_features: bool = True):
+@app.post("/api/rag/query_batch", response_model=List[List[QueryResponse]])
+async def query_batch(reqs: List[QueryRequest], authorization: Optional[str] = Header(None)):
     """
-    Policy Gate - 評估市場狀態並提供風險調整建議
-    
-    Args:
-        req: PolicyGateRequest (text, features, portfolio_state, constraints)
-        auto_fill_features: 是否自動填充缺失的市場特徵 (從實時數據)
+    Batch version of /api/rag/query for bulk evaluation jobs.
+    All queries are embedded in one call and searched once per distinct filter;
+    results are returned in request order.
     """
-    if not req.text or not req.text.strip():
-        raise HTTPException(status_code=400, detail="text is required")
-
+    _maybe_require_token(authorization)
     if vectorstore is None:
         raise HTTPException(status_code=503, detail="Vectorstore not ready")
-    
-    # 自動填充缺失的市場特徵
-    if auto_fill_features:
-        features = await _auto_fill_features(req.features or {})
-        req.features = features
-
-    policy = _load_policy()
-    regime = _score_regimes(policy, req.features or {})
-
-    scenarios = _match_scenarios(req.text)
-    scenario_info = {
-        "matched": scenarios,
-        "primary": (scenarios[0] if scenarios else None),
-        "count": len(scenarios),
-    }
+    if len(reqs) > QUERY_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many queries (max {QUERY_BATCH_MAX})")
 
-    router_raw = _route_investors(req.text, top_k=req.top_k_router)
-    router = [RouteResponse(**x) for x in router_raw]
+    batch = [{"query": r.query, "k": r.top_k, "filter_dict": _build_query_filter(r)} for r in reqs]
+    try:
+        results = await asyncio.to_thread(query_vectorstore_batch, vectorstore, batch)
+        return [_to_query_responses(hits) for hits in results]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    overlay = _compute_overlay(policy, regime.get("id") or "neutral", scenarios, req.portfolio_state or {}, req.constraints or {})
 
-    # RAG rule hits (source_type=rule)
+def _policy_gate_query_text(req: PolicyGateRequest) -> str:
+    """RAG query for rule hits: text + compact feature / portfolio summary (keeps it explainable)."""
     query_text = req.text
-    # augment query with compact feature + portfolio summary (keeps it explainable)
     try:
         f_summary = ", ".join([f"{k}={v}" for k, v in (req.features or {}).items()][:12])
         p_summary = ", ".join([f"{k}={v}" for k, v in (req.portfolio_state or {}).items()][:12])
@@ -1268,20 +1155,86 @@ async def policy_gate(req: PolicyGateRequest, auto_fill_features: bool = True):
             query_text += f"\nPORTFOLIO: {p_summary}"
     except Exception:
         pass
+    return query_text
+
 
+def _to_evidence_items(results: List[Any]) -> List[EvidenceItem]:
+    return [
+        EvidenceItem(
+            content=doc.page_content,
+            metadata=doc.metadata,
+            similarity_estimate=round(1 - score, 4),
+        )
+        for doc, score in results
+    ]
+
+
+def _write_gate_audit(
+    audit: Dict[str, Any], overlay: Dict[str, Any], router: List[RouteResponse], rule_hits: List[EvidenceItem]
+) -> Optional[Dict[str, Any]]:
+    """Minimal audit log (JSONL): queued for the batched background writer (no disk I/O here)."""
     try:
-        results = query_vectorstore(vectorstore, query_text, k=req.top_k_rule_hits, filter_dict={"source_type": "rule"})
-        rule_hits: List[EvidenceItem] = []
-        for doc, score in results:
-            rule_hits.append(
-                EvidenceItem(
-                    content=doc.page_content,
-                    metadata=doc.metadata,
-                    similarity_estimate=round(1 - score, 4),
-                )
-            )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"policy gate rag error: {e}")
+        record = {
+            **audit,
+            "overlay": overlay,
+            "router": [r.model_dump() for r in router[: min(len(router), 10)]],
+            "rule_hits_meta": [
+                {
+                    "investor_id": (h.metadata or {}).get("investor_id"),
+                    "rule_id": (h.metadata or {}).get("rule_id"),
+                    "kind": (h.metadata or {}).get("kind"),
+                    "source": (h.metadata or {}).get("source"),
+                    "title_hint": (h.metadata or {}).get("title_hint"),
+                    "similarity_estimate": h.similarity_estimate,
+                }
+                for h in rule_hits[: min(len(rule_hits), 20)]
+            ],
+        }
+        get_audit_sink().submit(record)
+        return record
+    except Exception:
+        # Never fail trading/analytics because logging failed
+        return None
+
+
+def _gate_input_hash(req: PolicyGateRequest) -> str:
+    return _hash_input({
+        "text": req.text,
+        "features": req.features,
+        "portfolio_state": req.portfolio_state,
+        "constraints": req.constraints,
+    })
+
+
+def _vectorstore_version() -> Tuple[Any, ...]:
+    """Changes whenever the live vectorstore is replaced or re-synced (gate cache invalidation)."""
+    last_sync = VECTORSTORE_STATUS.get("last_sync") or {}
+    return (id(vectorstore), VECTORSTORE_STATUS.get("last_success_ts"), last_sync.get("ts"))
+
+
+def _evaluate_policy_gate(
+    req: PolicyGateRequest,
+    engine: CompiledPolicy,
+    rule_hits: List[EvidenceItem],
+    write_audit: bool = True,
+) -> PolicyGateResponse:
+    """
+    Deterministic part of the gate (regime, scenarios, router, overlay, explanation, audit)
+    on already-filled features and already-retrieved rule hits.
+    """
+    regime = engine.score(req.features or {})
+
+    scenarios = _match_scenarios(req.text)
+    scenario_info = {
+        "matched": scenarios,
+        "primary": (scenarios[0] if scenarios else None),
+        "count": len(scenarios),
+    }
+
+    router_raw = _route_investors(req.text, top_k=req.top_k_router)
+    router = [RouteResponse(**x) for x in router_raw]
+
+    overlay = engine.overlay(regime.get("id") or "neutral", scenarios, req.portfolio_state or {}, req.constraints or {})
 
     # Human-friendly narrative
     md_lines = []
@@ -1318,41 +1271,16 @@ async def policy_gate(req: PolicyGateRequest, auto_fill_features: bool = True):
 
     audit = {
         "ts": int(__import__("time").time()),
-        "policy_hash": _policy_cache_hash,
-        "input_hash": _hash_input({
-            "text": req.text,
-            "features": req.features,
-            "portfolio_state": req.portfolio_state,
-            "constraints": req.constraints,
-        }),
+        "policy_hash": CONFIG.version("policy"),
+        "config_version": CONFIG.version_hash(),
+        "input_hash": _gate_input_hash(req),
         "regime": regime,
         "scenario": scenario_info,
     }
 
-    # Minimal audit log (JSONL): safe, local, append-only
-    try:
-        AUDIT_DIR.mkdir(parents=True, exist_ok=True)
-        record = {
-            **audit,
-            "overlay": overlay,
-            "router": [r.model_dump() for r in router[: min(len(router), 10)]],
-            "rule_hits_meta": [
-                {
-                    "investor_id": (h.metadata or {}).get("investor_id"),
-                    "rule_id": (h.metadata or {}).get("rule_id"),
-                    "kind": (h.metadata or {}).get("kind"),
-                    "source": (h.metadata or {}).get("source"),
-                    "title_hint": (h.metadata or {}).get("title_hint"),
-                    "similarity_estimate": h.similarity_estimate,
-                }
-                for h in rule_hits[: min(len(rule_hits), 20)]
-            ],
-        }
-        with AUDIT_PATH.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-    except Exception:
-        # Never fail trading/analytics because logging failed
-        pass
+    # Minimal audit log (JSONL); validation runs skip it
+    if write_audit:
+        _write_gate_audit(audit, overlay, router, rule_hits)
 
     return PolicyGateResponse(
         regime=regime,
@@ -1365,6 +1293,222 @@ async def policy_gate(req: PolicyGateRequest, auto_fill_features: bool = True):
     )
 
 
+@app.post("/api/policy/gate", response_model=PolicyGateResponse)
+async def policy_gate(req: PolicyGateRequest, auto_fill_features: bool = True):
+    """
+    Policy Gate - 評估市場狀態並提供風險調整建議
+    
+    Args:
+        req: PolicyGateRequest (text, features, portfolio_state, constraints)
+        auto_fill_features: 是否自動填充缺失的市場特徵 (從實時數據)
+    """
+    if not req.text or not req.text.strip():
+        raise HTTPException(status_code=400, detail="text is required")
+
+    if vectorstore is None:
+        raise HTTPException(status_code=503, detail="Vectorstore not ready")
+    
+    # 自動填充缺失的市場特徵
+    if auto_fill_features:
+        features = await _auto_fill_features(req.features or {})
+        req.features = features
+
+    # Whole-response cache: the response only depends on the (auto-filled) input, the
+    # loaded configs (policy / router index / scenarios) and the vectorstore content.
+    # A hit still writes its own audit record (new ts, "cache": "hit").
+    cache = get_gate_cache()
+    cache_key = (_gate_input_hash(req), req.top_k_router, req.top_k_rule_hits)
+    cache_version = (CONFIG.version_hash(), _vectorstore_version())
+    cached = cache.get(cache_key, cache_version)
+    if cached is not None:
+        resp, record = cached
+        now = int(time.time())
+        if record is not None:
+            try:
+                get_audit_sink().submit({**record, "ts": now, "cache": "hit"})
+            except Exception:
+                pass
+        return resp.model_copy(update={"audit": {**resp.audit, "ts": now, "cache": "hit"}})
+
+    engine = _get_policy_engine()
+
+    # RAG rule hits (source_type=rule)
+    try:
+        results = query_vectorstore(vectorstore, _policy_gate_query_text(req), k=req.top_k_rule_hits, filter_dict={"source_type": "rule"})
+        rule_hits = _to_evidence_items(results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"policy gate rag error: {e}")
+
+    resp = _evaluate_policy_gate(req, engine, rule_hits, write_audit=False)
+    record = _write_gate_audit(resp.audit, resp.explanation["json"]["overlay"], resp.router, resp.rule_hits)
+    cache.put(cache_key, cache_version, (resp, record))
+    return resp
+
+
+@app.get("/api/audit/search", response_model=Dict[str, Any])
+async def audit_search(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    regime: Optional[str] = None,
+    policy_hash: Optional[str] = None,
+    investor: Optional[str] = None,
+    rule_id: Optional[str] = None,
+    input_hash: Optional[str] = None,
+    scenario: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    order: str = "desc",
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Policy gate audit search over the sidecar index (no log scan).
+    since/until: epoch seconds or ISO date/datetime (until is exclusive); limit <= 1000.
+    """
+    _maybe_require_token(authorization)
+    try:
+        start_ts, end_ts = parse_time(since), parse_time(until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    index = get_audit_index()
+    return await asyncio.to_thread(
+        index.search,
+        start_ts=start_ts,
+        end_ts=end_ts,
+        regime=regime,
+        policy_hash=policy_hash,
+        investor=investor,
+        rule_id=rule_id,
+        input_hash=input_hash,
+        scenario=scenario,
+        limit=limit,
+        offset=offset,
+        order=order,
+    )
+
+
+REPLAY_MAX_ROWS = int(os.getenv("IMH_REPLAY_MAX_ROWS", "200000"))
+_REPLAY_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.arrow.stream": "arrow",
+}
+
+
+def _replay_rule_hits(rows: List[Dict[str, Any]], table_rows: List[Dict[str, Any]], texts: List[str], top_k: int) -> None:
+    """Optional: rule retrieval per replayed row (one batched vectorstore call per chunk)."""
+    requests = []
+    for text, feats in zip(texts, table_rows):
+        f_summary = ", ".join([f"{k}={v}" for k, v in feats.items()][:12])
+        requests.append({
+            "query": text + (f"\nFEATURES: {f_summary}" if f_summary else ""),
+            "k": top_k,
+            "filter_dict": {"source_type": "rule"},
+        })
+    results = query_vectorstore_batch(vectorstore, requests)
+    for row, hits in zip(rows, results):
+        row["rule_hits_meta"] = [
+            {
+                "investor_id": (doc.metadata or {}).get("investor_id"),
+                "rule_id": (doc.metadata or {}).get("rule_id"),
+                "kind": (doc.metadata or {}).get("kind"),
+                "similarity_estimate": round(1 - score, 4),
+            }
+            for doc, score in hits
+        ]
+
+
+@app.post("/api/policy/gate/replay")
+async def policy_gate_replay(
+    request: Request,
+    format: Optional[str] = None,
+    date_column: str = "date",
+    text: Optional[str] = None,
+    text_column: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    with_reasons: bool = True,
+    with_rule_hits: bool = False,
+    top_k_rule_hits: int = 8,
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Policy Gate replay over a historical feature table (regime + risk overlay per row).
+
+    Body: the table itself -- CSV (default), JSON (columnar or row objects), Parquet or Arrow
+    (format from ?format= or Content-Type). Columns: date_column, policy features,
+    optional portfolio_state (drawdown_pct, leverage) and constraint columns.
+    Scenarios come from `text` (all rows) or `text_column` (per row).
+
+    Response: NDJSON, one line per chunk {"chunk", "rows": [...]}, then {"done": true, ...}.
+    No vector retrieval (unless with_rule_hits=true) and no audit records.
+    """
+    _maybe_require_token(authorization)
+    fmt = (format or _REPLAY_CONTENT_TYPES.get((request.headers.get("content-type") or "").split(";")[0].strip().lower()) or "csv")
+    body = await request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="feature table is required in the request body")
+    try:
+        table = await asyncio.to_thread(read_feature_table, body, fmt)
+    except RuntimeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"cannot read {fmt} table: {e}")
+    if len(table) > REPLAY_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"table too large ({len(table)} rows > {REPLAY_MAX_ROWS})")
+    if text_column and text_column not in table.columns:
+        raise HTTPException(status_code=400, detail=f"text_column not found: {text_column}")
+    if with_rule_hits:
+        if not (text or text_column):
+            raise HTTPException(status_code=400, detail="with_rule_hits requires text or text_column")
+        if vectorstore is None:
+            raise HTTPException(status_code=503, detail="Vectorstore not ready")
+
+    engine = _get_policy_engine()
+    row_texts = [str(t) if isinstance(t, str) else (text or "") for t in table[text_column]] if text_column else None
+    shared_scenarios = _match_scenarios(text) if text else []
+    row_scenarios = [_match_scenarios(t) for t in row_texts] if row_texts is not None else None
+    feature_cols = [c for c in table.columns if c in engine.feature_index]
+    chunk_size = max(1, min(int(chunk_size), 10_000))
+
+    def _lines():
+        t0 = time.perf_counter()
+        total = 0
+        try:
+            chunks = replay_policy(
+                engine,
+                table,
+                date_column=date_column,
+                scenarios=shared_scenarios,
+                row_scenarios=row_scenarios,
+                chunk_size=chunk_size,
+                with_reasons=with_reasons,
+            )
+            for idx, rows in enumerate(chunks):
+                if with_rule_hits:
+                    start = total
+                    feats = table[feature_cols].iloc[start : start + len(rows)].to_dict(orient="records")
+                    feats = [{k: v for k, v in f.items() if v == v and v is not None} for f in feats]
+                    texts = row_texts[start : start + len(rows)] if row_texts is not None else [text or ""] * len(rows)
+                    _replay_rule_hits(rows, feats, texts, top_k_rule_hits)
+                total += len(rows)
+                yield json.dumps({"chunk": idx, "rows": rows}, ensure_ascii=False, default=str) + "\n"
+            yield json.dumps({
+                "done": True,
+                "rows": total,
+                "policy_hash": CONFIG.version("policy"),
+                "elapsed_s": round(time.perf_counter() - t0, 4),
+            }) + "\n"
+        except Exception as e:
+            print(f"Policy replay error: {e}")
+            yield json.dumps({"error": f"{type(e).__name__}: {e}"}) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 # ============================================
 # 反饋 API 端點
 # ============================================
@@ -1399,7 +1543,9 @@ async def submit_feedback(req: FeedbackRequest):
     try:
         collector = get_feedback_collector()
         
-        record = collector.submit_feedback(
+        # SQLite 寫入可能等鎖，放到線程裡避免阻塞事件循環
+        record = await asyncio.to_thread(
+            collector.submit_feedback,
             session_id=req.session_id,
             query=req.query,
             response_id=req.response_id,
@@ -1484,6 +1630,33 @@ if WEB_OUT_DIR.exists():
 # ============================================
 # 實時數據集成
 # ============================================
+AUTO_FILL_FIELDS = ["vix", "inflation", "rates", "treasury_10y", "sp500_pe_ratio"]
+
+
+async def _fetch_realtime_features() -> Dict[str, Any]:
+    """
+    實時數據管道的一次完整抓取（失敗時返回空字典）
+    管道由應用 startup/shutdown 持有（共享連接池），這裡不再逐請求 start/stop。
+    """
+    try:
+        from .realtime_data import get_pipeline
+        pipeline = get_pipeline()
+        return await pipeline.get_all_features() or {}
+    except Exception as e:
+        print(f"⚠️ 自動填充特徵失敗：{e}")
+        return {}
+
+
+def _fill_missing_features(features: Dict[str, float], realtime_features: Dict[str, Any], verbose: bool = True) -> Dict[str, float]:
+    # 只填充缺失的字段 (不覆蓋用戶提供的值)
+    for field in AUTO_FILL_FIELDS:
+        if field not in features and field in realtime_features:
+            features[field] = realtime_features[field]
+            if verbose:
+                print(f"✅ 自動填充 {field}: {realtime_features[field]}")
+    return features
+
+
 async def _auto_fill_features(features: Dict[str, float]) -> Dict[str, float]:
     """
     自動填充缺失的市場特徵
@@ -1501,38 +1674,11 @@ async def _auto_fill_features(features: Dict[str, float]) -> Dict[str, float]:
     Returns:
         填充後的特徵字典
     """
-    # 需要填充的字段
-    required_fields = ["vix", "inflation", "rates", "treasury_10y", "sp500_pe_ratio"]
-    missing_fields = [f for f in required_fields if f not in features]
-    
-    if not missing_fields:
+    if all(f in features for f in AUTO_FILL_FIELDS):
         # 沒有缺失字段，直接返回
         return features
-    
-    try:
-        # 獲取實時數據
-        from .realtime_data import get_pipeline
-        pipeline = get_pipeline()
-        await pipeline.start()
-        
-        try:
-            realtime_features = await pipeline.get_all_features()
-            
-            # 只填充缺失的字段 (不覆蓋用戶提供的值)
-            for field in missing_fields:
-                if field in realtime_features:
-                    features[field] = realtime_features[field]
-                    print(f"✅ 自動填充 {field}: {realtime_features[field]}")
-            
-            return features
-            
-        finally:
-            await pipeline.stop()
-            
-    except Exception as e:
-        print(f"⚠️ 自動填充特徵失敗：{e}")
-        # 降級：返回原始特徵 (不填充)
-        return features
+    # 降級：抓取失敗時返回原始特徵 (不填充)
+    return _fill_missing_features(features, await _fetch_realtime_features())
 
 
 if __name__ == "__main__":
@@ -20,25 +20,85 @@ Investment Masters Handbook - 精簡實時數據管道
 import asyncio
 import aiohttp
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple
 import json
 from pathlib import Path
 import os
+import time
+
+
+FRED_OBSERVATIONS_URL = os.getenv("FRED_API_URL", "https://api.stlouisfed.org/fred/series/observations")
+
+# 各特徵的後台刷新週期（秒）：VIX 盤中高頻，利率/國債每日數次，通膨/估值每日檢查一次
+REFRESH_INTERVALS_S: Dict[str, float] = {
+    "vix": 5 * 60,
+    "rates": 6 * 3600,
+    "treasury_10y": 3600,
+    "inflation": 24 * 3600,
+    "sp500_pe_ratio": 24 * 3600,
+}
+# 刷新失敗後的重試退避（秒）：retry_base * 2^failures，上限 retry_max 且不超過刷新週期
+REFRESH_RETRY_BASE_S = 15.0
+REFRESH_RETRY_MAX_S = 300.0
+
+
+class _FeatureState:
+    def __init__(self, interval_s: float):
+        self.interval_s = float(interval_s)
+        self.value: Optional[float] = None
+        self.fetched_at: Optional[float] = None      # wall clock (展示用)
+        self.fetched_mono: Optional[float] = None    # monotonic (調度用)
+        self.last_attempt_mono: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.failures = 0
+
+    def next_due(self) -> float:
+        if self.last_attempt_mono is None:
+            return 0.0
+        if self.failures:
+            backoff = min(REFRESH_RETRY_BASE_S * (2 ** (self.failures - 1)), REFRESH_RETRY_MAX_S, self.interval_s)
+            return self.last_attempt_mono + backoff
+        return (self.fetched_mono or self.last_attempt_mono) + self.interval_s
 
 
 class RealTimeDataPipeline:
-    """精簡實時數據管道"""
+    """
+    精簡實時數據管道
+
+    - 長生命週期：由 FastAPI 應用 startup/shutdown 持有，一個共享的 aiohttp 連接池（keep-alive）
+    - get_all_features 並發抓取各指標（asyncio.gather），延遲取決於最慢的單個指標
+    - single-flight：同一指標的並發請求合併為一次上游抓取
+    - stale-while-revalidate：後台調度器按各特徵週期主動刷新（start_scheduler）；
+      已有值的特徵直接返回最近一次成功值，過期時只觸發後台刷新，請求不等待上游
+    """
     
-    def __init__(self, cache_dir: str = ".cache/market_data", cache_ttl_hours: int = 24):
+    def __init__(
+        self,
+        cache_dir: str = ".cache/market_data",
+        cache_ttl_hours: int = 24,
+        refresh_intervals_s: Optional[Dict[str, float]] = None,
+    ):
         """
         Args:
             cache_dir: 緩存目錄
             cache_ttl_hours: 緩存過期時間 (小時)
+            refresh_intervals_s: 各特徵後台刷新週期 (秒)，默認 REFRESH_INTERVALS_S
         """
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.cache_ttl = timedelta(hours=cache_ttl_hours)
         self.session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.fred_url = FRED_OBSERVATIONS_URL
+
+        # stale-while-revalidate 狀態
+        overrides = refresh_intervals_s or {}
+        self._features: Dict[str, _FeatureState] = {
+            name: _FeatureState(overrides.get(name, sec)) for name, sec in REFRESH_INTERVALS_S.items()
+        }
+        self._scheduler_task: Optional["asyncio.Task[None]"] = None
+        self._wake: Optional[asyncio.Event] = None
         
         # API Keys (從環境變量讀取)
         self.fred_api_key = os.getenv("FRED_API_KEY")
@@ -49,17 +109,128 @@ class RealTimeDataPipeline:
         self._cache_timestamps: Dict[str, datetime] = {}
     
     async def start(self):
-        """啟動數據管道"""
-        self.session = aiohttp.ClientSession()
-    
+        """啟動數據管道（冪等：已啟動時直接複用同一個連接池）"""
+        loop = asyncio.get_running_loop()
+        if self.session is not None and not self.session.closed and self._session_loop is loop:
+            return
+        # 首次啟動，或原會話屬於已結束的事件循環（無法在當前循環關閉，直接替換）
+        connector = aiohttp.TCPConnector(limit=16, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=15, sock_connect=5),
+        )
+        self._session_loop = loop
+        self._inflight = {}
+
     async def stop(self):
-        """停止數據管道"""
-        if self.session:
-            await self.session.close()
-    
+        """停止數據管道（含後台調度器）"""
+        await self.stop_scheduler()
+        session, self.session = self.session, None
+        self._session_loop = None
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight = {}
+        if session is not None and not session.closed:
+            await session.close()
+
+    def _flight(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        """取得（或創建）key 對應的進行中任務；同步登記，後台觸發與並發調用都能立即看到"""
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+
+            def _done(t: "asyncio.Task[Any]", key: str = key):
+                if self._inflight.get(key) is t:
+                    self._inflight.pop(key, None)
+
+            task.add_done_callback(_done)
+        return task
+
+    async def _single_flight(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """同一 key 的並發調用共享一次 fetch（調用方被取消不影響其他等待者）"""
+        if key not in self._inflight:
+            await self.start()
+        return await asyncio.shield(self._flight(key, fetch))
+
+    def _feature_fetchers(self) -> Dict[str, Any]:
+        """特徵名 -> (single-flight key, 上游抓取函數)；繞過內存緩存，用於刷新"""
+        return {
+            "vix": ("vix", self._fetch_vix),                                                    # 波動率
+            "inflation": ("inflation", self._fetch_inflation_rate),                             # 通膨 (月度)
+            "rates": ("rates", self._fetch_federal_funds_rate),                                 # 利率
+            "treasury_10y": ("treasury_10Y", lambda: self._fetch_treasury_yield("10Y")),        # 國債收益率
+            "sp500_pe_ratio": ("sp500_pe", self._fetch_sp500_pe_ratio),                         # 市場估值
+        }
+
+    async def _refresh(self, name: str) -> Optional[float]:
+        """
+        一次上游抓取（_fetch_* 只走網絡，失敗即拋錯）。成功才更新 fetched_at / failures；
+        失敗時保留舊值、記錄真實錯誤並進入退避。冷啟動且上游失敗時，用文件緩存播種舊值，
+        fetched_at 取文件時間戳（feature_status 如實顯示其 age / stale）。
+        """
+        state = self._features[name]
+        key, fetch = self._feature_fetchers()[name]
+        state.last_attempt_mono = time.monotonic()
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            value = None
+            state.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ 獲取 {name} 失敗：{state.last_error}")
+        else:
+            state.last_error = None if value is not None else "no data"
+        if value is None:
+            state.failures += 1
+            if state.value is None:
+                self._seed_from_file(state, key)
+        else:
+            value = float(value)
+            state.value = value
+            state.fetched_at = time.time()
+            state.fetched_mono = time.monotonic()
+            state.failures = 0
+            self._save_to_cache(key, value, timedelta(seconds=state.interval_s))
+            self._save_to_file(f"{key}.json", value)
+        if self._wake is not None:
+            self._wake.set()
+        return value
+
+    def _seed_from_file(self, state: _FeatureState, key: str):
+        entry = self._load_file_entry(f"{key}.json")
+        if entry is None:
+            return
+        value, saved_at = entry
+        state.value = value
+        state.fetched_at = saved_at
+        state.fetched_mono = time.monotonic() - max(0.0, time.time() - saved_at)
+
+    async def _get_feature(self, name: str, cache_key: str) -> Optional[float]:
+        """單特徵讀取：內存緩存 -> 上游刷新 -> 最近一次成功值（或文件播種的舊值）"""
+        cached = self._get_from_cache(cache_key)
+        if cached is not None:
+            return cached
+        value = await self.refresh_feature(name)
+        return value if value is not None else self._features[name].value
+
+    async def refresh_feature(self, name: str) -> Optional[float]:
+        """抓取一個特徵並更新最近一次成功值；失敗時返回 None，保留舊值並記錄錯誤（single-flight）"""
+        key = self._feature_fetchers()[name][0]
+        return await self._single_flight(key, lambda: self._refresh(name))
+
+    def _refresh_in_background(self, name: str):
+        key = self._feature_fetchers()[name][0]
+        self._flight(key, lambda: self._refresh(name))
+
     async def get_all_features(self) -> Dict[str, float]:
         """
         獲取所有必需特徵 (用於 Policy Gate)
+
+        - 已有值：直接返回最近一次成功值；超過刷新週期則觸發後台刷新（不等待）
+        - 從未抓取過：並發抓取（asyncio.gather），延遲取決於最慢的單個特徵
+        - 抓取過但失敗：不阻塞請求，按退避在後台重試
         
         Returns:
             特徵字典 {
@@ -70,35 +241,79 @@ class RealTimeDataPipeline:
                 ...
             }
         """
+        await self.start()
+        now = time.monotonic()
+        # 冷啟動：尚無值且未失敗過（包括調度器正在進行的首次刷新，single-flight 會合併）
+        cold = [name for name, st in self._features.items() if st.value is None and st.failures == 0]
+        if cold:
+            await asyncio.gather(*(self.refresh_feature(name) for name in cold), return_exceptions=True)
+
         features = {}
-        
-        # 1. VIX (波動率) - 高優先級
-        vix = await self.get_vix()
-        if vix is not None:
-            features["vix"] = vix
-        
-        # 2. 通膨 - 中優先級 (月度數據，可從緩存讀取)
-        inflation = await self.get_inflation_rate()
-        if inflation is not None:
-            features["inflation"] = inflation
-        
-        # 3. 利率 - 高優先級
-        rates = await self.get_federal_funds_rate()
-        if rates is not None:
-            features["rates"] = rates
-        
-        # 4. 國債收益率 (可選)
-        treasury_10y = await self.get_treasury_yield("10Y")
-        if treasury_10y is not None:
-            features["treasury_10y"] = treasury_10y
-        
-        # 5. 市場估值 - 中優先級
-        pe_ratio = await self.get_sp500_pe_ratio()
-        if pe_ratio is not None:
-            features["sp500_pe_ratio"] = pe_ratio
-        
+        for name, st in self._features.items():
+            if name not in cold and st.next_due() <= now:
+                self._refresh_in_background(name)
+            if st.value is not None:
+                features[name] = st.value
         return features
-    
+
+    def feature_status(self) -> Dict[str, Dict[str, Any]]:
+        """各特徵的新鮮度：值、抓取時間、age、刷新週期、是否過期、是否正在刷新、最近錯誤"""
+        now = time.time()
+        fetchers = self._feature_fetchers()
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, st in self._features.items():
+            age = (now - st.fetched_at) if st.fetched_at is not None else None
+            out[name] = {
+                "value": st.value,
+                "fetched_at": st.fetched_at,
+                "age_s": round(age, 3) if age is not None else None,
+                "refresh_interval_s": st.interval_s,
+                "stale": age is None or age > st.interval_s,
+                "refreshing": fetchers[name][0] in self._inflight,
+                "last_error": st.last_error,
+                "failures": st.failures,
+            }
+        return out
+
+    # ============================================
+    # 後台刷新調度器
+    # ============================================
+    def start_scheduler(self):
+        """啟動後台刷新（需在事件循環內調用；重複調用無副作用）"""
+        if self._scheduler_task is not None and not self._scheduler_task.done():
+            return
+        self._scheduler_task = asyncio.ensure_future(self._scheduler_loop())
+
+    async def stop_scheduler(self):
+        task, self._scheduler_task = self._scheduler_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _scheduler_loop(self):
+        await self.start()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                self._wake.clear()
+                now = time.monotonic()
+                fetchers = self._feature_fetchers()
+                for name, st in self._features.items():
+                    if st.next_due() <= now:
+                        self._refresh_in_background(name)
+                # 睡到下一個到期時間；刷新完成（成功或失敗）時提前喚醒重新計算
+                pending = [st.next_due() for name, st in self._features.items() if fetchers[name][0] not in self._inflight]
+                timeout = min(max(min(pending, default=now + 60.0) - time.monotonic(), 0.01), 60.0)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wake = None
+
     # ============================================
     # VIX 波動率
     # ============================================
@@ -109,37 +324,26 @@ class RealTimeDataPipeline:
         Returns:
             VIX 數值，例如 15.2
         """
-        # 嘗試從緩存讀取
-        cached = self._get_from_cache("vix")
-        if cached is not None:
-            return cached
-        
-        try:
-            # 使用 yfinance 獲取 VIX
-            import yfinance as yf
-            loop = asyncio.get_event_loop()
-            vix_data = await loop.run_in_executor(
-                None,
-                lambda: yf.Ticker("^VIX")
-            )
-            
-            # 獲取最新價格
-            if hasattr(vix_data, 'history'):
-                history = await loop.run_in_executor(
-                    None,
-                    lambda: vix_data.history(period="1d")
-                )
-                if not history.empty:
-                    vix = history['Close'].iloc[-1]
-                    self._save_to_cache("vix", vix, timedelta(minutes=5))
-                    return vix
-            
-            # 備選：從快取文件讀取
-            return self._load_from_file("vix.json")
-            
-        except Exception as e:
-            print(f"⚠️ 獲取 VIX 失敗：{e}")
-            return self._load_from_file("vix.json")  # 降級：使用本地緩存
+        return await self._get_feature("vix", "vix")
+
+    async def _fetch_vix(self) -> float:
+        """上游抓取（只走網絡，失敗拋錯；降級由 _refresh 處理）"""
+        # 使用 yfinance 獲取 VIX
+        import yfinance as yf
+        loop = asyncio.get_running_loop()
+        vix_data = await loop.run_in_executor(
+            None,
+            lambda: yf.Ticker("^VIX")
+        )
+
+        # 獲取最新價格
+        history = await loop.run_in_executor(
+            None,
+            lambda: vix_data.history(period="1d")
+        )
+        if history.empty:
+            raise RuntimeError("VIX: empty history")
+        return float(history['Close'].iloc[-1])
     
     # ============================================
     # 通膨數據
@@ -151,49 +355,38 @@ class RealTimeDataPipeline:
         Returns:
             通膨率，例如 3.2
         """
-        # 嘗試從緩存讀取 (通膨數據月度更新，緩存 30 天)
-        cached = self._get_from_cache("inflation")
-        if cached is not None:
-            return cached
-        
+        return await self._get_feature("inflation", "inflation")
+
+    async def _fred_latest(self, series_id: str, **extra: Any) -> float:
+        """FRED 單個觀測值（只走網絡；無 API key / 非 200 / 無數據時拋錯）"""
         if not self.fred_api_key:
-            # 無 API key 時使用默認值或本地緩存
-            return self._load_from_file("inflation.json")
-        
-        try:
-            # FRED API: CPIAUCSL (Consumer Price Index)
-            url = "https://api.stlouisfed.org/fred/series/observations"
-            params = {
-                "series_id": "CPIAUCSL",
-                "api_key": self.fred_api_key,
-                "file_type": "json",
-                "limit": 1
-            }
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("observations"):
-                        value = float(data["observations"][0]["value"])
-                        
-                        # 計算 YoY 通膨率 (需要對比一年前)
-                        params["observation_start"] = (datetime.now() - timedelta(days=365)).isoformat()
-                        async with self.session.get(url, params=params) as response_prev:
-                            if response_prev.status == 200:
-                                data_prev = await response_prev.json()
-                                if data_prev.get("observations"):
-                                    value_prev = float(data_prev["observations"][0]["value"])
-                                    inflation_yoy = ((value - value_prev) / value_prev) * 100
-                                    
-                                    self._save_to_cache("inflation", inflation_yoy, timedelta(days=30))
-                                    self._save_to_file("inflation.json", inflation_yoy)
-                                    return inflation_yoy
-            
-            return self._load_from_file("inflation.json")
-            
-        except Exception as e:
-            print(f"⚠️ 獲取通膨數據失敗：{e}")
-            return self._load_from_file("inflation.json")
+            raise RuntimeError("FRED_API_KEY not set")
+        if self.session is None or self.session.closed:
+            await self.start()
+        params = {
+            "series_id": series_id,
+            "api_key": self.fred_api_key,
+            "file_type": "json",
+            "limit": 1,
+            **extra,
+        }
+        async with self.session.get(self.fred_url, params=params) as response:
+            if response.status != 200:
+                raise RuntimeError(f"FRED {series_id}: HTTP {response.status}")
+            data = await response.json()
+        observations = data.get("observations") or []
+        if not observations:
+            raise RuntimeError(f"FRED {series_id}: no observations")
+        return float(observations[0]["value"])
+
+    async def _fetch_inflation_rate(self) -> float:
+        # FRED API: CPIAUCSL (Consumer Price Index)
+        value = await self._fred_latest("CPIAUCSL")
+        # 計算 YoY 通膨率 (需要對比一年前)
+        value_prev = await self._fred_latest(
+            "CPIAUCSL", observation_start=(datetime.now() - timedelta(days=365)).isoformat()
+        )
+        return ((value - value_prev) / value_prev) * 100
     
     # ============================================
     # 利率數據
@@ -205,38 +398,11 @@ class RealTimeDataPipeline:
         Returns:
             利率，例如 4.5
         """
-        # 嘗試從緩存讀取 (利率變化不頻繁，緩存 7 天)
-        cached = self._get_from_cache("rates")
-        if cached is not None:
-            return cached
-        
-        if not self.fred_api_key:
-            return self._load_from_file("rates.json")
-        
-        try:
-            # FRED API: FEDFUNDS (Federal Funds Effective Rate)
-            url = "https://api.stlouisfed.org/fred/series/observations"
-            params = {
-                "series_id": "FEDFUNDS",
-                "api_key": self.fred_api_key,
-                "file_type": "json",
-                "limit": 1
-            }
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("observations"):
-                        rate = float(data["observations"][0]["value"])
-                        self._save_to_cache("rates", rate, timedelta(days=7))
-                        self._save_to_file("rates.json", rate)
-                        return rate
-            
-            return self._load_from_file("rates.json")
-            
-        except Exception as e:
-            print(f"⚠️ 獲取聯邦基金利率失敗：{e}")
-            return self._load_from_file("rates.json")
+        return await self._get_feature("rates", "rates")
+
+    async def _fetch_federal_funds_rate(self) -> float:
+        # FRED API: FEDFUNDS (Federal Funds Effective Rate)
+        return await self._fred_latest("FEDFUNDS")
     
     async def get_treasury_yield(self, maturity: str = "10Y") -> Optional[float]:
         """
@@ -248,47 +414,29 @@ class RealTimeDataPipeline:
         Returns:
             收益率，例如 4.2
         """
-        series_map = {
-            "10Y": "DGS10",
-            "2Y": "DGS2",
-            "3M": "DGS3MO",
-            "30Y": "DGS30"
-        }
-        
-        series_id = series_map.get(maturity, "DGS10")
         cache_key = f"treasury_{maturity}"
-        
-        # 嘗試從緩存讀取
+        if maturity == "10Y":
+            return await self._get_feature("treasury_10y", cache_key)
         cached = self._get_from_cache(cache_key)
         if cached is not None:
             return cached
-        
-        if not self.fred_api_key:
-            return self._load_from_file(f"treasury_{maturity}.json")
-        
         try:
-            url = "https://api.stlouisfed.org/fred/series/observations"
-            params = {
-                "series_id": series_id,
-                "api_key": self.fred_api_key,
-                "file_type": "json",
-                "limit": 1
-            }
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("observations"):
-                        value = float(data["observations"][0]["value"])
-                        self._save_to_cache(cache_key, value, timedelta(days=1))
-                        self._save_to_file(f"treasury_{maturity}.json", value)
-                        return value
-            
-            return self._load_from_file(f"treasury_{maturity}.json")
-            
+            value = await self._single_flight(cache_key, lambda: self._fetch_treasury_yield(maturity))
         except Exception as e:
             print(f"⚠️ 獲取{maturity}國債收益率失敗：{e}")
-            return self._load_from_file(f"treasury_{maturity}.json")
+            return self._load_from_file(f"{cache_key}.json")  # 降級：使用本地緩存
+        self._save_to_cache(cache_key, value, timedelta(days=1))
+        self._save_to_file(f"{cache_key}.json", value)
+        return value
+
+    async def _fetch_treasury_yield(self, maturity: str) -> float:
+        series_map = {
+            "10Y": "DGS10",
+            "2Y": "DGS2",
+            "3M": "DGS3MO",
+            "30Y": "DGS30"
+        }
+        return await self._fred_latest(series_map.get(maturity, "DGS10"))
     
     # ============================================
     # 市場估值
@@ -300,46 +448,32 @@ class RealTimeDataPipeline:
         Returns:
             本益比，例如 22.3
         """
-        # 嘗試從緩存讀取 (每日更新)
-        cached = self._get_from_cache("sp500_pe")
-        if cached is not None:
-            return cached
-        
-        try:
-            # 使用 yfinance 獲取 S&P500 數據
-            import yfinance as yf
-            loop = asyncio.get_event_loop()
-            
-            spy = await loop.run_in_executor(
-                None,
-                lambda: yf.Ticker("SPY")
-            )
-            
-            # 獲取本益比 (需要計算)
-            # 簡化版：使用歷史數據估算
-            history = await loop.run_in_executor(
-                None,
-                lambda: spy.history(period="1mo")
-            )
-            
-            if not history.empty:
-                # 簡化估算 (實際應該使用 Shiller PE 或更精確的數據)
-                # 這裡僅作示範，建議使用 Multpl.com 或類似數據源
-                current_price = history['Close'].iloc[-1]
-                
-                # 使用過去 12 個月平均盈利估算
-                # 注意：這是簡化版，生產環境應使用更精確的數據源
-                estimated_pe = 20.0  # 默認值
-                
-                self._save_to_cache("sp500_pe", estimated_pe, timedelta(days=1))
-                self._save_to_file("sp500_pe.json", estimated_pe)
-                return estimated_pe
-            
-            return self._load_from_file("sp500_pe.json")
-            
-        except Exception as e:
-            print(f"⚠️ 獲取 S&P500 本益比失敗：{e}")
-            return self._load_from_file("sp500_pe.json")
+        return await self._get_feature("sp500_pe_ratio", "sp500_pe")
+
+    async def _fetch_sp500_pe_ratio(self) -> float:
+        # 使用 yfinance 獲取 S&P500 數據
+        import yfinance as yf
+        loop = asyncio.get_running_loop()
+
+        spy = await loop.run_in_executor(
+            None,
+            lambda: yf.Ticker("SPY")
+        )
+
+        # 獲取本益比 (需要計算)
+        # 簡化版：使用歷史數據估算
+        history = await loop.run_in_executor(
+            None,
+            lambda: spy.history(period="1mo")
+        )
+        if history.empty:
+            raise RuntimeError("SPY: empty history")
+
+        # 簡化估算 (實際應該使用 Shiller PE 或更精確的數據)
+        # 這裡僅作示範，建議使用 Multpl.com 或類似數據源
+        # 注意：這是簡化版，生產環境應使用更精確的數據源
+        estimated_pe = 20.0  # 默認值
+        return estimated_pe
     
     # ============================================
     # 緩存管理
@@ -366,8 +500,8 @@ class RealTimeDataPipeline:
                 "timestamp": datetime.now().isoformat()
             }, f)
     
-    def _load_from_file(self, filename: str) -> Optional[Any]:
-        """從文件緩存讀取"""
+    def _load_file_entry(self, filename: str) -> Optional[Tuple[Any, float]]:
+        """從文件緩存讀取 (value, 保存時間 epoch 秒)；不存在或超過 cache_ttl 時返回 None"""
         filepath = self.cache_dir / filename
         if filepath.exists():
             try:
@@ -376,10 +510,15 @@ class RealTimeDataPipeline:
                     # 檢查是否過期
                     timestamp = datetime.fromisoformat(data["timestamp"])
                     if datetime.now() - timestamp < self.cache_ttl:
-                        return data["value"]
+                        return data["value"], timestamp.timestamp()
             except Exception:
                 pass
         return None
+
+    def _load_from_file(self, filename: str) -> Optional[Any]:
+        """從文件緩存讀取"""
+        entry = self._load_file_entry(filename)
+        return entry[0] if entry is not None else None
     
     # ============================================
     # 手動更新緩存
@@ -392,8 +531,10 @@ class RealTimeDataPipeline:
         self._cache.clear()
         self._cache_timestamps.clear()
         
-        # 重新獲取
-        features = await self.get_all_features()
+        # 重新獲取（並發）
+        await self.start()
+        await asyncio.gather(*(self.refresh_feature(name) for name in self._features), return_exceptions=True)
+        features = {name: st.value for name, st in self._features.items() if st.value is not None}
         
         print(f"✅ 刷新完成，獲取 {len(features)} 個指標")
         for key, value in features.items():
@@ -419,11 +560,13 @@ def get_pipeline() -> RealTimeDataPipeline:
 async def get_market_features() -> Dict[str, float]:
     """便捷函數：獲取所有市場特徵"""
     pipeline = get_pipeline()
+    owned = pipeline.session is None  # 服務已持有管道時不要關閉它
     await pipeline.start()
     try:
         return await pipeline.get_all_features()
     finally:
-        await pipeline.stop()
+        if owned:
+            await pipeline.stop()
 
 
 # ============================================
@@ -0,0 +1,149 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from tools.audit_index import AuditIndex, parse_time
+from tools.audit_log import AuditSink, open_segment, segment_paths
+
+
+def _record(i):
+    return {
+        "ts": 1_700_000_000 + i * 60,
+        "input_hash": f"in{i}",
+        "policy_hash": "p1" if i < 150 else "p2",
+        "regime": {"id": ["risk_on", "risk_off", "neutral"][i % 3]},
+        "scenario": {"primary": "inflation" if i % 2 else "recession"},
+        "router": [{"investor_id": "buffett" if i % 4 == 0 else "dalio"}],
+        "rule_hits_meta": [{"investor_id": "munger", "rule_id": f"R{i // 10 % 5}"}] if i % 10 == 0 else [],
+        "pad": "x" * 40,
+    }
+
+
+def _write(path, ids, **kw):
+    sink = AuditSink(path, batch_size=1, rotate_daily=False, **kw)
+    for i in ids:
+        sink.submit(_record(i))
+    sink.stop()
+
+
+def test_filters_and_paging_across_rotated_segments(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    _write(path, range(200), max_bytes=4000, compress=True)
+    assert len(segment_paths(path)) > 3
+
+    idx = AuditIndex(path)
+    assert idx.refresh(force=True)["records"] == 200
+
+    res = idx.search(regime="risk_off", limit=5)
+    assert res["total"] == len([i for i in range(200) if i % 3 == 1])
+    assert [r["input_hash"] for r in res["records"]] == ["in199", "in196", "in193", "in190", "in187"]
+
+    page = idx.search(regime="risk_off", limit=5, offset=5, order="asc")
+    assert [r["input_hash"] for r in page["records"]] == ["in16", "in19", "in22", "in25", "in28"]
+
+    res = idx.search(investor="munger", rule_id="R0", limit=100)
+    assert sorted(r["input_hash"] for r in res["records"]) == sorted(f"in{i}" for i in range(0, 200, 50))
+
+    res = idx.search(start_ts=_record(100)["ts"], end_ts=_record(110)["ts"], policy_hash="p1", scenario="inflation", limit=100)
+    assert [r["input_hash"] for r in res["records"]] == [f"in{i}" for i in range(109, 99, -2)]
+    assert idx.search(input_hash="in42")["records"] == [_record(42)]
+
+
+def test_incremental_refresh_survives_rotation_and_pruning(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    _write(path, range(50))
+    idx = AuditIndex(path)
+    assert idx.refresh(force=True)["records"] == 50
+    assert idx.refresh(force=True)["records"] == 0  # nothing new, nothing re-read
+
+    # appends then rotations (rename + gzip) keep already-indexed entries
+    _write(path, range(50, 120), max_bytes=3000, compress=True)
+    stats = idx.refresh(force=True)
+    assert stats["records"] == 70
+    assert idx.search(limit=1)["total"] == 120
+    assert idx.search(input_hash="in3")["records"] == [_record(3)]
+
+    # a reopened index picks up where it stopped
+    idx.close()
+    idx = AuditIndex(path)
+    assert idx.refresh(force=True)["records"] == 0
+
+    oldest = segment_paths(path)[0]
+    with open_segment(oldest) as f:
+        n_oldest = sum(1 for _ in f)
+    oldest.unlink()
+    assert idx.refresh(force=True)["removed_segments"] == 1
+    assert idx.search(limit=1)["total"] == 120 - n_oldest
+
+
+def test_parse_time():
+    assert parse_time(None) is None and parse_time("") is None
+    assert parse_time(1700000000.5) == 1700000000
+    assert parse_time("1700000000") == 1700000000
+    assert parse_time("2024-01-02") == parse_time("2024-01-02T00:00:00")
+
+
+def test_audit_search_endpoint(monkeypatch, tmp_path):
+    import services.rag_service as rs
+
+    path = tmp_path / "audit.jsonl"
+    _write(path, range(30))
+    monkeypatch.delenv("IMH_API_TOKEN", raising=False)
+    monkeypatch.setattr(rs, "AUDIT_PATH", path)
+    monkeypatch.setattr(rs, "_audit_index", None)
+    client = TestClient(rs.app)
+
+    r = client.get("/api/audit/search", params={"investor": "buffett", "limit": 3, "order": "asc"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total"] == 8
+    assert [rec["input_hash"] for rec in body["records"]] == ["in0", "in4", "in8"]
+
+    r = client.get("/api/audit/search", params={"since": str(_record(25)["ts"])})
+    assert r.json()["total"] == 5
+    assert client.get("/api/audit/search", params={"since": "yesterday"}).status_code == 400
+    assert client.get("/api/audit/search", params={"limit": 0}).status_code == 400
+
+
+def test_identical_records_in_different_segments_keep_their_own_offsets(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    same = dict(_record(7), pad="y" * 200)  # e.g. cache hits for one request within one second
+    idx = AuditIndex(path)
+    sink = AuditSink(path, batch_size=1, rotate_daily=False, max_bytes=2000, compress=True)
+    for i in range(60):
+        sink.submit(same if i < 40 else _record(i))
+        if i % 7 == 0:
+            sink.flush()
+            idx.refresh(force=True)  # interleave refreshes with rotations
+    sink.stop()
+    idx.refresh(force=True)
+
+    on_disk = []
+    for seg in segment_paths(path):
+        with open_segment(seg) as f:
+            on_disk.extend(line for line in f if line.strip())
+    res = idx.search(limit=1000, order="asc")
+    assert res["total"] == len(on_disk) == 60
+    assert res["records"].count(same) == 40
+    assert [r["input_hash"] for r in res["records"][40:]] == [f"in{i}" for i in range(40, 60)]
+
+
+def test_truncated_gzip_segment_is_skipped_until_complete(tmp_path):
+    import gzip
+
+    path = tmp_path / "audit.jsonl"
+    _write(path, range(5))
+    data = b"".join((json.dumps(_record(i)) + "\n").encode() for i in range(100, 110))
+    seg = tmp_path / "audit.20240101-000000.jsonl.gz"
+    full = gzip.compress(data)
+    seg.write_bytes(full[: len(full) // 2])  # compression still running / crashed
+
+    idx = AuditIndex(path)
+    stats = idx.refresh(force=True)
+    assert stats["skipped_segments"] == 1
+    assert idx.search(limit=100)["total"] == 5
+
+    seg.write_bytes(full)
+    idx.refresh(force=True)
+    assert idx.search(limit=100)["total"] == 15
+    assert idx.search(input_hash="in105")["records"] == [_record(105)]
@@ -0,0 +1,129 @@
+import gzip
+import json
+import threading
+from datetime import datetime
+
+from tools.audit_log import AuditSink, open_segment, segment_paths
+
+
+def _read_all(path):
+    rows = []
+    for seg in segment_paths(path):
+        with open_segment(seg) as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+    return rows
+
+
+def test_batches_from_many_threads_without_loss(tmp_path):
+    sink = AuditSink(tmp_path / "audit.jsonl", batch_size=64, fsync_interval_s=0)
+
+    def worker(k):
+        for i in range(200):
+            assert sink.submit({"k": k, "i": i})
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sink.stop()
+
+    rows = _read_all(tmp_path / "audit.jsonl")
+    assert len(rows) == 1000
+    for k in range(5):
+        assert [r["i"] for r in rows if r["k"] == k] == list(range(200))  # per-producer order kept
+    st = sink.stats()
+    assert st["written"] == st["accepted"] == 1000 and st["dropped"] == 0
+    assert st["batches"] < 1000 and not st["running"]
+
+
+def test_rotates_by_size_and_compresses(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    sink = AuditSink(path, batch_size=1, max_bytes=1000, compress=True, keep_segments=3)
+    for i in range(100):
+        sink.submit({"i": i, "pad": "x" * 50})
+    sink.stop()
+
+    segs = segment_paths(path)
+    assert segs[-1] == path
+    rotated = segs[:-1]
+    assert len(rotated) == 3 and all(p.suffix == ".gz" for p in rotated)
+    with gzip.open(rotated[0], "rt", encoding="utf-8") as f:
+        assert json.loads(f.readline())["pad"] == "x" * 50
+    assert all(p.stat().st_size <= 1000 for p in [path])
+    ids = [r["i"] for r in _read_all(path)]
+    assert ids == sorted(ids) and ids[-1] == 99  # oldest segments pruned, order kept
+    assert sink.stats()["rotations"] > 3
+
+
+def test_rotates_when_the_date_changes(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    sink = AuditSink(path)
+    sink.submit({"i": 0})
+    sink.flush()
+    sink._day = "2000-01-01"  # pretend the active file was started on an earlier day
+    sink.submit({"i": 1})
+    sink.stop()
+    assert len(segment_paths(path)) == 2
+    assert datetime.now().strftime("%Y%m%d") in segment_paths(path)[0].name
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    sink = AuditSink(tmp_path / "audit.jsonl", max_queue=5)
+    gate = threading.Event()
+    real_write = sink._write_batch
+    sink._write_batch = lambda batch: (gate.wait(5), real_write(batch))  # stall the writer
+
+    results = [sink.submit({"i": i}) for i in range(50)]
+    assert results.count(False) > 0
+    assert sink.stats()["dropped"] == results.count(False)
+    gate.set()
+    sink.stop()
+    assert len(_read_all(tmp_path / "audit.jsonl")) == results.count(True)
+
+
+def test_block_mode_never_blocks_the_event_loop(tmp_path):
+    import asyncio
+    import time
+
+    sink = AuditSink(tmp_path / "audit.jsonl", max_queue=1, overflow="block", block_timeout_s=2.0)
+    gate = threading.Event()
+    real_write = sink._write_batch
+    sink._write_batch = lambda batch: (gate.wait(5), real_write(batch))
+
+    async def main():
+        t0 = time.perf_counter()
+        results = [sink.submit({"i": i}) for i in range(5)]
+        return results, time.perf_counter() - t0
+
+    results, elapsed = asyncio.run(main())
+    assert elapsed < 0.5 and results.count(False) >= 1
+    gate.set()
+    sink.stop()
+    assert sink.stats()["dropped"] == results.count(False)
+
+
+def test_compression_never_exposes_a_partial_archive(tmp_path, monkeypatch):
+    import tools.audit_log as al
+
+    path = tmp_path / "audit.jsonl"
+    checks = []
+    real_copy = al.shutil.copyfileobj
+
+    def _copy(src, dst):
+        real_copy(src, dst)
+        # archive not finished yet: every listed segment must still be readable
+        for seg in segment_paths(path):
+            with open_segment(seg) as f:
+                checks.append((seg.name, len(f.read().splitlines())))
+
+    monkeypatch.setattr(al.shutil, "copyfileobj", _copy)
+    sink = AuditSink(path, batch_size=1, max_bytes=200, compress=True)
+    for i in range(10):
+        sink.submit({"i": i, "pad": "x" * 60})
+    sink.stop()
+    assert sink.stats()["errors"] == 0 and sink.last_error is None
+    assert any(n.endswith(".gz") for n, _ in checks)
+    assert all(lines > 0 for _, lines in checks)
+    assert len(_read_all(path)) == 10
+    assert not list(tmp_path.glob(".tmp-*"))
@@ -72,3 +72,99 @@ def test_mode_b_mapping():
     # risk_bias=-1.0 -> stocks=20, bonds=30, gold=15, cash=35
     assert hist.iloc[1]["allocation"]["stocks"] == 20
 
+def _reference_curve(prices, schedule, rebalance_idx, ticker_map):
+    # The original per-day loop, kept as the bit-exact reference for the kernel.
+    equity = 1.0
+    curve = []
+    current = schedule[0]
+    events = dict(zip(rebalance_idx, schedule[1:]))
+    for i in range(len(prices.index)):
+        if i > 0:
+            day_return = 0
+            for bucket, ticker in ticker_map.items():
+                if ticker in prices.columns:
+                    ret = prices[ticker].iloc[i] / prices[ticker].iloc[i-1] - 1
+                    day_return += (current.get(bucket, 0) / 100.0) * ret
+            equity *= (1 + day_return)
+        curve.append(equity)
+        if i in events:
+            current = events[i]
+    return np.array(curve)
+
+def test_equity_curve_kernel_is_bit_identical_to_loop():
+    from tools.backtest_engine import allocation_rows, bucket_returns, equity_curve_kernel
+
+    rng = np.random.default_rng(7)
+    dates = pd.date_range("2020-01-01", periods=300, freq="B")
+    prices = pd.DataFrame(
+        np.cumprod(1 + rng.normal(0, 0.02, (300, 3)), axis=0) * 50,
+        index=dates, columns=["SPY", "SHY", "GLD"],
+    )
+    ticker_map = {"stocks": "SPY", "bonds": "SHY", "gold": "GLD", "cash": "BIL"}  # BIL missing
+    rebalance_idx = [0, 10, 37, 150, 299]
+    schedule = [{"stocks": 60, "bonds": 20, "gold": 10, "cash": 10}]
+    for _ in rebalance_idx:
+        w = rng.uniform(0, 1, 4)
+        schedule.append(dict(zip(ticker_map, (w / w.sum() * 100).tolist())))
+
+    buckets, R = bucket_returns(prices, ticker_map)
+    mask = np.zeros(len(dates), dtype=bool)
+    mask[rebalance_idx] = True
+    curve = equity_curve_kernel(R, allocation_rows(schedule, buckets), mask)
+
+    expected = _reference_curve(prices, schedule, rebalance_idx, ticker_map)
+    assert buckets == ["stocks", "bonds", "gold"]
+    assert np.array_equal(curve, expected)
+
+def test_latest_row_positions_matches_boolean_filter():
+    from tools.backtest_engine import latest_row_positions
+
+    frame = pd.DataFrame({"as_of_date": ["2024-01-10", "2024-01-03", "2024-01-10", "2024-01-05"]})
+    queries = ["2024-01-01", "2024-01-03", "2024-01-06", "2024-01-10", "2024-02-01"]
+    expected = []
+    for d in queries:
+        hit = frame[frame["as_of_date"] <= d]
+        expected.append(frame.index.get_loc(hit.index[-1]) if not hit.empty else -1)
+    assert latest_row_positions(frame["as_of_date"], queries).tolist() == expected == [-1, 1, 3, 3, 3]
+
+def test_mode_a_prefetch_matches_serial(monkeypatch):
+    import threading
+    import time
+
+    dates = pd.date_range("2024-01-01", periods=80, freq="B")
+    prices = pd.DataFrame({t: np.linspace(1.0, 1.2, 80) for t in ["SPY", "SHY", "GLD", "BIL"]}, index=dates)
+    news = pd.DataFrame([{"as_of_date": d.strftime("%Y-%m-%d"), "brief_text": f"brief {k}"} for k, d in enumerate(dates)])
+
+    state = {"calls": [], "active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_decide(self, run_id, as_of_date, brief_text, current_allocation, vectorstore, experts=None):
+        with lock:
+            state["calls"].append(current_allocation)
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+        k = int(brief_text.split()[1])
+        stocks = 60 if k < 40 else 40  # one regime change -> one speculation miss
+        if current_allocation is not None and current_allocation["stocks"] == stocks:
+            return {"primary": {"target_allocation": current_allocation}}
+        return {"primary": {"target_allocation": {"stocks": stocks, "bonds": 20, "gold": 10, "cash": 70 - stocks}}}
+
+    monkeypatch.setattr(BacktestEngine, "committee_decide_allocation", fake_decide)
+    engine = BacktestEngine(results_dir="results_test")
+
+    curve_serial, hist_serial = engine.run_backtest_A("t", prices, news, None, step_days=10)
+    serial_calls = len(state["calls"])
+    state.update(calls=[], peak=0)
+    curve_par, hist_par = engine.run_backtest_A("t", prices, news, None, step_days=10, workers=4)
+
+    assert curve_par.equals(curve_serial)
+    assert hist_par.equals(hist_serial)
+    assert state["peak"] > 1
+    assert serial_calls <= len(state["calls"]) <= serial_calls + 4
+
+    state.update(calls=[])
+    engine.run_backtest_A("t", prices, news, None, step_days=10, workers=4, include_current_allocation=False)
+    assert state["calls"] == [None] * serial_calls
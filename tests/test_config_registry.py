@@ -0,0 +1,117 @@
+import os
+
+from tools.config_registry import ConfigRegistry
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_registry_reloads_on_change_and_keeps_last_good(tmp_path, capsys):
+    path = tmp_path / "policy.yaml"
+    path.write_text("version: 1\n", encoding="utf-8")
+    compiled_calls = []
+
+    reg = ConfigRegistry(check_interval_s=3600)
+    reg.register("policy", path, compile=lambda d: compiled_calls.append(d) or d["version"])
+    assert reg.get("policy") == {"version": 1}
+    assert reg.compiled("policy") == 1
+    v1, h1 = reg.version("policy"), reg.version_hash()
+
+    # within the check interval the file is not looked at again
+    path.write_text("version: 2\n", encoding="utf-8")
+    _bump_mtime(path)
+    assert reg.compiled("policy") == 1
+    assert len(compiled_calls) == 1
+
+    reg.invalidate("policy")
+    assert reg.compiled("policy") == 2
+    assert reg.version("policy") != v1
+    assert reg.version_hash() != h1
+
+    # broken yaml: keep serving the last good version, report the error
+    reg.check_interval_s = 0
+    path.write_text("version: [\n", encoding="utf-8")
+    _bump_mtime(path)
+    assert reg.compiled("policy") == 2
+    assert reg.status()["policy"]["error"]
+    assert "keeping previous version" in capsys.readouterr().out
+
+    path.write_text("version: 3\n", encoding="utf-8")
+    _bump_mtime(path)
+    assert reg.compiled("policy") == 3
+    assert reg.status()["policy"]["error"] is None
+
+
+def test_registry_missing_file_is_empty_and_register_is_idempotent(tmp_path):
+    reg = ConfigRegistry(check_interval_s=0)
+    missing = tmp_path / "scenarios.yaml"
+    reg.register("scenarios", missing)
+    assert reg.get("scenarios") == {}
+    assert reg.version("scenarios") is None
+
+    missing.write_text("scenarios:\n  - id: s1\n", encoding="utf-8")
+    reg.register("scenarios", missing)  # same path: no-op
+    assert reg.get("scenarios")["scenarios"][0]["id"] == "s1"
+
+    other = tmp_path / "other.yaml"
+    other.write_text("scenarios: []\n", encoding="utf-8")
+    reg.register("scenarios", other)
+    assert reg.get("scenarios") == {"scenarios": []}
+
+
+def test_broken_first_load_is_cached_by_signature(tmp_path):
+    import pytest
+
+    path = tmp_path / "reasoning.yaml"
+    path.write_text("a: [\n", encoding="utf-8")
+    parses = []
+
+    def _parse(raw):
+        parses.append(raw)
+        import yaml
+        return yaml.safe_load(raw)
+
+    reg = ConfigRegistry(check_interval_s=0)
+    reg.register("reasoning", path, parse=_parse)
+    for _ in range(5):
+        with pytest.raises(Exception):
+            reg.get("reasoning")
+    assert len(parses) == 1  # not re-read / re-parsed until the file changes
+
+    path.write_text("a: 1\n", encoding="utf-8")
+    _bump_mtime(path)
+    assert reg.get("reasoning") == {"a": 1}
+    assert len(parses) == 2
+
+
+def test_reasoning_reload_never_exposes_empty_tables():
+    import threading
+
+    import tools.reasoning_core as rc
+
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                rc.get_personality_description("unknown")
+                rc.EnsembleAdjudicator.adjudicate("crisis", [rc.ExpertOpinion("ray_dalio", -0.5, 0.8, "x")])
+                rc.SharpePrimaryAllocator.allocate("bull", 0.2)
+            except Exception as e:  # pragma: no cover - the failure mode under test
+                errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        for i in range(300):
+            rc._apply_reasoning_config({"regime_weights": {"crisis": {"macro": 0.5 + (i % 2) * 0.1}}})
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        rc._apply_reasoning_config(rc._CONFIG.get("reasoning"))
+    assert errors == []
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from tools.downsample import downsample_indices, extreme_indices, lttb_indices
+
+
+def _reference_lttb(x, y, n_out):
+    # textbook loop implementation
+    n = len(y)
+    every = (n - 2) / (n_out - 2)
+    out, a = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1
+        nlo, nhi = hi, min(int(np.floor((i + 2) * every)) + 1, n - 1)
+        if i == n_out - 3:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x, avg_y = np.mean(x[nlo:nhi]), np.mean(y[nlo:nhi])
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(best)
+        a = best
+    out.append(n - 1)
+    return np.array(out)
+
+
+def _curve(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), 100 * np.cumprod(1 + rng.normal(0.0003, 0.012, n))
+
+
+def test_lttb_matches_reference_loop():
+    for seed, (n, k) in enumerate([(1000, 50), (5003, 400), (100, 98)]):
+        x, y = _curve(n, seed)
+        np.testing.assert_array_equal(lttb_indices(x, y, k), _reference_lttb(x, y, k))
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax", "stride"])
+def test_extremes_and_max_drawdown_survive(method):
+    x, y = _curve(20000, seed=7)
+    # a one-day crash that a stride would skip
+    y[12345] = y[12344] * 0.4
+    idx = downsample_indices(x, y, 500, method)
+    assert len(idx) <= 500
+    assert np.all(np.diff(idx) > 0)
+    assert {0, len(y) - 1, 12345, int(np.argmax(y))} <= set(idx.tolist())
+
+    def max_dd(v):
+        return float(np.max(1 - v / np.maximum.accumulate(v)))
+
+    assert max_dd(y[idx]) == pytest.approx(max_dd(y))
+    assert set(extreme_indices(y)) <= set(idx.tolist())
+
+
+def test_small_inputs_are_returned_whole():
+    x, y = _curve(10)
+    np.testing.assert_array_equal(downsample_indices(x, y, 900), np.arange(10))
+    np.testing.assert_array_equal(downsample_indices(x, y, 0), np.arange(10))
+    with pytest.raises(ValueError):
+        downsample_indices(x, y, 5, "spline")
@@ -81,7 +81,11 @@ def test_ensemble_endpoint_returns_quant_adjustment(monkeypatch):
             + "</json>"
         )
 
+    async def _fake_acall_chat(self, messages):
+        return _fake_call_chat(self, messages)
+
     monkeypatch.setattr(rs.LLMBridge, "call_chat", _fake_call_chat, raising=True)
+    monkeypatch.setattr(rs.LLMBridge, "acall_chat", _fake_acall_chat, raising=True)
 
     client = TestClient(rs.app)
     resp = client.post(
@@ -120,3 +124,55 @@ def test_ensemble_endpoint_returns_quant_adjustment(monkeypatch):
     assert data["secondary"]["metadata"]["primary_generated_by"] == "allocator_sharpe_v1"
 
 
+def test_ensemble_stream_sends_retrieval_deltas_then_final(monkeypatch):
+    import services.rag_service as rs
+
+    hits = [
+        (DummyDoc("IF inflation high THEN reduce risk", {"investor_id": "ray_dalio", "rule_id": "R-10", "kind": "risk_management"}), 0.05),
+    ]
+    monkeypatch.setattr(rs, "vectorstore", DummyVectorStore(hits))
+    monkeypatch.setenv("IMH_API_TOKEN", "test-token")
+
+    payload = {
+        "primary": {"target_allocation": {"stocks": 40, "bonds": 40, "gold": 10, "cash": 10}, "one_liner": "防守。", "confidence": 0.7},
+        "secondary": {
+            "experts": ["ray_dalio"],
+            "expert_opinions": [{"expert": "ray_dalio", "summary": "防守", "impact": -0.5, "confidence": 0.8, "citations": [1]}],
+            "consensus": "c",
+            "conflicts": "",
+            "synthesis": "s",
+            "citations": [{"id": 1}],
+        },
+    }
+    text = "<json>" + json.dumps(payload, ensure_ascii=False) + "</json>"
+
+    async def _fake_astream_chat(self, messages):
+        for i in range(0, len(text), 40):
+            yield text[i : i + 40]
+
+    monkeypatch.setattr(rs.LLMBridge, "astream_chat", _fake_astream_chat, raising=True)
+
+    client = TestClient(rs.app)
+    with client.stream(
+        "POST",
+        "/api/rag/ensemble/stream",
+        json={"query": "通胀上行怎么办？"},
+        headers={"Authorization": "Bearer test-token"},
+    ) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        body = "".join(resp.iter_text())
+
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+
+    assert events[0][0] == "retrieval"
+    assert events[0][1]["experts"] == ["ray_dalio"]
+    assert events[0][1]["rule_hits"][0]["metadata"]["rule_id"] == "R-10"
+    deltas = [d["text"] for e, d in events if e == "delta"]
+    assert "".join(deltas) == text and len(deltas) > 1
+    assert events[-1][0] == "final"
+    assert set(events[-1][1]["primary"]["target_allocation"]) == {"stocks", "bonds", "gold", "cash"}
+    assert events[-1][1]["secondary"]["citations"][0]["rule_id"] == "R-10"
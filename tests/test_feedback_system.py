@@ -0,0 +1,110 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+from services.feedback_system import FeedbackCollector
+
+
+def _record(i, ts, feedback_type="rating", rating=4):
+    return {
+        "id": f"fb_{i}",
+        "session_id": f"s{i}",
+        "query": "q",
+        "response_id": f"r{i}",
+        "feedback_type": feedback_type,
+        "rating": rating,
+        "comment": None,
+        "timestamp": ts.isoformat(),
+    }
+
+
+def test_submit_and_time_range_scan(tmp_path):
+    c = FeedbackCollector(storage_dir=str(tmp_path))
+    now = datetime.now()
+    for i, age in enumerate([10, 6, 3, 0]):
+        c._save_record(_record(i, now - timedelta(days=age, minutes=1)))
+    rec = c.submit_feedback("s9", "q", "r9", "thumbs_up")
+
+    recent = c.get_recent_feedback(days=7)
+    assert [r["id"] for r in recent] == ["fb_1", "fb_2", "fb_3", rec["id"]]
+    assert recent[-1] == rec
+    window = c.get_feedback_range(now - timedelta(days=8), now - timedelta(days=1))
+    assert [r["id"] for r in window] == ["fb_1", "fb_2"]
+
+    c.clear_feedback()
+    assert c.get_recent_feedback(days=365) == []
+
+
+def test_concurrent_submits_do_not_lose_records(tmp_path):
+    collectors = [FeedbackCollector(storage_dir=str(tmp_path)) for _ in range(2)]
+
+    def worker(k):
+        for i in range(50):
+            collectors[k % 2].submit_feedback(f"s{k}", "q", f"r{k}-{i}", "thumbs_down")
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(FeedbackCollector(storage_dir=str(tmp_path)).get_recent_feedback(days=1)) == 300
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    now = datetime.now()
+    legacy = {"feedback_records": [_record(1, now - timedelta(days=1)), _record(2, now - timedelta(days=30))], "metadata": {}}
+    (tmp_path / "feedback.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    c = FeedbackCollector(storage_dir=str(tmp_path))
+    assert [r["id"] for r in c.get_recent_feedback(days=7)] == ["fb_1"]
+    assert not (tmp_path / "feedback.json").exists()
+    assert (tmp_path / "feedback.json.imported").exists()
+    assert len(FeedbackCollector(storage_dir=str(tmp_path)).get_recent_feedback(days=60)) == 2
+
+
+def _reference_analyze(records):
+    # previous FeedbackAnalyzer.analyze body over raw records
+    if not records:
+        return {"total_feedback": 0, "average_rating": 0.0, "nps": 0.0, "thumbs_up_ratio": 0.0,
+                "total_thumbs_up": 0, "total_thumbs_down": 0}
+    total = len(records)
+    thumbs_up = sum(1 for r in records if r["feedback_type"] == "thumbs_up")
+    thumbs_down = sum(1 for r in records if r["feedback_type"] == "thumbs_down")
+    ratings = [r["rating"] for r in records if r["feedback_type"] == "rating" and r["rating"]]
+    avg_rating = sum(ratings) / len(ratings) if ratings else 0.0
+    promoters = sum(1 for r in ratings if r >= 4)
+    detractors = sum(1 for r in ratings if r <= 2)
+    nps = ((promoters - detractors) / len(ratings) * 100) if ratings else 0.0
+    return {"total_feedback": total, "average_rating": round(avg_rating, 2), "nps": round(nps, 1),
+            "thumbs_up_ratio": round(thumbs_up / total, 3), "total_thumbs_up": thumbs_up, "total_thumbs_down": thumbs_down}
+
+
+def test_aggregates_match_record_scan(tmp_path):
+    import random
+
+    from services.feedback_system import FeedbackAnalyzer
+
+    rng = random.Random(5)
+    now = datetime.now().replace(microsecond=0)
+    c = FeedbackCollector(storage_dir=str(tmp_path))
+    for i in range(2000):
+        ts = now - timedelta(minutes=rng.randint(0, 60 * 24 * 40))
+        kind = rng.choice(["thumbs_up", "thumbs_down", "rating", "rating"])
+        rating = rng.choice([None, 1, 2, 3, 4, 5]) if kind == "rating" else None
+        c._save_record(_record(i, ts, kind, rating))
+
+    analyzer = FeedbackAnalyzer(c)
+    for start in [now - timedelta(days=d, minutes=m) for d, m in [(0, 30), (1, 0), (7, 13), (30, 59), (50, 0)]]:
+        agg = c.aggregate_since(start)
+        records = c.get_feedback_range(start)
+        assert agg["total"] == len(records)
+        assert agg["ratings"] == sum(1 for r in records if r["feedback_type"] == "rating" and r["rating"])
+    for days in (1, 7, 30, 365):
+        assert analyzer.analyze(days) == _reference_analyze(c.get_recent_feedback(days))
+
+    # pre-aggregate databases are backfilled from the log on open
+    c._conn.execute("DELETE FROM feedback_meta WHERE key = 'aggregates_version'")
+    c._conn.execute("DELETE FROM feedback_daily")
+    c._conn.commit()
+    reopened = FeedbackCollector(storage_dir=str(tmp_path))
+    assert FeedbackAnalyzer(reopened).analyze(30) == _reference_analyze(reopened.get_recent_feedback(30))
@@ -0,0 +1,48 @@
+import random
+
+from tools.keyword_matcher import (
+    INTENT_KEYWORDS,
+    SCENARIO_KEYWORDS,
+    AhoCorasick,
+    KeywordMatcher,
+    match_scenarios_and_intents,
+)
+
+
+def _naive(table, text):
+    t_low = (text or "").lower()
+    return [label for label, keys in table.items() if any(k.lower() in t_low for k in keys)]
+
+
+def test_aho_corasick_reports_overlapping_patterns():
+    ac = AhoCorasick()
+    for i, p in enumerate(["he", "she", "his", "hers", "流动性", "流动性危机", "危机"]):
+        ac.add(p, i)
+    ac.build()
+    assert ac.find("ushers") == {0, 1, 3}
+    assert ac.find("出现流动性危机了") == {4, 5, 6}
+    assert ac.find("") == set()
+
+
+def test_scenarios_and_intents_match_naive_scan():
+    intent_table = {k: keys for k, (keys, _ids) in INTENT_KEYWORDS.items()}
+    vocab = [k for keys in SCENARIO_KEYWORDS.values() for k in keys]
+    vocab += [k for keys in intent_table.values() for k in keys]
+    vocab += ["NVDA", "the", "市场", "。", "?", "Crash", "FOMO", "Take Profit"]
+
+    rng = random.Random(11)
+    texts = ["", "现在市场恐慌暴跌，要不要止损？", "Fed 加息 + PE 过高 = ALL IN?"]
+    for _ in range(300):
+        words = rng.sample(vocab, k=rng.randint(1, 5))
+        texts.append(rng.choice(["", " ", "，"]).join(words))
+
+    for text in texts:
+        scenarios, intents = match_scenarios_and_intents(text)
+        assert scenarios == _naive(SCENARIO_KEYWORDS, text), text
+        assert intents == _naive(intent_table, text), text
+
+
+def test_keyword_matcher_case_sensitive_mode():
+    m = KeywordMatcher({"g": {"upper": ["TGA"], "lower": ["rrp"]}}, lowercase=False)
+    assert m.labels("TGA and rrp") == ["upper", "lower"]
+    assert m.labels("tga and RRP") == []
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from tools.llm_bridge import LLMBridge, LLMConfig, aclose_async_pool
+
+
+def _ok(content):
+    return web.json_response({"choices": [{"message": {"content": content}}]})
+
+
+def test_acall_chat_pools_connections_limits_concurrency_and_retries():
+    state = {"active": 0, "peak": 0, "calls": 0, "peers": set()}
+
+    async def handler(request):
+        body = await request.json()
+        state["calls"] += 1
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        if body["messages"][0]["content"] == "flaky" and state["calls"] == 1:
+            return web.Response(status=503, text="busy")
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.02)
+        state["active"] -= 1
+        return _ok("echo:" + body["messages"][0]["content"])
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        cfg = LLMConfig(
+            provider="openai",
+            api_key="k",
+            base_url=f"http://127.0.0.1:{port}/v1",
+            model="m",
+            max_retries=2,
+            retry_wait_base_s=0.01,
+            max_concurrency=3,
+        )
+        bridge = LLMBridge(cfg)
+        try:
+            first = await bridge.acall_chat([{"role": "user", "content": "flaky"}])
+            outs = await asyncio.gather(
+                *(LLMBridge(cfg).acall_chat([{"role": "user", "content": str(i)}]) for i in range(12))
+            )
+        finally:
+            await aclose_async_pool()
+            await runner.cleanup()
+        return first, outs
+
+    first, outs = asyncio.run(main())
+    assert first == "echo:flaky"
+    assert outs == [f"echo:{i}" for i in range(12)]
+    assert state["peak"] <= 3
+    # keep-alive pool: 13 successful requests over at most max_concurrency connections
+    assert len(state["peers"]) <= 3
+
+
+
+def test_astream_chat_yields_deltas_for_openai_and_claude():
+    openai_chunks = [
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "<json>"}}]},
+        {"choices": [{"delta": {"content": "{}</json>"}}]},
+    ]
+    claude_events = [
+        ("message_start", {"type": "message_start", "message": {}}),
+        ("content_block_delta", {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "你好"}}),
+        ("ping", {"type": "ping"}),
+        ("content_block_delta", {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "，世界"}}),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+
+    async def sse(request, frames):
+        body = await request.json()
+        assert body["stream"] is True
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        for frame in frames:
+            await resp.write(frame.encode("utf-8"))
+        await resp.write_eof()
+        return resp
+
+    async def openai_handler(request):
+        frames = [f"data: {json.dumps(c)}\n\n" for c in openai_chunks] + ["data: [DONE]\n\n"]
+        return await sse(request, frames)
+
+    async def claude_handler(request):
+        return await sse(request, [f"event: {e}\ndata: {json.dumps(d, ensure_ascii=False)}\n\n" for e, d in claude_events])
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", openai_handler)
+        app.router.add_post("/v1/messages", claude_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1"
+        msgs = [{"role": "user", "content": "hi"}]
+        try:
+            oa = [t async for t in LLMBridge(LLMConfig(provider="openai", api_key="k", base_url=base, model="m")).astream_chat(msgs)]
+            cl = [t async for t in LLMBridge(LLMConfig(provider="claude", api_key="k", base_url=base, model="m")).astream_chat(msgs)]
+        finally:
+            await aclose_async_pool()
+            await runner.cleanup()
+        return oa, cl
+
+    oa, cl = asyncio.run(main())
+    assert oa == ["<json>", "{}</json>"]
+    assert cl == ["你好", "，世界"]
+
+
+def test_throttled_stream_releases_its_slot_while_backing_off():
+    events = []
+
+    async def handler(request):
+        body = await request.json()
+        who = body["messages"][0]["content"]
+        events.append((who, time.monotonic()))
+        if who == "throttled" and len(events) == 1:
+            return web.Response(status=429, text="slow down")
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        await resp.write(f"data: {json.dumps({'choices': [{'delta': {'content': who}}]})}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1"
+        # one slot, and a backoff (0.5-1.5s) far longer than the other stream needs
+        cfg = LLMConfig(provider="openai", api_key="k", base_url=base, model="m",
+                        max_retries=2, retry_wait_base_s=1.0, max_concurrency=1)
+
+        async def collect(who, delay=0.0):
+            await asyncio.sleep(delay)
+            return [t async for t in LLMBridge(cfg).astream_chat([{"role": "user", "content": who}])]
+
+        try:
+            return await asyncio.gather(collect("throttled"), collect("other", delay=0.1))
+        finally:
+            await aclose_async_pool()
+            await runner.cleanup()
+
+    throttled, other = asyncio.run(main())
+    assert throttled == ["throttled"] and other == ["other"]
+    # "other" is served during the backoff (>= 0.5s) instead of queueing behind the sleeping stream
+    assert [who for who, _ in events] == ["throttled", "other", "throttled"]
+    assert events[1][1] - events[0][1] < 0.45
@@ -0,0 +1,121 @@
+import json
+
+from tools.llm_bridge import LLMBridge, LLMConfig
+from tools.llm_cache import CachedLLMBridge, LLMResponseCache, llm_cache_key
+
+
+def _cfg(**kw):
+    base = dict(provider="openai", api_key="k", base_url="http://localhost", model="m")
+    base.update(kw)
+    return LLMConfig(**base)
+
+
+def test_cached_bridge_reuses_answers_across_instances(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_call_chat(self, messages):
+        calls.append(messages)
+        return f"answer #{len(calls)}"
+
+    monkeypatch.setattr(LLMBridge, "call_chat", fake_call_chat)
+    msgs = [{"role": "system", "content": "s"}, {"role": "user", "content": "现在该怎么配置？"}]
+
+    b1 = CachedLLMBridge(_cfg(), cache=LLMResponseCache(str(tmp_path)))
+    assert b1.call_chat(msgs) == "answer #1"
+    assert b1.call_chat(msgs) == "answer #1"
+
+    # new cache instance (e.g. another run_id / process) loads the index from disk
+    b2 = CachedLLMBridge(_cfg(), cache=LLMResponseCache(str(tmp_path)))
+    assert b2.call_chat(msgs) == "answer #1"
+    assert len(calls) == 1
+
+    # temperature / model are part of the key
+    assert CachedLLMBridge(_cfg(temperature=0.7), cache=b2.cache).call_chat(msgs) == "answer #2"
+    assert llm_cache_key(_cfg(), msgs) != llm_cache_key(_cfg(model="m2"), msgs)
+
+
+def test_cache_evicts_lru_and_adopts_unindexed_objects(tmp_path):
+    cache = LLMResponseCache(str(tmp_path), max_entries=2)
+    cache.put("aa01", "one")
+    cache.put("bb02", "two")
+    assert cache.get("aa01") == "one"
+    cache.put("cc03", "three")
+
+    assert cache.get("bb02") is None
+    assert not (tmp_path / "objects" / "bb" / "bb02.json").exists()
+    assert list(LLMResponseCache(str(tmp_path))._index) == ["aa01", "cc03"]
+
+    # an object written by another process but missing from our index is still found
+    other = LLMResponseCache(str(tmp_path / "other"))
+    other.put("dd04", "four")
+    (tmp_path / "objects" / "dd").mkdir(parents=True)
+    (tmp_path / "other" / "objects" / "dd" / "dd04.json").rename(tmp_path / "objects" / "dd" / "dd04.json")
+    assert cache.get("dd04") == "four"
+    assert len(cache) == 2
+    assert cache.get("aa01") is None
+
+
+def test_concurrent_writers_append_to_the_log_and_compact(tmp_path, monkeypatch):
+    a = LLMResponseCache(str(tmp_path))
+    b = LLMResponseCache(str(tmp_path))  # e.g. two backtest processes sharing one cache dir
+    for i in range(4):
+        a.put(f"a{i:03d}", f"A{i}")
+        b.put(f"b{i:03d}", f"B{i}")
+
+    # puts only append; no writer rewrites (and clobbers) a shared snapshot
+    assert not (tmp_path / "index.json").exists()
+    assert len((tmp_path / "index.log").read_text().splitlines()) == 8
+    assert len(LLMResponseCache(str(tmp_path))) == 8
+
+    # crossing the threshold (whoever wrote the log) compacts, keeping the other writer's entries
+    monkeypatch.setattr(LLMResponseCache, "COMPACT_MIN_BYTES", (tmp_path / "index.log").stat().st_size)
+    a.put("a004", "A4")
+    index = json.loads((tmp_path / "index.json").read_text())
+    assert sorted(row[0] for row in index["entries"]) == sorted(
+        [f"a{i:03d}" for i in range(5)] + [f"b{i:03d}" for i in range(4)])
+    assert (tmp_path / "index.log").read_text() == ""
+
+    # log lines lost to a crash / a racing truncate: the index is trusted on load (no scan
+    # of objects/), the object is adopted on its first miss
+    b.put("b004", "B4")
+    (tmp_path / "index.log").write_text('["+","b004",')
+    c = LLMResponseCache(str(tmp_path))
+    assert len(c) == 9
+    assert c.get("b004") == "B4" and len(c) == 10
+
+    # objects removed behind the index's back are dropped on read, or by an explicit repair
+    (tmp_path / "objects" / "a0" / "a000.json").unlink()
+    (tmp_path / "objects" / "a0" / "a001.json").unlink()
+    assert c.get("a000") is None and len(c) == 9
+    assert c.repair() == {"adopted": 0, "dropped": 1}
+    assert len(LLMResponseCache(str(tmp_path))) == 8
+
+    # a lost index falls back to a full scan of objects/
+    (tmp_path / "index.json").unlink()
+    (tmp_path / "index.log").unlink()
+    assert len(LLMResponseCache(str(tmp_path))) == 8
+
+
+def test_hits_keep_eviction_lru_across_reopens(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("tools.llm_cache.time.time", lambda: clock[0])
+
+    def tick():
+        clock[0] += 1
+        return clock[0]
+
+    run1 = LLMResponseCache(str(tmp_path), max_entries=3)
+    for key in ("k001", "k002", "k003"):
+        tick()
+        run1.put(key, key.upper())
+
+    run2 = LLMResponseCache(str(tmp_path), max_entries=3)  # next backtest run, no flush()
+    tick()
+    assert run2.get("k001") == "K001"
+
+    run3 = LLMResponseCache(str(tmp_path), max_entries=3)
+    assert list(run3._index) == ["k002", "k003", "k001"]
+    tick()
+    run3.put("k004", "K004")
+    assert run3.get("k002") is None and run3.get("k001") == "K001"
+    assert not (tmp_path / "objects" / "k0" / "k002.json").exists()
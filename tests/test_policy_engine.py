@@ -0,0 +1,121 @@
+import copy
+import random
+from pathlib import Path
+
+import yaml
+
+from tools.policy_engine import compile_policy
+
+POLICY = yaml.safe_load((Path(__file__).resolve().parents[1] / "config" / "policy_gate.yaml").read_text(encoding="utf-8"))
+
+
+def _f(x):
+    try:
+        return None if x is None else float(x)
+    except Exception:
+        return None
+
+
+def _cmp(op, a, b):
+    return {">": a > b, ">=": a >= b, "<": a < b, "<=": a <= b, "==": a == b}.get(op, False)
+
+
+def _reference_score(policy, features):
+    """The original per-request dict walk (services/rag_service._score_regimes)."""
+    regimes = policy.get("regimes", []) or []
+    scores, reasons = {}, {}
+    for r in regimes:
+        rid = r.get("id")
+        if not rid:
+            continue
+        total, rs = 0.0, []
+        for rule in (r.get("rules", []) or []):
+            feat, op, val = rule.get("feature"), rule.get("op"), _f(rule.get("value"))
+            w = _f(rule.get("weight")) or 0.0
+            if not feat or not op or val is None:
+                continue
+            fv = _f(features.get(str(feat)))
+            if fv is not None and _cmp(str(op), fv, val):
+                total += w
+                rs.append(f"{feat} {op} {val} (got {fv})")
+        if total > 0:
+            scores[rid], reasons[rid] = total, rs
+    if not scores:
+        return {"id": "neutral", "label": "中性 / Neutral", "score": 0.0, "confidence": 0.0, "reasons": []}
+    best_id, best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[0]
+    ssum = sum(scores.values())
+    label = next((r.get("label") for r in regimes if r.get("id") == best_id and r.get("label")), best_id)
+    return {"id": best_id, "label": label, "score": round(best, 4), "confidence": round(best / ssum if ssum > 0 else 0.0, 4), "reasons": reasons.get(best_id, [])}
+
+
+def _reference_overlay(policy, regime_id, scenarios, portfolio_state, constraints):
+    keys = ["max_leverage", "min_cash", "max_invest", "max_turnover", "max_corr"]
+    ro = policy.get("regime_overlays", {}) or {}
+    overlay = ro.get(regime_id) or ro.get("neutral") or {}
+    mult = {k: float(_f(overlay.get(k)) or 1.0) for k in ["risk_multiplier"] + keys}
+    for s in scenarios:
+        m = (policy.get("scenario_overlays", {}) or {}).get(s) or {}
+        for k in keys:
+            if k in m:
+                mult[k] *= float(_f(m.get(k)) or 1.0)
+    for feat, rules in (policy.get("portfolio_overlays", {}) or {}).items():
+        pv = _f(portfolio_state.get(str(feat)))
+        if pv is None:
+            continue
+        for rule in rules or []:
+            val = _f(rule.get("value"))
+            if rule.get("op") and val is not None and _cmp(str(rule.get("op")), pv, val):
+                for k in keys:
+                    if k in rule:
+                        mult[k] *= float(_f(rule.get(k)) or 1.0)
+    absolute = {}
+    for k in keys:
+        v = float(_f(policy["base_guardrails"].get(k)) or 0.0) * mult[k]
+        c = policy["clamps"].get(k) or {}
+        v = max(float(_f(c.get("min")) or 0.0), min(float(_f(c.get("max")) or 1e9), v))
+        user = _f(constraints.get(k))
+        if user is not None:
+            v = max(v, user) if k.startswith("min_") else min(v, user)
+        absolute[k] = round(v, 6)
+    return {"multipliers": {k: round(v, 6) for k, v in mult.items()}, "absolute": absolute}
+
+
+def _random_features(rng):
+    pool = [0.05, 0.6, 0.75, 16, 18, 20, 25, 40, 50, 75, 200, 250, 300, "25", None]
+    names = ["vix", "credit_spread_bps", "realized_vol_20d", "inflation_yoy", "breadth_pct_up", "rate_change_3m_bps"]
+    return {n: rng.choice(pool + [rng.uniform(0, 400), rng.uniform(0, 1)]) for n in names if rng.random() < 0.8}
+
+
+def test_compiled_policy_matches_dict_walk():
+    policy = copy.deepcopy(POLICY)
+    # duplicate id (later one overrides), unknown op, non-numeric threshold
+    policy["regimes"].append({"id": "crisis", "label": "dup", "rules": [{"feature": "vix", "op": ">", "value": 30, "weight": 1.5}]})
+    policy["regimes"].insert(0, {"id": "odd", "rules": [{"feature": "vix", "op": "!=", "value": 1, "weight": 9}, {"feature": "vix", "op": "==", "value": 20, "weight": "0.6"}, {"feature": "vix", "op": "<", "value": "x", "weight": 9}]})
+    policy["regime_overlays"]["risk_on"] = {}
+
+    rng = random.Random(7)
+    scenario_names = list(policy["scenario_overlays"]) + ["unknown"]
+    for p in (POLICY, policy):
+        engine = compile_policy(p)
+        rows = [_random_features(rng) for _ in range(2000)]
+        batch = engine.score_batch(engine.features_matrix(rows))
+        for features, got in zip(rows, batch):
+            expected = _reference_score(p, features)
+            assert got == expected
+            assert engine.score(features) == expected
+
+            scen = rng.sample(scenario_names, rng.randint(0, 3))
+            port = {k: rng.choice([0.1, 0.2, 0.3, 1.5, None]) for k in ("drawdown_pct", "leverage") if rng.random() < 0.7}
+            cons = {k: rng.choice([0.1, 0.5, "0.3", None]) for k in ("max_leverage", "min_cash") if rng.random() < 0.5}
+            rid = expected["id"]
+            assert engine.overlay(rid, scen, port, cons) == _reference_overlay(p, rid, scen, port, cons)
+
+
+def test_score_batch_accepts_columns():
+    engine = compile_policy(POLICY)
+    X = engine.features_matrix({"vix": [45, 12, 30], "credit_spread_bps": [350, 100, 260], "breadth_pct_up": 0.8})
+    ids = [r["id"] for r in engine.score_batch(X)]
+    assert ids == ["crisis", "risk_on", "risk_off"]
+    overlays = engine.overlay_batch(ids, portfolio_state={"drawdown_pct": [0.25, 0.0, 0.12]})
+    assert overlays[0]["absolute"]["max_leverage"] < overlays[2]["absolute"]["max_leverage"]
+    assert overlays[1]["multipliers"]["max_leverage"] == 1.1
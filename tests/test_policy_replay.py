@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from tools.policy_replay import load_policy_engine, replay_policy, replay_policy_frame
+
+
+def _table():
+    return pd.DataFrame({
+        "date": pd.date_range("2008-09-01", periods=7, freq="B"),
+        "vix": [15, 22, 45, None, 30, "n/a", 12],
+        "credit_spread_bps": [120, 210, 350, 320, 260, 100, 90],
+        "breadth_pct_up": [0.8, 0.5, 0.2, 0.3, 0.4, 0.6, 0.7],
+        "drawdown_pct": [0.0, 0.05, 0.22, 0.25, 0.12, 0.08, 0.0],
+        "max_leverage": [None, None, 0.5, None, None, None, None],
+    })
+
+
+def test_replay_matches_single_gate_evaluation():
+    engine = load_policy_engine()
+    table = _table()
+    chunks = list(replay_policy(engine, table, scenarios=["市场恐慌"], chunk_size=3))
+    assert [len(c) for c in chunks] == [3, 3, 1]
+
+    rows = [r for c in chunks for r in c]
+    for (_, rec), row in zip(table.iterrows(), rows):
+        features = {k: rec[k] for k in ("vix", "credit_spread_bps", "breadth_pct_up")}
+        features = {k: v for k, v in features.items() if pd.notna(v) and v != "n/a"}
+        constraints = {"max_leverage": rec["max_leverage"]} if pd.notna(rec["max_leverage"]) else {}
+        regime = engine.score(features)
+        assert row["regime"] == regime
+        assert row["risk_overlay"] == engine.overlay(regime["id"], ["市场恐慌"], {"drawdown_pct": rec["drawdown_pct"]}, constraints)
+    assert rows[0]["date"] == "2008-09-01"
+    assert rows[2]["regime"]["id"] == "crisis"
+    assert rows[2]["risk_overlay"]["absolute"]["max_leverage"] <= 0.5
+
+    df = replay_policy_frame(engine, table)
+    assert list(df["regime"]) == [r["regime"]["id"] for r in rows]
+    assert "abs_min_cash" in df.columns and "reasons" not in df.columns
+
+
+def test_replay_endpoint_streams_ndjson_chunks(monkeypatch):
+    import services.rag_service as rs
+
+    monkeypatch.delenv("IMH_API_TOKEN", raising=False)
+    monkeypatch.setattr(rs, "vectorstore", None)  # no retrieval needed by default
+    client = TestClient(rs.app)
+    csv_body = _table().to_csv(index=False).encode("utf-8")
+
+    resp = client.post(
+        "/api/policy/gate/replay?chunk_size=4&with_reasons=false",
+        content=csv_body,
+        headers={"Content-Type": "text/csv"},
+    )
+    assert resp.status_code == 200, resp.text
+    lines = [json.loads(x) for x in resp.text.splitlines() if x.strip()]
+    assert [len(x["rows"]) for x in lines[:-1]] == [4, 3]
+    assert lines[-1]["done"] is True and lines[-1]["rows"] == 7
+    assert "reasons" not in lines[0]["rows"][0]["regime"]
+
+    expected = replay_policy_frame(load_policy_engine(), _table())
+    assert [r["regime"]["id"] for x in lines[:-1] for r in x["rows"]] == list(expected["regime"])
+
+    resp = client.post("/api/policy/gate/replay?with_rule_hits=true", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert resp.status_code == 400
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+
+
+class _Doc:
+    def __init__(self, content, metadata):
+        self.page_content = content
+        self.metadata = metadata
+
+
+class _BatchStore:
+    """No embeddings: query_vectorstore_batch falls back to per-request search."""
+
+    def __init__(self):
+        self.queries = []
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        self.queries.append((query, filter))
+        return [(_Doc("IF vix > 40 THEN cut risk", {"investor_id": "ray_dalio", "rule_id": "R-1"}), 0.25)][:k]
+
+
+def test_validate_all_shares_fetch_and_retrieval_and_skips_audit(monkeypatch, tmp_path):
+    import services.rag_service as rs
+
+    store = _BatchStore()
+    fetches = []
+
+    async def _fake_fetch():
+        fetches.append(1)
+        return {"sp500_pe_ratio": 31.0}
+
+    batch_calls = []
+    real_batch = rs.query_vectorstore_batch
+
+    def _counting_batch(vs, requests):
+        batch_calls.append(len(requests))
+        return real_batch(vs, requests)
+
+    monkeypatch.setattr(rs, "vectorstore", store)
+    monkeypatch.setattr(rs, "_fetch_realtime_features", _fake_fetch)
+    monkeypatch.setattr(rs, "query_vectorstore_batch", _counting_batch)
+    sink = rs.AuditSink(tmp_path / "audit.jsonl")
+    monkeypatch.setattr(rs, "_audit_sink", sink)
+
+    client = TestClient(rs.app)
+    resp = client.post("/api/policy/validate_all")
+    assert resp.status_code == 200, resp.text
+    report = resp.json()
+
+    n = len((rs.CONFIG.get("scenarios") or {}).get("scenarios") or [])
+    assert report["total"] == n > 0
+    assert fetches == [1]
+    assert batch_calls == [n]
+    assert len(store.queries) == n
+    assert all(f == {"source_type": "rule"} for _q, f in store.queries)
+    sink.flush()
+    assert sink.stats()["accepted"] == 0
+    assert not (tmp_path / "audit.jsonl").exists()
+    assert all(it["elapsed_ms"] is not None for it in report["items"])
+    assert set(report["timing"]) == {"features_ms", "retrieval_ms", "scenarios_ms"}
+    assert [it["scenario_id"] for it in report["items"]] == [s.get("id") for s in rs.CONFIG.get("scenarios")["scenarios"]]
+    # the cached scenarios config is not mutated by auto-fill
+    assert all("sp500_pe_ratio" not in (s.get("features") or {}) for s in rs.CONFIG.get("scenarios")["scenarios"])
+
+
+def test_validate_all_reports_vectorstore_not_ready(monkeypatch):
+    import services.rag_service as rs
+
+    monkeypatch.setattr(rs, "vectorstore", None)
+    client = TestClient(rs.app)
+    report = client.post("/api/policy/validate_all").json()
+    assert report["passed_count"] == 0
+    assert all("503" in it["details"][0] for it in report["items"])
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from tools.price_store import PriceStore
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, start, end):
+        self.calls.append((tuple(tickers), start, end))
+        idx = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        base = {"SPY": 100.0, "SHY": 80.0, "GLD": 150.0, "BIL": 90.0}
+        return pd.DataFrame({t: base[t] + np.arange(len(idx)) * 0.5 for t in tickers}, index=idx)
+
+
+def test_incremental_fetch_only_requests_missing_ranges(tmp_path):
+    fetcher = FakeFetcher()
+    store = PriceStore(str(tmp_path), offline=False, fetcher=fetcher)
+    tickers = ["SPY", "SHY", "GLD", "BIL"]
+
+    first = store.get_close(tickers, "2020-01-01", "2020-07-01")
+    assert fetcher.calls == [(tuple(tickers), "2020-01-01", "2020-07-01")]
+    assert list(first.columns) == tickers
+    assert first.index.name == "Date"
+
+    # fully covered: no network
+    again = store.get_close(tickers, "2020-02-01", "2020-03-01")
+    assert len(fetcher.calls) == 1
+    pd.testing.assert_frame_equal(again, first.loc["2020-02-01":"2020-02-29"])
+
+    # extends on both sides: only the two gaps are downloaded, in one call each for all tickers
+    store.get_close(tickers, "2019-12-01", "2020-08-01")
+    assert fetcher.calls[1:] == [
+        (tuple(tickers), "2019-12-01", "2020-01-01"),
+        (tuple(tickers), "2020-07-01", "2020-08-01"),
+    ]
+    assert store.missing_ranges("SPY", "2019-12-01", "2020-08-01") == []
+
+
+def test_offline_mode_never_fetches_and_returns_cached(tmp_path):
+    fetcher = FakeFetcher()
+    PriceStore(str(tmp_path), fetcher=fetcher).get_close(["SPY"], "2021-01-01", "2021-02-01")
+    cached = PriceStore(str(tmp_path), fetcher=fetcher).get_close(["SPY"], "2021-01-01", "2021-02-01")
+
+    def boom(*_a):
+        raise AssertionError("offline store must not fetch")
+
+    offline = PriceStore(str(tmp_path), offline=True, fetcher=boom)
+    pd.testing.assert_frame_equal(offline.get_close(["SPY"], "2021-01-01", "2021-02-01"), cached)
+
+    partial = offline.get_close(["SPY", "GLD"], "2020-12-01", "2021-02-01")
+    assert partial["GLD"].isna().all()
+    assert partial["SPY"].dropna().index.min() >= pd.Timestamp("2021-01-01")
+
+
+def test_offline_env_var(tmp_path, monkeypatch):
+    monkeypatch.setenv("IMH_PRICES_OFFLINE", "1")
+    assert PriceStore(str(tmp_path)).offline is True
+    assert PriceStore(str(tmp_path), offline=False).offline is False
+
+
+def test_failed_or_empty_downloads_are_not_marked_covered(tmp_path):
+    calls = []
+
+    def empty(tickers, start, end):
+        calls.append(start)
+        return pd.DataFrame()  # what yf.download returns on an outage / unknown ticker
+
+    store = PriceStore(str(tmp_path), offline=False, fetcher=empty)
+    assert store.get_close(["SPY"], "2020-01-01", "2020-02-01")["SPY"].isna().all()
+    assert store.missing_ranges("SPY", "2020-01-01", "2020-02-01") == [("2020-01-01", "2020-02-01")]
+
+    def all_nan(tickers, start, end):
+        calls.append(start)
+        return pd.DataFrame({t: np.nan for t in tickers}, index=pd.bdate_range(start, "2020-01-31"))
+
+    def raises(tickers, start, end):
+        calls.append(start)
+        raise ConnectionError("network down")
+
+    for fetcher in (all_nan, raises):
+        store = PriceStore(str(tmp_path), offline=False, fetcher=fetcher)
+        assert store.update(["SPY"], "2020-01-01", "2020-02-01") == {"SPY": [("2020-01-01", "2020-02-01")]}
+    assert len(calls) == 3  # retried every time
+
+    # a good download afterwards fills the hole
+    fetcher = FakeFetcher()
+    store = PriceStore(str(tmp_path), offline=False, fetcher=fetcher)
+    assert store.get_close(["SPY"], "2020-01-01", "2020-02-01")["SPY"].notna().all()
+    assert store.missing_ranges("SPY", "2020-01-01", "2020-02-01") == []
+
+
+def test_truncated_download_only_covers_returned_bars(tmp_path):
+    def truncated(tickers, start, end):
+        idx = pd.bdate_range("2020-03-02", "2020-03-31")  # data stops two months early
+        return pd.DataFrame({t: 100.0 for t in tickers}, index=idx)
+
+    store = PriceStore(str(tmp_path), offline=False, fetcher=truncated)
+    store.update(["SPY"], "2020-03-01", "2020-06-01")
+    # leading Sunday/Monday gap is a closure; the missing tail is re-requested
+    assert store.missing_ranges("SPY", "2020-03-01", "2020-06-01") == [("2020-04-01", "2020-06-01")]
+
+
+def test_range_before_listing_is_covered_once_downloaded(tmp_path):
+    calls = []
+
+    def listed_2020_06(tickers, start, end):
+        calls.append((start, end))
+        idx = pd.bdate_range(max(pd.Timestamp(start), pd.Timestamp("2020-06-01")), pd.Timestamp(end) - pd.Timedelta(days=1))
+        return pd.DataFrame({t: 100.0 for t in tickers}, index=idx)
+
+    store = PriceStore(str(tmp_path), offline=False, fetcher=listed_2020_06)
+    for _ in range(3):
+        df = store.get_close(["NEW"], "2020-01-01", "2020-09-01")
+    assert calls == [("2020-01-01", "2020-09-01")]
+    assert store.missing_ranges("NEW", "2020-01-01", "2020-09-01") == []
+    assert df["NEW"].first_valid_index() == pd.Timestamp("2020-06-01")
@@ -0,0 +1,191 @@
+from fastapi.testclient import TestClient
+
+from tools.rag_core import (
+    EmbeddingCache,
+    embed_queries_cached,
+    embed_query_cached,
+    get_embedding_cache,
+    query_vectorstore,
+    query_vectorstore_batch,
+)
+
+
+class _Document:
+    def __init__(self, page_content="", metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class _Embeddings:
+    """Asymmetric on purpose: query and document vectors differ."""
+
+    model_name = "fake-asym-test"
+
+    def __init__(self):
+        self.doc_calls = []
+        self.query_calls = []
+
+    def embed_documents(self, texts):
+        self.doc_calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return [float(len(text)), -1.0]
+
+
+class _Collection:
+    def __init__(self):
+        self.calls = []
+
+    def query(self, query_embeddings, n_results, where=None, include=None):
+        self.calls.append((query_embeddings, n_results, where))
+        n = len(query_embeddings)
+        return {
+            "documents": [[f"doc{j}-{r}" for r in range(n_results)] for j in range(n)],
+            "metadatas": [[{"rank": r, "q": j} for r in range(n_results)] for j in range(n)],
+            "distances": [[0.1 * r for r in range(n_results)] for j in range(n)],
+        }
+
+
+class _ChromaLike:
+    def __init__(self):
+        self._embedding_function = _Embeddings()
+        self._collection = _Collection()
+
+
+def test_batch_and_single_query_vectors_do_not_share_cache_entries():
+    get_embedding_cache().clear()
+    emb = _Embeddings()
+    assert embed_queries_cached(emb, ["alpha", "beta", "alpha"]) == [[5.0, 1.0], [4.0, 1.0], [5.0, 1.0]]
+    assert emb.doc_calls == [["alpha", "beta"]]
+    # the single-query path must not be served an embed_documents vector
+    assert embed_query_cached(emb, "alpha") == [5.0, -1.0]
+    assert emb.query_calls == ["alpha"]
+    assert embed_queries_cached(emb, ["beta"]) == [[4.0, 1.0]]
+    assert emb.doc_calls == [["alpha", "beta"]]
+
+    emb.query_instruction = "Represent this question for retrieval: "
+    get_embedding_cache().clear()
+    assert embed_queries_cached(emb, ["gamma", "alpha"]) == [[5.0, -1.0], [5.0, -1.0]]
+    assert emb.query_calls[-2:] == ["gamma", "alpha"] and len(emb.doc_calls) == 1
+
+
+def test_query_vectorstore_batch_uses_one_collection_query_per_filter(monkeypatch):
+    import importlib.util
+    import sys
+    import types
+
+    if importlib.util.find_spec("langchain_core") is None and importlib.util.find_spec("langchain") is None:
+        # hits are wrapped in langchain Documents; a minimal stand-in when langchain is absent
+        docs = types.ModuleType("langchain_core.documents")
+        docs.Document = _Document
+        monkeypatch.setitem(sys.modules, "langchain_core", types.ModuleType("langchain_core"))
+        monkeypatch.setitem(sys.modules, "langchain_core.documents", docs)
+
+    get_embedding_cache().clear()
+    store = _ChromaLike()
+    rule = {"source_type": "rule"}
+    reqs = [
+        {"query": "q one", "k": 2, "filter_dict": rule},
+        {"query": "q two", "k": 3, "filter_dict": rule},
+        {"query": "q three", "k": 1, "filter_dict": None},
+    ]
+    out = query_vectorstore_batch(store, reqs)
+
+    assert store._embedding_function.doc_calls == [["q one", "q two", "q three"]]
+    calls = store._collection.calls
+    assert len(calls) == 2
+    assert calls[0] == ([[5.0, 1.0], [5.0, 1.0]], 3, rule)
+    assert calls[1] == ([[7.0, 1.0]], 1, None)
+    assert [len(h) for h in out] == [2, 3, 1]
+    doc, dist = out[1][2]
+    assert doc.page_content == "doc1-2" and doc.metadata == {"rank": 2, "q": 1} and dist == 0.2
+    assert out[2][0][0].page_content == "doc0-0"
+
+
+class CountingEmbeddings:
+    model_name = "dummy-minilm"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class ChromaLikeStore:
+    def __init__(self, hits):
+        self._hits = hits
+        self._embedding_function = CountingEmbeddings()
+        self.vectors = []
+        self.filters = []
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=5, filter=None):
+        self.vectors.append(embedding)
+        self.filters.append(filter)
+        return self._hits[:k]
+
+
+def test_query_vectorstore_caches_query_embeddings():
+    cache = get_embedding_cache()
+    cache.clear()
+    hits = [(_Document("IF A THEN B", {"investor_id": "ray_dalio", "rule_id": "R-1"}), 0.1)]
+    vs = ChromaLikeStore(hits)
+
+    assert query_vectorstore(vs, "通胀 上行，  怎么配置？", k=1) == hits
+    assert query_vectorstore(vs, "  通胀 上行， 怎么配置？ ", k=1, filter_dict={"source_type": "rule"}) == hits
+    query_vectorstore(vs, "另一个问题", k=1)
+
+    assert vs._embedding_function.calls == ["通胀 上行， 怎么配置？", "另一个问题"]
+    assert vs.vectors[0] == vs.vectors[1]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+
+
+def test_embedding_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_size=2)
+    cache.put(("m", "a"), [1.0])
+    cache.put(("m", "b"), [2.0])
+    assert cache.get(("m", "a")) == (1.0,)
+    cache.put(("m", "c"), [3.0])
+    assert cache.get(("m", "b")) is None
+    assert cache.get(("m", "a")) == (1.0,)
+    assert len(cache) == 2
+
+
+def test_query_batch_embeds_once_and_keeps_request_order(monkeypatch):
+    import services.rag_service as rs
+
+    get_embedding_cache().clear()
+    hits = [
+        (_Document("IF A THEN B", {"investor_id": "ray_dalio", "rule_id": "R-1"}), 0.1),
+        (_Document("IF C THEN D", {"investor_id": "warren_buffett", "rule_id": "R-2"}), 0.2),
+    ]
+    vs = ChromaLikeStore(hits)
+    monkeypatch.setattr(rs, "vectorstore", vs)
+    monkeypatch.delenv("IMH_API_TOKEN", raising=False)
+
+    client = TestClient(rs.app)
+    resp = client.post(
+        "/api/rag/query_batch",
+        json=[
+            {"query": "通胀", "top_k": 1},
+            {"query": "护城河", "top_k": 2, "source_type": "rule"},
+            {"query": "通胀 ", "top_k": 2},
+        ],
+    )
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+
+    assert [len(r) for r in data] == [1, 2, 2]
+    assert data[0][0]["metadata"]["rule_id"] == "R-1"
+    assert data[1][1]["similarity_estimate"] == 0.8
+    # one embed_documents call for the distinct queries
+    assert vs._embedding_function.calls == [["通胀", "护城河"]]
+    assert sorted(map(str, vs.filters)) == sorted(map(str, [None, None, {"source_type": "rule"}]))
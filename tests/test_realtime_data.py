@@ -0,0 +1,204 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from services.realtime_data import RealTimeDataPipeline
+
+
+def _slow(value, delay, calls, name):
+    async def _fetch(*_args):
+        calls.append(name)
+        await asyncio.sleep(delay)
+        return value
+
+    return _fetch
+
+
+def test_get_all_features_runs_concurrently_and_coalesces(tmp_path, monkeypatch):
+    monkeypatch.delenv("FRED_API_KEY", raising=False)
+    pipeline = RealTimeDataPipeline(cache_dir=str(tmp_path))
+    calls = []
+    pipeline._fetch_vix = _slow(21.0, 0.2, calls, "vix")
+    pipeline._fetch_inflation_rate = _slow(3.1, 0.2, calls, "inflation")
+    pipeline._fetch_federal_funds_rate = _slow(4.5, 0.2, calls, "rates")
+    pipeline._fetch_treasury_yield = _slow(4.2, 0.2, calls, "treasury")
+    pipeline._fetch_sp500_pe_ratio = _slow(22.0, 0.2, calls, "pe")
+
+    async def main():
+        await pipeline.start()
+        session = pipeline.session
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(pipeline.get_all_features() for _ in range(10)), pipeline.get_vix())
+        elapsed = time.perf_counter() - t0
+        await pipeline.start()  # idempotent: same pooled session
+        same_session = pipeline.session is session and not session.closed
+        await pipeline.stop()
+        return results, elapsed, same_session
+
+    results, elapsed, same_session = asyncio.run(main())
+    assert results[0] == {"vix": 21.0, "inflation": 3.1, "rates": 4.5, "treasury_10y": 4.2, "sp500_pe_ratio": 22.0}
+    assert all(r == results[0] for r in results[:10]) and results[10] == 21.0
+    # bounded by the slowest single feature, not the sum (5 x 0.2s)
+    assert elapsed < 0.6
+    # 11 callers, one upstream fetch per feature
+    assert sorted(calls) == ["inflation", "pe", "rates", "treasury", "vix"]
+    assert same_session
+
+
+def test_fred_fetches_share_one_keepalive_session(tmp_path, monkeypatch):
+    peers = set()
+
+    async def observations(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        value = {"FEDFUNDS": "5.33", "DGS10": "4.10"}.get(request.query["series_id"], "1.0")
+        return web.json_response({"observations": [{"value": value}]})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/fred/series/observations", observations)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        monkeypatch.setenv("FRED_API_KEY", "test")
+        pipeline = RealTimeDataPipeline(cache_dir=str(tmp_path))
+        pipeline.fred_url = f"http://127.0.0.1:{port}/fred/series/observations"
+        try:
+            await pipeline.start()
+            rates = await pipeline.get_federal_funds_rate()
+            pipeline._cache.clear()
+            rates_again = await pipeline.get_federal_funds_rate()
+            ten_year = await pipeline.get_treasury_yield("10Y")
+        finally:
+            await pipeline.stop()
+            await runner.cleanup()
+        return rates, rates_again, ten_year
+
+    rates, rates_again, ten_year = asyncio.run(main())
+    assert rates == rates_again == 5.33
+    assert ten_year == 4.10
+    assert len(peers) == 1
+
+
+class _FakeTicker:
+    state = {"^VIX": 18.0, "SPY": 500.0, "delay": 0.0, "fail": False}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period="1d"):
+        import pandas as pd
+
+        time.sleep(self.state["delay"])
+        if self.state["fail"]:
+            raise RuntimeError("upstream down")
+        return pd.DataFrame({"Close": [self.state[self.symbol]]})
+
+
+def test_stale_while_revalidate_and_background_scheduler(tmp_path, monkeypatch):
+    import sys
+    import types
+
+    fake_yf = types.ModuleType("yfinance")
+    fake_yf.Ticker = _FakeTicker
+    monkeypatch.setitem(sys.modules, "yfinance", fake_yf)
+    _FakeTicker.state.update({"^VIX": 18.0, "delay": 0.0, "fail": False})
+    fred = {"FEDFUNDS": "5.33", "delay": 0.0}
+
+    async def observations(request):
+        await asyncio.sleep(fred["delay"])
+        return web.json_response({"observations": [{"value": fred.get(request.query["series_id"], "4.0")}]})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/obs", observations)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        monkeypatch.setenv("FRED_API_KEY", "test")
+        pipeline = RealTimeDataPipeline(
+            cache_dir=str(tmp_path),
+            refresh_intervals_s={"vix": 0.2, "rates": 0.2, "treasury_10y": 60, "inflation": 60, "sp500_pe_ratio": 60},
+        )
+        pipeline.fred_url = f"http://127.0.0.1:{port}/obs"
+        out = {}
+        try:
+            out["cold"] = await pipeline.get_all_features()
+
+            # upstream becomes slow: stale values are served immediately, refresh runs behind
+            await asyncio.sleep(0.25)
+            _FakeTicker.state.update({"^VIX": 30.0, "delay": 0.3})
+            fred.update({"FEDFUNDS": "5.50", "delay": 0.3})
+            t0 = time.perf_counter()
+            out["stale"] = await pipeline.get_all_features()
+            out["stale_elapsed"] = time.perf_counter() - t0
+            out["refreshing"] = pipeline.feature_status()["vix"]["refreshing"]
+            await asyncio.sleep(0.5)
+            out["revalidated"] = await pipeline.get_all_features()
+
+            # scheduler refreshes without any request; failures keep the last good value
+            _FakeTicker.state.update({"^VIX": 35.0, "delay": 0.0})
+            fred["delay"] = 0.0
+            pipeline.start_scheduler()
+            await asyncio.sleep(0.5)
+            out["scheduled"] = pipeline.feature_status()
+            _FakeTicker.state["fail"] = True
+            await asyncio.sleep(0.5)
+            out["failed"] = pipeline.feature_status()["vix"]
+        finally:
+            await pipeline.stop()
+            await runner.cleanup()
+        return out
+
+    out = asyncio.run(main())
+    assert out["cold"]["vix"] == 18.0 and out["cold"]["rates"] == 5.33
+    assert out["stale"]["vix"] == 18.0 and out["stale"]["rates"] == 5.33
+    assert out["stale_elapsed"] < 0.1
+    assert out["refreshing"] is True
+    assert out["revalidated"]["vix"] == 30.0 and out["revalidated"]["rates"] == 5.50
+    assert out["scheduled"]["vix"]["value"] == 35.0
+    assert out["scheduled"]["inflation"]["stale"] is False
+    assert out["failed"]["value"] == 35.0
+    assert out["failed"]["failures"] >= 1
+
+
+def test_upstream_failure_is_not_reported_as_fresh(tmp_path, monkeypatch):
+    import json
+    from datetime import datetime, timedelta
+
+    monkeypatch.delenv("FRED_API_KEY", raising=False)
+    saved_at = datetime.now() - timedelta(hours=20)
+    (tmp_path / "rates.json").write_text(json.dumps({"value": 5.1, "timestamp": saved_at.isoformat()}), encoding="utf-8")
+    pipeline = RealTimeDataPipeline(cache_dir=str(tmp_path))
+
+    async def _down():
+        raise RuntimeError("upstream down")
+
+    pipeline._fetch_vix = _down
+
+    async def main():
+        try:
+            features = await pipeline.get_all_features()
+            rates = await pipeline.get_federal_funds_rate()
+            return features, rates, pipeline.feature_status()
+        finally:
+            await pipeline.stop()
+
+    features, rates, status = asyncio.run(main())
+    # cold state seeded from the file cache, with the file's own timestamp
+    assert features["rates"] == rates == 5.1
+    assert status["rates"]["fetched_at"] == saved_at.timestamp()
+    assert status["rates"]["age_s"] > 19 * 3600 and status["rates"]["stale"] is True
+    assert status["rates"]["last_error"] == "RuntimeError: FRED_API_KEY not set"
+    assert status["rates"]["failures"] >= 1
+    # nothing cached at all: no value, real error, backoff instead of a fresh timestamp
+    assert "vix" not in features
+    assert status["vix"]["value"] is None and status["vix"]["fetched_at"] is None
+    assert status["vix"]["last_error"] == "RuntimeError: upstream down"
+    assert pipeline._features["vix"].next_due() > pipeline._features["vix"].last_attempt_mono
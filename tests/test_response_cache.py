@@ -0,0 +1,101 @@
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from tools.audit_log import open_segment, segment_paths
+from tools.response_cache import ResponseCache
+
+
+def test_lru_ttl_and_version_invalidation(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("tools.response_cache.time.monotonic", lambda: clock[0])
+    c = ResponseCache(max_entries=2, ttl_s=10)
+
+    c.put("a", "v1", 1)
+    c.put("b", "v1", 2)
+    assert c.get("a", "v1") == 1
+    c.put("c", "v1", 3)  # evicts b (least recently used)
+    assert c.get("b", "v1") is None and c.get("c", "v1") == 3
+
+    clock[0] += 11
+    assert c.get("a", "v1") is None  # expired
+
+    c.put("a", "v1", 1)
+    assert c.get("a", "v2") is None  # new version drops everything
+    assert len(c) == 0 and c.stats()["invalidations"] == 1
+
+    off = ResponseCache(max_entries=0)
+    off.put("a", "v1", 1)
+    assert off.get("a", "v1") is None and not off.enabled
+
+
+class _Doc:
+    def __init__(self, content, metadata):
+        self.page_content = content
+        self.metadata = metadata
+
+
+class _CountingStore:
+    def __init__(self):
+        self.queries = 0
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        self.queries += 1
+        return [(_Doc("IF vix > 40 THEN cut risk", {"investor_id": "ray_dalio", "rule_id": "R-1"}), 0.25)][:k]
+
+
+def _read_audit(path):
+    rows = []
+    for seg in segment_paths(path):
+        with open_segment(seg) as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+    return rows
+
+
+def test_policy_gate_cache_hit_skips_retrieval_but_audits(monkeypatch, tmp_path):
+    import services.rag_service as rs
+
+    store = _CountingStore()
+    monkeypatch.setattr(rs, "vectorstore", store)
+    monkeypatch.setattr(rs, "VECTORSTORE_STATUS", dict(rs.VECTORSTORE_STATUS, last_sync=None))
+    sink = rs.AuditSink(tmp_path / "audit.jsonl")
+    monkeypatch.setattr(rs, "_audit_sink", sink)
+    monkeypatch.setattr(rs, "_gate_cache", rs.ResponseCache(max_entries=16, ttl_s=60))
+    client = TestClient(rs.app)
+
+    body = {"text": "inflation is rising, should I cut equity risk?", "features": {"vix": 30, "inflation": 4.0}}
+    first = client.post("/api/policy/gate", params={"auto_fill_features": False}, json=body)
+    second = client.post("/api/policy/gate", params={"auto_fill_features": False}, json=body)
+    assert first.status_code == second.status_code == 200
+    assert store.queries == 1
+    a, b = first.json(), second.json()
+    assert b["audit"].pop("cache") == "hit"
+    a["audit"].pop("ts"), b["audit"].pop("ts")
+    assert a == b
+
+    # different input -> miss
+    client.post("/api/policy/gate", params={"auto_fill_features": False}, json=dict(body, features={"vix": 45}))
+    assert store.queries == 2
+
+    # a vectorstore sync invalidates
+    rs.VECTORSTORE_STATUS["last_sync"] = {"ts": time.time()}
+    client.post("/api/policy/gate", params={"auto_fill_features": False}, json=body)
+    assert store.queries == 3
+
+    sink.stop()
+    audit = _read_audit(tmp_path / "audit.jsonl")
+    assert len(audit) == 4
+    assert [r.get("cache") for r in audit] == [None, "hit", None, None]
+    assert audit[1]["input_hash"] == audit[0]["input_hash"]
+    assert audit[1]["rule_hits_meta"] == audit[0]["rule_hits_meta"]
+
+
+def test_cache_lookup_is_sub_millisecond():
+    c = ResponseCache(max_entries=1024, ttl_s=60)
+    for i in range(1024):
+        c.put(("h%d" % i, 5, 8), ("cfg", (1, 2, 3)), {"i": i})
+    t0 = time.perf_counter()
+    for i in range(10000):
+        assert c.get(("h%d" % (i % 1024), 5, 8), ("cfg", (1, 2, 3))) is not None
+    assert (time.perf_counter() - t0) / 10000 < 1e-3
@@ -0,0 +1,57 @@
+import random
+
+from tools.router_index import INTENT_KEYWORDS, RouterIndex, investor_field_tokens, route_reference
+
+
+def _sample_queries(idx):
+    queries = [
+        "",
+        "现在该买入 NVDA 吗？",
+        "市场恐慌暴跌，要不要止损？",
+        "估值太贵了，是不是泡沫？PE 很高",
+        "undervalued and cheap, margin of safety?",
+        "Warren Buffett 和 查理·芒格 怎么看护城河？",
+        "Fed 加息，利率转向，流动性收紧",
+        "黄金 比特币 抗通胀",
+    ]
+    queries.extend((idx.get("quick_lookup", {}) or {}).get("by_question", {}).keys())
+    for keys, _ids in INTENT_KEYWORDS.values():
+        queries.extend(keys)
+
+    vocab = []
+    for inv in idx.get("investors", []) or []:
+        vocab.extend([inv.get("chinese_name") or "", (inv.get("full_name") or "").upper()])
+        vocab.extend(investor_field_tokens(inv))
+    rng = random.Random(7)
+    for _ in range(200):
+        queries.append(" ".join(rng.sample(vocab, k=rng.randint(1, 6))))
+    return queries
+
+
+def test_router_index_matches_reference():
+    import services.rag_service as rs
+
+    idx = rs._load_index()
+    assert idx.get("investors")
+    compiled = RouterIndex(idx)
+    for q in _sample_queries(idx):
+        scen = rs._match_scenarios(q)
+        for k in (3, 5, 10):
+            assert compiled.route(q, top_k=k, matched_scenarios=scen) == route_reference(idx, q, top_k=k, matched_scenarios=scen), q
+
+
+def test_load_index_rebuilds_router_on_yaml_change(tmp_path, monkeypatch):
+    import os
+    import services.rag_service as rs
+
+    path = tmp_path / "investor_index.yaml"
+    path.write_text("investors:\n  - id: alpha\n    chinese_name: 阿尔法\n", encoding="utf-8")
+    monkeypatch.setattr(rs, "INDEX_PATH", path)
+    monkeypatch.setattr(rs.CONFIG, "check_interval_s", 0)
+
+    assert rs._route_investors("阿尔法怎么看？", top_k=1)[0]["investor_id"] == "alpha"
+
+    path.write_text("investors:\n  - id: beta\n    chinese_name: 贝塔\n", encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert rs._route_investors("贝塔怎么看？", top_k=1)[0]["investor_id"] == "beta"
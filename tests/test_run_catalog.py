@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tools.run_catalog import RunCatalog
+
+
+def _make_run(root, run_id, sharpe=None, sharpe_b=None, mtime=None):
+    d = root / run_id
+    d.mkdir(parents=True, exist_ok=True)
+    if sharpe is not None:
+        (d / "metrics_A.json").write_text(json.dumps({"sharpe_ratio": sharpe, "note": "x"}), encoding="utf-8")
+    if sharpe_b is not None:
+        (d / "metrics_B.json").write_text(json.dumps({"sharpe_ratio": sharpe_b}), encoding="utf-8")
+    if mtime is not None:
+        os.utime(d, (mtime, mtime))
+    return d
+
+
+def test_catalog_pages_sorts_and_filters(tmp_path):
+    for i, s in enumerate([0.5, 1.5, None, 1.0]):
+        _make_run(tmp_path, f"run{i}", sharpe=s, sharpe_b=0.2 if i == 2 else None, mtime=1_700_000_000 + i)
+    (tmp_path / "not_a_run").mkdir()
+    cat = RunCatalog(tmp_path, reconcile_interval_s=0)
+
+    res = cat.list_runs()
+    assert res["total"] == 4
+    assert [r["run_id"] for r in res["runs"]] == ["run3", "run2", "run1", "run0"]
+    assert res["runs"][0]["metrics"]["A"]["sharpe_ratio"] == 1.0 and res["runs"][0]["modes"] == ["A"]
+
+    by_sharpe = cat.list_runs(sort="A.sharpe_ratio", order="desc")
+    assert [r["run_id"] for r in by_sharpe["runs"]] == ["run1", "run3", "run0", "run2"]  # missing metric last
+    page = cat.list_runs(sort="A.sharpe_ratio", order="asc", offset=1, limit=2)
+    assert page["total"] == 4 and [r["run_id"] for r in page["runs"]] == ["run3", "run1"]
+
+    assert [r["run_id"] for r in cat.list_runs(filters=["A.sharpe_ratio>=1"])["runs"]] == ["run3", "run1"]
+    assert [r["run_id"] for r in cat.list_runs(mode="B")["runs"]] == ["run2"]
+    assert cat.list_runs(q="RUN0")["total"] == 1
+    with pytest.raises(ValueError):
+        cat.list_runs(filters=["sharpe; drop table runs"])
+
+
+def test_catalog_reconciles_by_mtime_and_persists(tmp_path):
+    _make_run(tmp_path, "a", sharpe=1.0)
+    cat = RunCatalog(tmp_path, reconcile_interval_s=0)
+    assert cat.reconcile()["updated"] == 1
+    assert cat.reconcile() == {"scanned": 1, "updated": 0, "removed": 0}
+
+    (tmp_path / "a" / "metrics_A.json").write_text(json.dumps({"sharpe_ratio": 2.0}), encoding="utf-8")
+    os.utime(tmp_path / "a" / "metrics_A.json", (1_800_000_000, 1_800_000_000))
+    _make_run(tmp_path, "b", sharpe=0.1)
+    assert cat.reconcile()["updated"] == 2
+    assert cat.list_runs(sort="A.sharpe_ratio")["runs"][0]["metrics"]["A"]["sharpe_ratio"] == 2.0
+    cat.close()
+
+    # a new instance reuses the on-disk catalog: nothing to re-read
+    cat2 = RunCatalog(tmp_path, reconcile_interval_s=0)
+    assert cat2.reconcile()["updated"] == 0
+    (tmp_path / "b" / "metrics_A.json").unlink()
+    (tmp_path / "b").rmdir()
+    assert cat2.reconcile()["removed"] == 1
+    assert [r["run_id"] for r in cat2.list_runs()["runs"]] == ["a"]
+
+
+def test_runs_endpoint_uses_catalog(tmp_path, monkeypatch):
+    import services.rag_service as rs
+
+    monkeypatch.delenv("IMH_API_TOKEN", raising=False)
+    monkeypatch.setattr(rs, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(rs, "_RUN_CATALOGS", {})
+    for i in range(5):
+        _make_run(tmp_path / "results", f"r{i}", sharpe=float(i), mtime=1_700_000_000 + i)
+    client = TestClient(rs.app)
+
+    body = client.get("/api/backtest/runs?root=results&sort=A.sharpe_ratio&order=asc&limit=2&offset=1").json()
+    assert body["total"] == 5 and [r["run_id"] for r in body["runs"]] == ["r1", "r2"]
+    body = client.get("/api/backtest/runs", params={"root": "results", "filter": ["A.sharpe_ratio>2", "A.sharpe_ratio<4"]}).json()
+    assert [r["run_id"] for r in body["runs"]] == ["r3"]
+    assert client.get("/api/backtest/runs?root=results&sort=bogus").status_code == 400
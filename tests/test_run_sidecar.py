@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from tools.run_sidecar import read_equity, read_history, sidecar_dir, write_run_sidecar
+
+
+def _run_outputs(n=2000):
+    idx = pd.bdate_range("2015-01-01", periods=n)
+    curve = pd.Series(100 * np.cumprod(1 + np.random.default_rng(3).normal(0, 0.01, n)), index=idx)
+    history = pd.DataFrame([
+        {"date": idx[i], "brief": f"brief {i}", "allocation": {"stocks": 60 - i % 7, "bonds": 20, "gold": 10, "cash": 10 + i % 7}}
+        for i in range(0, n, 10)
+    ])
+    history["equity"] = curve.to_numpy()[::10]
+    return curve, history
+
+
+def _write_csvs(run_dir, mode, curve, history):
+    os.makedirs(run_dir, exist_ok=True)
+    curve.to_csv(os.path.join(run_dir, f"equity_curve_{mode}.csv"))
+    history.to_csv(os.path.join(run_dir, f"history_{mode}.csv"), index=False)
+
+
+def test_sidecar_matches_csv_outputs(tmp_path):
+    curve, history = _run_outputs()
+    _write_csvs(tmp_path, "A", curve, history)
+    write_run_sidecar(tmp_path, "A", curve, history)
+
+    full = read_equity(tmp_path, "A", max_points=0)
+    assert [p["date"] for p in full] == [d.strftime("%Y-%m-%d") for d in curve.index]
+    assert [p["equity"] for p in full] == curve.tolist()
+    pts = read_equity(tmp_path, "A", max_points=900)
+    assert len(pts) <= 900 and pts[0] == full[0] and pts[-1] == full[-1]
+    assert all(p in full for p in pts[::50])
+
+    window = read_equity(tmp_path, "A", max_points=0, start="2016-03-01", end="2016-03-31")
+    assert [p["date"] for p in window] == [d.strftime("%Y-%m-%d") for d in curve["2016-03-01":"2016-03-31"].index]
+
+    rows = read_history(tmp_path, "A", max_rows=50)
+    assert len(rows) == 50
+    assert list(rows[3]) == ["date", "brief", "allocation", "equity"]
+    assert rows[3]["date"] == history["date"][3].strftime("%Y-%m-%d")
+    assert rows[3]["brief"] == "brief 30"
+    assert rows[3]["allocation"] == {"stocks": 58.0, "bonds": 20.0, "gold": 10.0, "cash": 12.0}
+    assert rows[3]["equity"] == float(history["equity"][3])
+
+
+def test_legacy_run_is_converted_from_csv_once(tmp_path):
+    curve, history = _run_outputs(300)
+    _write_csvs(tmp_path, "B", curve, history)
+    assert not (sidecar_dir(tmp_path, "B") / "meta.json").exists()
+
+    rows = read_history(tmp_path, "B", max_rows=0)
+    assert len(rows) == len(history)
+    assert rows[0]["allocation"] == {"stocks": 60.0, "bonds": 20.0, "gold": 10.0, "cash": 10.0}
+    meta_path = sidecar_dir(tmp_path, "B") / "meta.json"
+    built = meta_path.stat().st_mtime_ns
+    assert len(read_equity(tmp_path, "B", max_points=100)) <= 101
+    assert meta_path.stat().st_mtime_ns == built  # served from the sidecar, not rebuilt
+    assert read_equity(tmp_path, "A") == []
+
+
+def test_legacy_conversion_keeps_run_mtime_and_survives_read_only_root(tmp_path, monkeypatch):
+    import tools.run_sidecar as rsc
+
+    curve, history = _run_outputs(300)
+    run_dir = tmp_path / "old"
+    _write_csvs(run_dir, "A", curve, history)
+    os.utime(run_dir, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+    expected = read_equity(run_dir, "A", max_points=0)
+    assert (sidecar_dir(run_dir, "A") / "meta.json").exists()
+    assert run_dir.stat().st_mtime_ns == 1_600_000_000_000_000_000  # viewing is not modifying
+
+    ro = tmp_path / "ro"
+    _write_csvs(ro, "A", curve, history)
+
+    def _read_only(*_a):
+        raise PermissionError("read-only file system")
+
+    monkeypatch.setattr(rsc, "_write_built", _read_only)
+    assert read_equity(ro, "A", max_points=0) == expected
+    assert len(read_history(ro, "A", max_rows=0)) == len(history)
+    assert not sidecar_dir(ro, "A").exists()
+
+
+def test_backtest_run_endpoint_reads_sidecar(tmp_path, monkeypatch):
+    import services.rag_service as rs
+
+    monkeypatch.delenv("IMH_API_TOKEN", raising=False)
+    monkeypatch.setattr(rs, "PROJECT_ROOT", tmp_path)
+    run_dir = tmp_path / "results" / "run1"
+    curve, history = _run_outputs(1200)
+    _write_csvs(run_dir, "A", curve, history)
+    write_run_sidecar(run_dir, "A", curve, history)
+    (run_dir / "metrics_A.json").write_text(json.dumps({"sharpe_ratio": 1.0}), encoding="utf-8")
+
+    resp = TestClient(rs.app).get("/api/backtest/runs/run1?root=results")
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert len(body["equity"]["A"]) <= 901
+    assert body["equity"]["A"][-1]["equity"] == float(curve.iloc[-1])
+    assert len(body["history"]["A"]) == 120
+    assert body["history"]["A"][0]["allocation"]["stocks"] == 60.0
+
+    client = TestClient(rs.app)
+    zoom = client.get("/api/backtest/runs/run1/equity?root=results&mode=A&start=2016-01-01&end=2016-06-30&max_points=50")
+    assert zoom.status_code == 200, zoom.text
+    pts = zoom.json()["points"]
+    assert 0 < len(pts) <= 50 and pts[0]["date"] >= "2016-01-01" and pts[-1]["date"] <= "2016-06-30"
+    assert client.get("/api/backtest/runs/run1?root=results&downsample=bogus").status_code == 400
+    for bad in ("start=2020-02-30", "end=2020-13-01", "start=20200101", "max_points=-1", "max_points=10001"):
+        assert client.get(f"/api/backtest/runs/run1/equity?root=results&mode=A&{bad}").status_code == 400, bad
+        assert client.get(f"/api/backtest/runs/run1?root=results&{bad}").status_code == 400, bad
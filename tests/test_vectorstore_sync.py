@@ -0,0 +1,64 @@
+from tools.vectorstore_sync import MANIFEST_NAME, load_manifest, sync_vectorstore
+
+
+class Doc:
+    def __init__(self, content, **metadata):
+        self.page_content = content
+        self.metadata = metadata
+
+
+class FakeEmbeddings:
+    model_name = "dummy-minilm"
+
+
+class FakeChroma:
+    def __init__(self, legacy_ids=()):
+        self._embedding_function = FakeEmbeddings()
+        self.docs = {i: None for i in legacy_ids}
+        self.embedded = []
+
+    def get(self, include=None):
+        return {"ids": list(self.docs)}
+
+    def delete(self, ids=None):
+        for i in ids or []:
+            self.docs.pop(i, None)
+
+    def add_documents(self, documents, ids=None):
+        self.embedded.extend(ids)
+        self.docs.update(zip(ids, documents))
+
+
+def _corpus(buffett_text="护城河"):
+    return [
+        Doc(buffett_text, investor_id="warren_buffett", chunk_id="warren_buffett#0", source_type="investor_doc"),
+        Doc("周期", investor_id="howard_marks", chunk_id="howard_marks#0", source_type="investor_doc"),
+        Doc("IF A THEN B", investor_id="ray_dalio", rule_id="R-1", source_type="rule"),
+    ]
+
+
+def test_sync_embeds_only_changed_chunks(tmp_path):
+    vs = FakeChroma(legacy_ids=["uuid-1", "uuid-2"])
+
+    # no manifest yet: one full rebuild that also drops legacy random ids
+    stats = sync_vectorstore(vs, _corpus(), str(tmp_path))
+    assert stats["full_rebuild"] and stats["added"] == 3 and stats["deleted"] == 2
+    assert sorted(vs.docs) == ["doc:howard_marks#0", "doc:warren_buffett#0", "rule:R-1"]
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+    # unchanged corpus: nothing to embed
+    vs.embedded.clear()
+    stats = sync_vectorstore(vs, _corpus(), str(tmp_path))
+    assert (stats["added"], stats["updated"], stats["deleted"], stats["unchanged"]) == (0, 0, 0, 3)
+    assert vs.embedded == []
+
+    # one edited file + one removed rule + one new rule
+    corpus = _corpus("护城河与定价权")[:2] + [Doc("IF C THEN D", investor_id="ray_dalio", rule_id="R-2", source_type="rule")]
+    dry = sync_vectorstore(vs, corpus, str(tmp_path), dry_run=True)
+    assert vs.embedded == [] and dry["dry_run"]
+    stats = sync_vectorstore(vs, corpus, str(tmp_path))
+    assert (stats["added"], stats["updated"], stats["deleted"], stats["unchanged"]) == (1, 1, 1, 1)
+    assert sorted(vs.embedded) == ["doc:warren_buffett#0", "rule:R-2"]
+    assert vs.docs["doc:warren_buffett#0"].page_content == "护城河与定价权"
+    assert "rule:R-1" not in vs.docs
+    assert sorted(load_manifest(str(tmp_path))["chunks"]) == sorted(vs.docs)
@@ -0,0 +1,346 @@
+"""
+Sidecar index over the policy gate audit log (tools/audit_log.py segments).
+
+The audit JSONL only supports grepping. This keeps a SQLite index next to it
+(<stem>.index.sqlite) with one row per record -- segment, byte offset/length, ts, regime,
+policy_hash, input_hash, primary scenario -- plus (kind, value) tags for investor ids
+(router + rule hits) and rule ids. Queries filter in SQL and then seek straight to the
+matching lines; nothing is scanned.
+
+Indexing is incremental; only bytes past the last indexed offset are read. Segments are
+keyed by name: rotated segments by their rotation stamp (<stem>.<stamp>.jsonl, the same
+key before and after compression), the active file as "active". After a rotation the
+"active" entries are handed over to the new stamped segment (same inode, or -- once
+compressed -- same first line), so identical records in different segments can never
+share offsets. Segments pruned from disk are dropped from the index; a segment that
+cannot be read yet (e.g. a truncated .gz) is skipped and retried on the next refresh.
+Offsets are in uncompressed bytes (.gz segments are read through gzip's seek).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from tools.audit_log import open_segment, segment_paths
+
+INDEX_VERSION = "2"
+ACTIVE_KEY = "active"
+# truncated / still-being-written gzip segments raise EOFError or zlib.error (BadGzipFile is an OSError)
+_READ_ERRORS = (OSError, EOFError, zlib.error)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    seg TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    fp TEXT NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    indexed_bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    seg TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ts INTEGER,
+    regime TEXT,
+    policy_hash TEXT,
+    input_hash TEXT,
+    scenario TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_ts ON records (ts);
+CREATE INDEX IF NOT EXISTS idx_records_regime ON records (regime, ts);
+CREATE INDEX IF NOT EXISTS idx_records_policy ON records (policy_hash, ts);
+CREATE INDEX IF NOT EXISTS idx_records_input ON records (input_hash);
+CREATE INDEX IF NOT EXISTS idx_records_seg ON records (seg, offset);
+CREATE TABLE IF NOT EXISTS record_tags (
+    rec_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tags ON record_tags (kind, value, rec_id);
+CREATE INDEX IF NOT EXISTS idx_tags_rec ON record_tags (rec_id);
+CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def default_index_path(audit_path: Union[str, Path]) -> Path:
+    p = Path(audit_path)
+    return p.with_name(f"{p.stem}.index.sqlite")
+
+
+def parse_time(value: Union[None, int, float, str]) -> Optional[int]:
+    """Epoch seconds from an int/float, a numeric string, or an ISO date / datetime (local time)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    s = str(value).strip()
+    try:
+        return int(float(s))
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(s).timestamp())
+    except ValueError:
+        raise ValueError(f"invalid time {value!r} (expected epoch seconds or ISO date/datetime)")
+
+
+def _fingerprint(path: Path) -> Optional[str]:
+    try:
+        with open_segment(path) as f:
+            first = f.readline()
+    except _READ_ERRORS:
+        return None
+    if not first.endswith(b"\n"):
+        return None
+    return hashlib.sha1(first).hexdigest()
+
+
+def _tags(record: Dict[str, Any]) -> List[Tuple[str, str]]:
+    out = set()
+    for r in record.get("router") or []:
+        if isinstance(r, dict) and r.get("investor_id"):
+            out.add(("investor", str(r["investor_id"])))
+    for h in record.get("rule_hits_meta") or []:
+        if not isinstance(h, dict):
+            continue
+        if h.get("investor_id"):
+            out.add(("investor", str(h["investor_id"])))
+        if h.get("rule_id"):
+            out.add(("rule", str(h["rule_id"])))
+    return sorted(out)
+
+
+class AuditIndex:
+    def __init__(self, audit_path: Union[str, Path], index_path: Optional[Union[str, Path]] = None, refresh_interval_s: float = 1.0):
+        self.audit_path = Path(audit_path)
+        self.index_path = Path(index_path) if index_path else default_index_path(self.audit_path)
+        self.refresh_interval_s = refresh_interval_s
+        self._refreshed_at = float("-inf")
+        self._lock = threading.RLock()
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.index_path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM index_meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != INDEX_VERSION:
+                for table in ("segments", "records", "record_tags"):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self._conn.executescript(_SCHEMA)
+                self._conn.execute("INSERT OR REPLACE INTO index_meta VALUES ('version', ?)", (INDEX_VERSION,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- indexing ----------
+
+    def _segment_key(self, path: Path) -> str:
+        if path == self.audit_path:
+            return ACTIVE_KEY
+        return path.name[:-3] if path.name.endswith(".gz") else path.name
+
+    @staticmethod
+    def _read_tail(path: Path, start: int) -> Tuple[int, List[Tuple[int, bytes, Dict[str, Any]]]]:
+        """Complete lines from byte `start`: (new indexed offset, [(offset, line, record)]).
+        Reads the whole tail before anything is inserted, so a read error leaves no partial rows."""
+        pos = start
+        out: List[Tuple[int, bytes, Dict[str, Any]]] = []
+        with open_segment(path) as f:
+            if start:
+                f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written line: picked up next time
+                offset, pos = pos, pos + len(line)
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec, dict):
+                    out.append((offset, line, rec))
+        return pos, out
+
+    def _insert(self, seg: str, rows: List[Tuple[int, bytes, Dict[str, Any]]]) -> None:
+        c = self._conn
+        for offset, line, rec in rows:
+            regime = rec.get("regime") if isinstance(rec.get("regime"), dict) else {}
+            scenario = rec.get("scenario") if isinstance(rec.get("scenario"), dict) else {}
+            cur = c.execute(
+                "INSERT INTO records (seg, offset, length, ts, regime, policy_hash, input_hash, scenario)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (seg, offset, len(line), rec.get("ts"), regime.get("id"), rec.get("policy_hash"),
+                 rec.get("input_hash"), scenario.get("primary")),
+            )
+            c.executemany(
+                "INSERT INTO record_tags (rec_id, kind, value) VALUES (?, ?, ?)",
+                [(cur.lastrowid, k, v) for k, v in _tags(rec)],
+            )
+
+    def _drop(self, seg: str) -> None:
+        c = self._conn
+        c.execute("DELETE FROM record_tags WHERE rec_id IN (SELECT id FROM records WHERE seg = ?)", (seg,))
+        c.execute("DELETE FROM records WHERE seg = ?", (seg,))
+        c.execute("DELETE FROM segments WHERE seg = ?", (seg,))
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """Index new bytes / segments (throttled to refresh_interval_s unless force=True)."""
+        now = time.monotonic()
+        stats = {"segments": 0, "indexed_segments": 0, "records": 0, "removed_segments": 0, "skipped_segments": 0}
+        with self._lock:
+            if not force and now - self._refreshed_at < self.refresh_interval_s:
+                return stats
+            self._refreshed_at = now
+            c = self._conn
+            cols = ("seg", "path", "fp", "ino", "size", "mtime_ns", "indexed_bytes")
+            known = {row[0]: dict(zip(cols, row)) for row in c.execute(f"SELECT {', '.join(cols)} FROM segments")}
+            active = known.get(ACTIVE_KEY)
+            seen = set()
+            before = c.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            with c:
+                # oldest first, active file last: a freshly rotated segment adopts the "active" entries first
+                for path in segment_paths(self.audit_path):
+                    stats["segments"] += 1
+                    key = self._segment_key(path)
+                    row = known.get(key)
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        if row:
+                            seen.add(key)
+                        continue
+                    if row and row["path"] == str(path) and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns:
+                        seen.add(key)
+                        continue
+                    fp = _fingerprint(path)
+                    if fp is None:
+                        if row:
+                            seen.add(key)  # unreadable for now (e.g. partial .gz): keep, retry later
+                        stats["skipped_segments"] += 1
+                        continue
+                    if row is None and key != ACTIVE_KEY and active is not None and (
+                        active["ino"] == st.st_ino or (path.suffix == ".gz" and active["fp"] == fp)
+                    ):
+                        # the previous active file, renamed (and maybe compressed) by rotation
+                        c.execute("UPDATE records SET seg = ? WHERE seg = ?", (key, ACTIVE_KEY))
+                        c.execute("DELETE FROM segments WHERE seg = ?", (ACTIVE_KEY,))
+                        row, active = dict(active, seg=key), None
+                        known.pop(ACTIVE_KEY, None)
+                    elif row is not None and (
+                        row["fp"] != fp
+                        or (key == ACTIVE_KEY and row["ino"] != st.st_ino)
+                        or (st.st_size < row["size"] and path.suffix != ".gz")
+                    ):
+                        # a different file under the same name: reindex from scratch
+                        self._drop(key)
+                        row = None
+                    done = row["indexed_bytes"] if row else 0
+                    try:
+                        indexed, rows = self._read_tail(path, done)
+                    except _READ_ERRORS:
+                        if row:
+                            # keep what is indexed; retry the tail once the file is complete
+                            c.execute(
+                                "INSERT OR REPLACE INTO segments (seg, path, fp, ino, size, mtime_ns, indexed_bytes)"
+                                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (key, row["path"], row["fp"], row["ino"], row["size"], row["mtime_ns"], done),
+                            )
+                            seen.add(key)
+                        stats["skipped_segments"] += 1
+                        continue
+                    self._insert(key, rows)
+                    if indexed != done:
+                        stats["indexed_segments"] += 1
+                    c.execute(
+                        "INSERT OR REPLACE INTO segments (seg, path, fp, ino, size, mtime_ns, indexed_bytes)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, str(path), fp, st.st_ino, st.st_size, st.st_mtime_ns, indexed),
+                    )
+                    seen.add(key)
+                gone = [k for k in known if k not in seen]
+                for k in gone:
+                    self._drop(k)
+                stats["removed_segments"] = len(gone)
+            stats["records"] = c.execute("SELECT COUNT(*) FROM records").fetchone()[0] - before
+        return stats
+
+    # ---------- querying ----------
+
+    def search(
+        self,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        regime: Optional[str] = None,
+        policy_hash: Optional[str] = None,
+        investor: Optional[str] = None,
+        rule_id: Optional[str] = None,
+        input_hash: Optional[str] = None,
+        scenario: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        order: str = "desc",
+        refresh: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        {"total", "offset", "limit", "records": [full audit records]} for records with
+        start_ts <= ts < end_ts (epoch seconds) matching every given filter; newest first by default.
+        """
+        if refresh:
+            self.refresh()
+        where: List[str] = []
+        params: List[Any] = []
+        if start_ts is not None:
+            where.append("r.ts >= ?")
+            params.append(int(start_ts))
+        if end_ts is not None:
+            where.append("r.ts < ?")
+            params.append(int(end_ts))
+        for col, val in (("regime", regime), ("policy_hash", policy_hash), ("input_hash", input_hash), ("scenario", scenario)):
+            if val:
+                where.append(f"r.{col} = ?")
+                params.append(val)
+        for kind, val in (("investor", investor), ("rule", rule_id)):
+            if val:
+                where.append("EXISTS (SELECT 1 FROM record_tags t WHERE t.rec_id = r.id AND t.kind = ? AND t.value = ?)")
+                params.extend([kind, val])
+        where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+        direction = "ASC" if str(order).lower() == "asc" else "DESC"
+        limit = max(1, int(limit))
+        offset = max(0, int(offset))
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM records r{where_sql}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT r.id, s.path, r.offset, r.length FROM records r JOIN segments s ON s.seg = r.seg{where_sql}"
+                f" ORDER BY r.ts {direction}, r.id {direction} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return {"total": int(total), "offset": offset, "limit": limit, "records": self._load(rows)}
+
+    @staticmethod
+    def _load(rows: Sequence[Tuple[int, str, int, int]]) -> List[Dict[str, Any]]:
+        # one open per segment, seeks in offset order; results keep the query order
+        out: Dict[int, Dict[str, Any]] = {}
+        by_path: Dict[str, List[Tuple[int, int, int]]] = {}
+        for rec_id, path, off, length in rows:
+            by_path.setdefault(path, []).append((off, length, rec_id))
+        for path, items in by_path.items():
+            try:
+                with open_segment(path) as f:
+                    for off, length, rec_id in sorted(items):
+                        f.seek(off)
+                        try:
+                            out[rec_id] = json.loads(f.read(length))
+                        except ValueError:
+                            continue
+            except _READ_ERRORS:
+                continue
+        return [out[r[0]] for r in rows if r[0] in out]
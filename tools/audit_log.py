@@ -0,0 +1,326 @@
+"""
+Batched, rotating JSONL audit writer (policy gate audit log).
+
+The request path only serializes the record and puts it on a bounded in-memory queue;
+a background thread drains the queue in batches (one write per batch), flushes, and
+fsyncs at most every `fsync_interval_s`. No disk I/O happens on the caller's thread.
+
+- rotation: the active file keeps its name (logs/policy_gate_audit.jsonl); when it would
+  exceed `max_bytes`, or the local date changed, it is renamed to
+  <stem>.<YYYYmmdd-HHMMSS>.jsonl (optionally gzip-compressed afterwards, off the hot path,
+  into a hidden temp file that is renamed into place, so readers never see a partial .gz)
+  and `keep_segments` > 0 prunes the oldest rotated segments
+- overflow: "drop" (default) rejects new records when the queue is full; "block" waits up
+  to `block_timeout_s` for space (backpressure for worker threads) and then drops.
+  A submit from an event-loop thread never blocks (it would stall every request on the
+  loop): there "block" behaves like "drop".
+  Drops are counted in stats() and in the optional Prometheus metrics (services/metrics.py)
+- stop() drains everything that was accepted and fsyncs
+
+Env configuration (see AuditSink.from_env): IMH_AUDIT_QUEUE_MAX, IMH_AUDIT_BATCH,
+IMH_AUDIT_FLUSH_S, IMH_AUDIT_FSYNC_S, IMH_AUDIT_MAX_MB, IMH_AUDIT_ROTATE_DAILY,
+IMH_AUDIT_COMPRESS, IMH_AUDIT_KEEP_SEGMENTS, IMH_AUDIT_OVERFLOW.
+"""
+
+import asyncio
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+OVERFLOW_POLICIES = ("drop", "block")
+_STOP = object()
+
+
+def _track(status: str, count: int = 1, queue_depth: Optional[int] = None) -> None:
+    # services.metrics needs prometheus_client (optional); metrics must never break auditing.
+    try:
+        from services.metrics import track_audit_sink
+    except Exception:
+        return
+    try:
+        track_audit_sink(status, count, queue_depth)
+    except Exception:
+        pass
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def segment_paths(path: Union[str, Path]) -> List[Path]:
+    """Rotated segments of `path` (oldest first), then the active file if it exists."""
+    path = Path(path)
+    stem, suffix = path.stem, path.suffix
+    rotated = [
+        p for p in path.parent.glob(f"{stem}.*{suffix}*")
+        if p != path and (p.name.endswith(suffix) or p.name.endswith(suffix + ".gz"))
+    ]
+    rotated.sort(key=lambda p: (p.stat().st_mtime, p.name))
+    return rotated + ([path] if path.exists() else [])
+
+
+def open_segment(path: Union[str, Path]):
+    """Binary reader for a segment (transparently gunzips .gz)."""
+    path = Path(path)
+    return gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+
+
+class AuditSink:
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval_s: float = 0.5,
+        fsync_interval_s: float = 5.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        rotate_daily: bool = True,
+        compress: bool = False,
+        keep_segments: int = 0,
+        overflow: str = "drop",
+        block_timeout_s: float = 1.0,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.path = Path(path)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = flush_interval_s
+        self.fsync_interval_s = fsync_interval_s
+        self.max_bytes = int(max_bytes)
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.keep_segments = int(keep_segments)
+        self.overflow = overflow
+        self.block_timeout_s = block_timeout_s
+        # called from the writer thread after each rotation: fn(old_path, new_path)
+        self.on_rotate: List[Callable[[Path, Path], None]] = []
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+        self._fh = None
+        self._size = 0
+        self._day: Optional[str] = None
+        self._last_fsync = time.monotonic()
+        self._stats = {"accepted": 0, "written": 0, "dropped": 0, "errors": 0, "batches": 0, "rotations": 0}
+        self._stats_lock = threading.Lock()
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, path: Union[str, Path]) -> "AuditSink":
+        env = os.getenv
+        return cls(
+            path,
+            max_queue=int(env("IMH_AUDIT_QUEUE_MAX", "10000")),
+            batch_size=int(env("IMH_AUDIT_BATCH", "500")),
+            flush_interval_s=float(env("IMH_AUDIT_FLUSH_S", "0.5")),
+            fsync_interval_s=float(env("IMH_AUDIT_FSYNC_S", "5")),
+            max_bytes=int(float(env("IMH_AUDIT_MAX_MB", "64")) * 1024 * 1024),
+            rotate_daily=env("IMH_AUDIT_ROTATE_DAILY", "1") != "0",
+            compress=env("IMH_AUDIT_COMPRESS", "0") == "1",
+            keep_segments=int(env("IMH_AUDIT_KEEP_SEGMENTS", "0")),
+            overflow=env("IMH_AUDIT_OVERFLOW", "drop"),
+        )
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    # ---------- producer side (hot path) ----------
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Queue one record; never touches the disk. False if it was dropped."""
+        self.start()
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        try:
+            if self.overflow == "block" and not _on_event_loop():
+                self._queue.put(line, timeout=self.block_timeout_s)
+            else:
+                self._queue.put_nowait(line)
+        except queue.Full:
+            self._count("dropped")
+            _track("dropped", 1, self._queue.qsize())
+            return False
+        self._count("accepted")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counters = dict(self._stats)
+        return dict(
+            counters,
+            queued=self._queue.qsize(),
+            running=bool(self._thread and self._thread.is_alive()),
+            path=str(self.path),
+            last_error=self.last_error,
+        )
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Drain accepted records, fsync and stop the writer (a later submit restarts it)."""
+        t = self._thread
+        if t is None or not t.is_alive():
+            return
+        self._queue.put(_STOP)
+        t.join(timeout)
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Block until everything queued so far is written (tests / shutdown helpers)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    # ---------- writer thread ----------
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[str] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                self._maybe_fsync()
+                continue
+            items = [item]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for it in items:
+                if it is _STOP:
+                    stopping = True
+                else:
+                    batch.append(it)
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+        self._maybe_fsync(force=True)
+        self._close()
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "ab")
+        self._size = self._fh.tell()
+        if self._size:
+            self._day = datetime.fromtimestamp(self.path.stat().st_mtime).strftime("%Y-%m-%d")
+        else:
+            self._day = datetime.now().strftime("%Y-%m-%d")
+
+    def _close(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+
+    def _write_batch(self, batch: List[str]) -> None:
+        data = "".join(batch).encode("utf-8")
+        try:
+            if self._fh is None:
+                self._open()
+            today = datetime.now().strftime("%Y-%m-%d")
+            if self._size and (
+                (self.max_bytes > 0 and self._size + len(data) > self.max_bytes)
+                or (self.rotate_daily and self._day != today)
+            ):
+                self._rotate()
+            if not self._size:
+                self._day = today
+            self._fh.write(data)
+            self._fh.flush()
+            self._size += len(data)
+            self._count("written", len(batch))
+            self._count("batches")
+            _track("written", len(batch), self._queue.qsize())
+            self._maybe_fsync()
+        except Exception as e:
+            # Never fail trading/analytics because logging failed
+            self._count("errors", len(batch))
+            self.last_error = f"{type(e).__name__}: {e}"
+            _track("error", len(batch))
+            self._close()
+
+    def _maybe_fsync(self, force: bool = False) -> None:
+        if self._fh is None or self.fsync_interval_s is None or self.fsync_interval_s < 0:
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval_s:
+            try:
+                os.fsync(self._fh.fileno())
+            except OSError as e:
+                self.last_error = f"fsync: {e}"
+            self._last_fsync = now
+
+    def _rotate(self) -> None:
+        self._maybe_fsync(force=True)
+        self._close()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        n = 1
+        while target.exists() or target.with_name(target.name + ".gz").exists():
+            target = self.path.with_name(f"{self.path.stem}.{stamp}-{n}{self.path.suffix}")
+            n += 1
+        os.replace(self.path, target)
+        self._count("rotations")
+        if self.compress:
+            gz = target.with_name(target.name + ".gz")
+            # hidden temp name (not matched by segment_paths) until the archive is complete
+            fd, tmp = tempfile.mkstemp(dir=str(target.parent), prefix=".tmp-", suffix=".gz")
+            try:
+                with open(target, "rb") as src, os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                shutil.copymode(target, tmp)
+                os.replace(tmp, gz)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+            os.unlink(target)
+            target = gz
+        for cb in list(self.on_rotate):
+            try:
+                cb(self.path, target)
+            except Exception as e:
+                self.last_error = f"on_rotate: {e}"
+        if self.keep_segments > 0:
+            rotated = [p for p in segment_paths(self.path) if p != self.path]
+            for old in rotated[: max(0, len(rotated) - self.keep_segments)]:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+        self._open()
+        self._day = datetime.now().strftime("%Y-%m-%d")
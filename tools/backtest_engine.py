@@ -3,28 +3,125 @@ import json
 import hashlib
 import pandas as pd
 import numpy as np
-import yfinance as yf
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
-from tools.llm_bridge import LLMConfig, LLMBridge
+from tools.llm_bridge import LLMConfig
+from tools.llm_cache import CachedLLMBridge, LLMResponseCache
+from tools.price_store import PriceStore
 from tools.rag_core import ensemble_reasoning, TieredEnsembleResponse
 
+
+def bucket_returns(prices: pd.DataFrame, ticker_map: Dict[str, str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Daily simple returns per bucket: (buckets, R) with R.shape == (len(prices), len(buckets)).
+
+    Buckets whose ticker is not in prices are dropped (they contributed nothing in the
+    old per-day loop either). Row 0 is 0 (no return on the first day).
+    """
+    buckets = [b for b, t in ticker_map.items() if t in prices.columns]
+    n = len(prices.index)
+    R = np.zeros((n, len(buckets)), dtype=float)
+    if n > 1 and buckets:
+        P = np.column_stack([prices[ticker_map[b]].to_numpy(dtype=float) for b in buckets])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            R[1:] = P[1:] / P[:-1] - 1
+    return buckets, R
+
+
+def equity_curve_kernel(returns: np.ndarray, alloc_schedule: np.ndarray, rebalance_mask: np.ndarray) -> np.ndarray:
+    """
+    Vectorized equity curve for a piecewise-constant allocation.
+
+    - returns: (N, B) daily bucket returns (row 0 ignored)
+    - alloc_schedule: (K+1, B) allocations in percent; row 0 is the initial allocation,
+      row j the allocation set on the j-th True day of rebalance_mask
+    - rebalance_mask: (N,) bool; an allocation set on day i applies from day i+1
+
+    Operation order matches the old per-day loop (per-bucket left-to-right sum, then a
+    running product), so results are bit-identical to it.
+    """
+    returns = np.asarray(returns, dtype=float)
+    alloc_schedule = np.asarray(alloc_schedule, dtype=float)
+    mask = np.asarray(rebalance_mask, dtype=bool)
+    n = returns.shape[0]
+    if mask.shape != (n,):
+        raise ValueError(f"rebalance_mask shape {mask.shape} != ({n},)")
+    if alloc_schedule.shape[0] != int(mask.sum()) + 1:
+        raise ValueError("alloc_schedule must have one row per rebalance plus the initial allocation")
+    if n == 0:
+        return np.zeros(0, dtype=float)
+
+    # segment id of the allocation held during day i = rebalances strictly before i
+    seg = np.zeros(n, dtype=np.intp)
+    seg[1:] = np.cumsum(mask[:-1])
+    weights = alloc_schedule[seg] / 100.0
+
+    day_return = np.zeros(n, dtype=float)
+    for b in range(returns.shape[1]):
+        day_return = day_return + weights[:, b] * returns[:, b]
+    growth = 1 + day_return
+    growth[0] = 1.0
+    return np.cumprod(growth)
+
+
+def latest_row_positions(as_of: pd.Series, date_strs: List[str]) -> np.ndarray:
+    """
+    For each date string d: position of the last row (frame order) with as_of <= d, or -1.
+
+    Same answer as `frame[frame['as_of_date'] <= d].iloc[-1]` per date, but one sort +
+    searchsorted for all rebalance dates instead of a boolean filter per date.
+    """
+    vals = as_of.to_numpy()
+    if not all(isinstance(v, str) for v in vals):
+        # Mixed / non-string column: keep pandas comparison semantics.
+        out = []
+        for d in date_strs:
+            pos = np.flatnonzero((as_of <= d).to_numpy())
+            out.append(pos[-1] if len(pos) else -1)
+        return np.array(out, dtype=np.intp)
+    if len(vals) == 0:
+        return np.full(len(date_strs), -1, dtype=np.intp)
+    order = np.argsort(vals, kind="stable")
+    latest = np.maximum.accumulate(order)
+    idx = np.searchsorted(vals[order], np.array(date_strs, dtype=object), side="right") - 1
+    return np.where(idx >= 0, latest[np.maximum(idx, 0)], -1).astype(np.intp)
+
+
+def _allocation_key(alloc: Optional[Dict[str, float]]) -> Tuple[str, str]:
+    # Two allocations give the same committee call iff both the cache key (sorted json)
+    # and the prompt text (dict repr) agree.
+    return json.dumps(alloc, sort_keys=True), str(alloc)
+
+
+def allocation_rows(allocs: List[Dict[str, float]], buckets: List[str]) -> np.ndarray:
+    """Allocation dicts -> (len(allocs), len(buckets)) matrix (missing buckets = 0)."""
+    return np.array([[a.get(b, 0) for b in buckets] for a in allocs], dtype=float).reshape(len(allocs), len(buckets))
+
+
 class BacktestEngine:
-    def __init__(self, results_dir: str = "results", llm_config: Optional[LLMConfig] = None):
+    def __init__(
+        self,
+        results_dir: str = "results",
+        llm_config: Optional[LLMConfig] = None,
+        llm_cache_dir: Optional[str] = None,
+        price_store_dir: Optional[str] = None,
+        offline_prices: Optional[bool] = None,
+    ):
         self.results_dir = results_dir
         self.llm_config = llm_config
-        self.bridge = LLMBridge(llm_config) if llm_config else None
+        # Shared, content-addressed LLM cache: identical prompts cost no LLM call across run_ids.
+        self.llm_cache = LLMResponseCache(llm_cache_dir or os.path.join(results_dir, ".llm_cache"))
+        self.bridge = CachedLLMBridge(llm_config, cache=self.llm_cache) if llm_config else None
+        # Local price store: only missing date ranges hit yfinance; offline never does.
+        self.price_store = PriceStore(price_store_dir or os.path.join(results_dir, ".price_store"), offline=offline_prices)
         
         if not os.path.exists(self.results_dir):
             os.makedirs(self.results_dir)
             
     def load_prices(self, tickers: List[str], start: str, end: str) -> pd.DataFrame:
-        """Fetch historical prices for tickers."""
-        print(f"Fetching prices for {tickers} from {start} to {end}...")
-        data = yf.download(tickers, start=start, end=end, progress=False)
-        if 'Close' in data:
-            return data['Close']
-        return data
+        """Historical close prices for tickers (served from the local price store)."""
+        return self.price_store.get_close(tickers, start, end)
 
     def build_rebalance_calendar(self, prices_index: pd.DatetimeIndex, step_trading_days: int = 10) -> List[datetime]:
         """Generate a list of rebalance dates every N trading days."""
@@ -42,8 +139,7 @@ class BacktestEngine:
 
     def _get_cache_path(self, run_id: str, date_str: str, prompt_hash: str) -> str:
         cache_dir = os.path.join(self.results_dir, run_id, "llm_cache")
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
         return os.path.join(cache_dir, f"{date_str}_{prompt_hash}.json")
 
     def committee_decide_allocation(
@@ -51,11 +147,11 @@ class BacktestEngine:
         run_id: str,
         as_of_date: datetime, 
         brief_text: str, 
-        current_allocation: Dict[str, float],
+        current_allocation: Optional[Dict[str, float]],
         vectorstore: Any,
         experts: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Call committee logic with caching."""
+        """Call committee logic with caching. current_allocation=None leaves it out of the prompt."""
         date_str = as_of_date.strftime("%Y-%m-%d")
         # Simplified hash of brief + date + current_alloc for cache key
         cache_key = f"{brief_text}_{date_str}_{json.dumps(current_allocation, sort_keys=True)}"
@@ -67,14 +163,17 @@ class BacktestEngine:
                 return json.load(f)
         
         # Format the brief as a query for the committee
-        query = f"Market situation as of {date_str}: {brief_text}. Current allocation: {current_allocation}. Please provide a biweekly allocation recommendation."
+        if current_allocation is None:
+            query = f"Market situation as of {date_str}: {brief_text}. Please provide a biweekly allocation recommendation."
+        else:
+            query = f"Market situation as of {date_str}: {brief_text}. Current allocation: {current_allocation}. Please provide a biweekly allocation recommendation."
         
         # Call the refactored run_ensemble_committee
         from tools.rag_core import run_ensemble_committee
         result = run_ensemble_committee(
             vectorstore=vectorstore,
             query=query,
-            bridge=self.bridge,
+            bridge=self.bridge or CachedLLMBridge(cache=self.llm_cache),
             top_k_experts=3
         )
         
@@ -152,16 +251,21 @@ class BacktestEngine:
         step_days: int = 10,
         initial_alloc: Dict[str, float] = None,
         ticker_map: Optional[Dict[str, str]] = None,
+        workers: int = 1,
+        include_current_allocation: bool = True,
     ) -> Tuple[pd.Series, pd.DataFrame]:
-        """Run Backtest Mode A: Committee driven."""
+        """
+        Run Backtest Mode A: Committee driven.
+
+        workers > 1 prefetches committee decisions on a bounded thread pool (see
+        _committee_decisions); include_current_allocation=False drops the allocation
+        from the prompt so every date is independent.
+        """
         if initial_alloc is None:
             initial_alloc = {"stocks": 60, "bonds": 20, "gold": 10, "cash": 10}
             
         calendar = self.build_rebalance_calendar(prices.index, step_days)
         current_alloc = initial_alloc
-        
-        equity = 1.0
-        equity_curve = pd.Series(index=prices.index, dtype=float)
         history = []
         
         ticker_map = ticker_map or self.default_ticker_map()
@@ -169,42 +273,126 @@ class BacktestEngine:
         # Fill missing values if any
         prices = prices.ffill()
         
-        for i, date in enumerate(prices.index):
-            if i > 0:
-                # Update equity based on daily returns
-                day_return = 0
-                for bucket, ticker in ticker_map.items():
-                    if ticker in prices.columns:
-                        ret = prices[ticker].iloc[i] / prices[ticker].iloc[i-1] - 1
-                        day_return += (current_alloc.get(bucket, 0) / 100.0) * ret
-                equity *= (1 + day_return)
+        # Decisions only depend on news + current allocation, so they are taken first
+        # (in date order) and the equity curve is computed in one vectorized pass.
+        schedule = [current_alloc]
+        rebalance_mask = np.zeros(len(prices.index), dtype=bool)
+        rebalance_idx = np.flatnonzero(prices.index.isin(calendar))
+        # Find the latest news brief available as of each rebalance date
+        news_pos = latest_row_positions(
+            news_data['as_of_date'], [prices.index[i].strftime("%Y-%m-%d") for i in rebalance_idx]
+        )
+        events = [
+            (i, prices.index[i], news_data.iloc[pos]['brief_text'])
+            for i, pos in zip(rebalance_idx, news_pos)
+            if pos >= 0
+        ]
+        
+        # LLM Committee Decisions
+        decisions = self._committee_decisions(
+            run_id,
+            [(date, brief) for _, date, brief in events],
+            current_alloc,
+            vectorstore,
+            workers=workers,
+            include_current_allocation=include_current_allocation,
+        )
+        for (i, date, brief), decision in zip(events, decisions):
+            target_alloc = self._target_allocation(decision, current_alloc)
             
-            equity_curve.iloc[i] = equity
+            # For simplicity in this backtest loop, we use instant execution or skip T0/T1 
+            # as we are in a daily loop. A more precise sim would handle T0/T1 transitions.
+            current_alloc = target_alloc
+            schedule.append(target_alloc)
+            rebalance_mask[i] = True
             
-            if date in calendar:
-                # Rebalance
-                # Find the latest news brief available as of this date
-                date_str = date.strftime("%Y-%m-%d")
-                available_news = news_data[news_data['as_of_date'] <= date_str]
-                if not available_news.empty:
-                    brief = available_news.iloc[-1]['brief_text']
-                    
-                    # LLM Committee Decision
-                    decision = self.committee_decide_allocation(run_id, date, brief, current_alloc, vectorstore)
-                    target_alloc = decision.get("primary", {}).get("target_allocation", current_alloc)
-                    
-                    # For simplicity in this backtest loop, we use instant execution or skip T0/T1 
-                    # as we are in a daily loop. A more precise sim would handle T0/T1 transitions.
-                    current_alloc = target_alloc
+            history.append({
+                "date": date,
+                "brief": brief,
+                "allocation": target_alloc,
+                "i": i,
+            })
                     
-                    history.append({
-                        "date": date,
-                        "brief": brief,
-                        "allocation": target_alloc,
-                        "equity": equity
-                    })
-                    
-        return equity_curve, pd.DataFrame(history)
+        equity_curve = self._equity_curve(prices, ticker_map, schedule, rebalance_mask)
+        return equity_curve, self._history_frame(history, equity_curve)
+
+    @staticmethod
+    def _target_allocation(decision: Dict[str, Any], current_alloc: Dict[str, float]) -> Dict[str, float]:
+        return decision.get("primary", {}).get("target_allocation", current_alloc)
+
+    def _committee_decisions(
+        self,
+        run_id: str,
+        events: List[Tuple[datetime, str]],
+        initial_alloc: Dict[str, float],
+        vectorstore: Any,
+        workers: int = 1,
+        include_current_allocation: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Committee decisions for [(date, brief), ...], returned in date order.
+
+        - workers <= 1: serial, each call sees the allocation produced by the previous one.
+        - include_current_allocation=False: dates are independent, all run on the pool.
+        - otherwise speculative prefetch: the next `workers` dates are queried with the last
+          confirmed allocation. When a decision changes the allocation, in-flight guesses are
+          dropped and re-queried with the new one, so results equal the serial run; wall
+          time scales with pool size whenever the committee holds its allocation.
+        """
+        def decide(event, alloc):
+            date, brief = event
+            return self.committee_decide_allocation(run_id, date, brief, alloc, vectorstore)
+
+        if workers <= 1:
+            decisions = []
+            current = initial_alloc
+            for event in events:
+                decision = decide(event, current if include_current_allocation else None)
+                decisions.append(decision)
+                current = self._target_allocation(decision, current)
+            return decisions
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            if not include_current_allocation:
+                futures = [pool.submit(decide, event, None) for event in events]
+                return [f.result() for f in futures]
+
+            decisions = []
+            confirmed = initial_alloc
+            pending: Dict[int, Future] = {}
+            for j in range(len(events)):
+                for t in range(j, min(j + workers, len(events))):
+                    if t not in pending:
+                        pending[t] = pool.submit(decide, events[t], confirmed)
+                decision = pending.pop(j).result()
+                decisions.append(decision)
+                target = self._target_allocation(decision, confirmed)
+                if _allocation_key(target) != _allocation_key(confirmed):
+                    # speculation miss: later guesses used a stale allocation
+                    for f in pending.values():
+                        f.cancel()
+                    pending.clear()
+                confirmed = target
+            return decisions
+
+    def _equity_curve(
+        self,
+        prices: pd.DataFrame,
+        ticker_map: Dict[str, str],
+        schedule: List[Dict[str, float]],
+        rebalance_mask: np.ndarray,
+    ) -> pd.Series:
+        buckets, R = bucket_returns(prices, ticker_map)
+        curve = equity_curve_kernel(R, allocation_rows(schedule, buckets), rebalance_mask)
+        return pd.Series(curve, index=prices.index, dtype=float)
+
+    @staticmethod
+    def _history_frame(history: List[Dict[str, Any]], equity_curve: pd.Series) -> pd.DataFrame:
+        # equity recorded at a rebalance = curve value on that day (after its return)
+        values = equity_curve.to_numpy()
+        for h in history:
+            h["equity"] = values[h.pop("i")]
+        return pd.DataFrame(history)
 
     def run_backtest_B(
         self,
@@ -221,73 +409,66 @@ class BacktestEngine:
             
         calendar = self.build_rebalance_calendar(prices.index, step_days)
         current_alloc = initial_alloc
-        
-        equity = 1.0
-        equity_curve = pd.Series(index=prices.index, dtype=float)
         history = []
         
         ticker_map = ticker_map or self.default_ticker_map()
         
         prices = prices.ffill()
         
-        for i, date in enumerate(prices.index):
-            if i > 0:
-                day_return = 0
-                for bucket, ticker in ticker_map.items():
-                    if ticker in prices.columns:
-                        ret = prices[ticker].iloc[i] / prices[ticker].iloc[i-1] - 1
-                        day_return += (current_alloc.get(bucket, 0) / 100.0) * ret
-                equity *= (1 + day_return)
-            
-            equity_curve.iloc[i] = equity
-            
-            if date in calendar:
-                date_str = date.strftime("%Y-%m-%d")
-                available_signals = signals_data[signals_data['as_of_date'] <= date_str]
-                if not available_signals.empty:
-                    signal = available_signals.iloc[-1]
-                    risk_bias = float(signal.get('risk_bias', 0))
-                    
-                    # Simple mapping logic: 
-                    # risk_bias=1.0 -> stocks=80, bonds=10, gold=5, cash=5
-                    # risk_bias=-1.0 -> stocks=20, bonds=30, gold=15, cash=35
-                    # Mid point (0.0): 50/20/10/20
-                    
-                    if risk_bias >= 0:
-                        # scale from 0..1 to 50..80
-                        stocks = 50 + 30 * risk_bias
-                        bonds = 20 - 10 * risk_bias
-                        gold = 10 - 5 * risk_bias
-                        cash = 20 - 15 * risk_bias
-                    else:
-                        # scale from 0..-1 to 50..20
-                        rb = abs(risk_bias)
-                        stocks = 50 - 30 * rb
-                        bonds = 20 + 10 * rb
-                        gold = 10 + 5 * rb
-                        cash = 20 + 15 * rb
-                        
-                    target_alloc = {
-                        "stocks": round(stocks),
-                        "bonds": round(bonds),
-                        "gold": round(gold),
-                        "cash": round(cash)
-                    }
-                    
-                    # Normalize sum to 100
-                    s = sum(target_alloc.values())
-                    if s != 100:
-                        diff = 100 - s
-                        target_alloc["cash"] += diff
-                        
-                    current_alloc = target_alloc
+        schedule = [current_alloc]
+        rebalance_mask = np.zeros(len(prices.index), dtype=bool)
+        rebalance_idx = np.flatnonzero(prices.index.isin(calendar))
+        signal_pos = latest_row_positions(
+            signals_data['as_of_date'], [prices.index[i].strftime("%Y-%m-%d") for i in rebalance_idx]
+        )
+        for i, pos in zip(rebalance_idx, signal_pos):
+            date = prices.index[i]
+            if pos >= 0:
+                signal = signals_data.iloc[pos]
+                risk_bias = float(signal.get('risk_bias', 0))
+                
+                # Simple mapping logic: 
+                # risk_bias=1.0 -> stocks=80, bonds=10, gold=5, cash=5
+                # risk_bias=-1.0 -> stocks=20, bonds=30, gold=15, cash=35
+                # Mid point (0.0): 50/20/10/20
+                
+                if risk_bias >= 0:
+                    # scale from 0..1 to 50..80
+                    stocks = 50 + 30 * risk_bias
+                    bonds = 20 - 10 * risk_bias
+                    gold = 10 - 5 * risk_bias
+                    cash = 20 - 15 * risk_bias
+                else:
+                    # scale from 0..-1 to 50..20
+                    rb = abs(risk_bias)
+                    stocks = 50 - 30 * rb
+                    bonds = 20 + 10 * rb
+                    gold = 10 + 5 * rb
+                    cash = 20 + 15 * rb
                     
-                    history.append({
-                        "date": date,
-                        "risk_bias": risk_bias,
-                        "allocation": target_alloc,
-                        "equity": equity
-                    })
+                target_alloc = {
+                    "stocks": round(stocks),
+                    "bonds": round(bonds),
+                    "gold": round(gold),
+                    "cash": round(cash)
+                }
+                
+                # Normalize sum to 100
+                s = sum(target_alloc.values())
+                if s != 100:
+                    diff = 100 - s
+                    target_alloc["cash"] += diff
                     
-        return equity_curve, pd.DataFrame(history)
-
+                current_alloc = target_alloc
+                schedule.append(target_alloc)
+                rebalance_mask[i] = True
+                
+                history.append({
+                    "date": date,
+                    "risk_bias": risk_bias,
+                    "allocation": target_alloc,
+                    "i": i,
+                })
+                
+        equity_curve = self._equity_curve(prices, ticker_map, schedule, rebalance_mask)
+        return equity_curve, self._history_frame(history, equity_curve)
@@ -0,0 +1,173 @@
+"""
+Hot-reloading config registry (policy / investor index / scenarios / reasoning / router).
+
+Each registered file keeps its parsed YAML and an optional compiled form in memory
+(e.g. investor_index.yaml -> RouterIndex). Freshness is checked with a single os.stat
+(inode, mtime_ns, size) at most once per `check_interval_s`, so steady-state reads do no
+file I/O at all and edits are still picked up within a second. Content is sha256-hashed
+only when it is actually re-read; `version()` / `version_hash()` expose those hashes for
+audit records.
+
+A reload that fails to parse keeps the last good version (and records the error). A
+first load that fails is remembered per file signature too: until the file changes, the
+cached error is re-raised without re-reading or re-parsing it.
+"""
+
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import yaml
+
+DEFAULT_CHECK_INTERVAL_S = 0.5
+
+
+def _parse_yaml(raw: bytes) -> Any:
+    data = yaml.safe_load(raw.decode("utf-8")) or {}
+    return data if isinstance(data, dict) else {}
+
+
+class _Entry:
+    def __init__(self, path: Path, parse: Callable[[bytes], Any], compile: Optional[Callable[[Any], Any]]):
+        self.path = path
+        self.parse = parse
+        self.compile = compile
+        self.sig: Optional[Tuple[int, int, int]] = None
+        self.data: Any = None
+        self.compiled: Any = None
+        self.sha256: Optional[str] = None
+        self.loaded = False
+        self.checked_at = float("-inf")
+        self.loaded_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.failure: Optional[Exception] = None  # first load failed for `sig`
+
+
+class ConfigRegistry:
+    def __init__(self, check_interval_s: float = DEFAULT_CHECK_INTERVAL_S):
+        self.check_interval_s = float(check_interval_s)
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        name: str,
+        path: Union[str, Path],
+        compile: Optional[Callable[[Any], Any]] = None,
+        parse: Callable[[bytes], Any] = _parse_yaml,
+    ) -> None:
+        """Idempotent; re-registering with a different path swaps the file (and reloads)."""
+        path = Path(path)
+        entry = self._entries.get(name)
+        if entry is not None and entry.path == path:
+            return
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.path != path:
+                self._entries[name] = _Entry(path, parse, compile)
+
+    def _stat_sig(self, path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh(self, name: str, force: bool = False) -> _Entry:
+        entry = self._entries[name]
+        now = time.monotonic()
+        if not force and now - entry.checked_at < self.check_interval_s:
+            if entry.loaded:
+                return entry
+            if entry.failure is not None:
+                raise entry.failure
+        with self._lock:
+            entry = self._entries[name]
+            sig = self._stat_sig(entry.path)
+            if not force and sig == entry.sig:
+                if entry.loaded:
+                    entry.checked_at = now
+                    return entry
+                if entry.failure is not None:
+                    entry.checked_at = now
+                    raise entry.failure
+            try:
+                if sig is None:
+                    raw, data, sha = b"", {}, None
+                else:
+                    raw = entry.path.read_bytes()
+                    data = entry.parse(raw)
+                    sha = hashlib.sha256(raw).hexdigest()
+                compiled = entry.compile(data) if entry.compile else data
+            except Exception as e:
+                entry.error = f"{type(e).__name__}: {e}"
+                entry.sig = sig
+                entry.checked_at = now
+                if not entry.loaded:
+                    entry.failure = e.with_traceback(None)
+                    raise
+                print(f"[config] reload of {entry.path} failed, keeping previous version: {entry.error}")
+                return entry
+            entry.data, entry.compiled, entry.sha256 = data, compiled, sha
+            entry.sig = sig
+            entry.loaded = True
+            entry.loaded_at = time.time()
+            entry.checked_at = now
+            entry.error = None
+            entry.failure = None
+            return entry
+
+    def get(self, name: str) -> Any:
+        """Parsed config (dict)."""
+        return self._refresh(name).data
+
+    def compiled(self, name: str) -> Any:
+        """Compiled form (compile(parsed)), or the parsed dict if no compiler was registered."""
+        return self._refresh(name).compiled
+
+    def version(self, name: str) -> Optional[str]:
+        """sha256 of the file content currently in memory (None if the file is missing)."""
+        return self._refresh(name).sha256
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Force a stat + reload check on next access (e.g. right after writing the file)."""
+        for n in ([name] if name else list(self._entries)):
+            if n in self._entries:
+                self._entries[n].checked_at = float("-inf")
+                self._entries[n].sig = None
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        return {name: self.version(name) for name in sorted(self._entries)}
+
+    def version_hash(self) -> str:
+        """One hash over all registered configs (for audit records)."""
+        joined = "\n".join(f"{k}:{v or '-'}" for k, v in self.versions().items())
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+    def status(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name in sorted(self._entries):
+            e = self._entries[name]
+            out[name] = {
+                "path": str(e.path),
+                "sha256": e.sha256,
+                "loaded_at": e.loaded_at,
+                "error": e.error,
+            }
+        return out
+
+
+_registry: Optional[ConfigRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_config_registry() -> ConfigRegistry:
+    """Process-wide registry (services + tools register their files on import)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ConfigRegistry()
+    return _registry
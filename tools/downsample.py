@@ -0,0 +1,104 @@
+"""
+Shape-preserving downsampling for equity curves (NumPy).
+
+A fixed stride (`pts[::step]`) silently drops peaks and drawdown troughs. Both methods here
+return sorted indices into the input and always keep:
+- the first and last point
+- the global max / min
+- the peak and trough of the maximum drawdown
+so the chart's extremes and its max-drawdown read the same as the full series.
+
+Methods:
+- "lttb":   Largest-Triangle-Three-Buckets (visually faithful; one vectorized step per bucket)
+- "minmax": min + max of each bucket (fully vectorized, fastest)
+- "stride": the old every-k-th point (+ the kept extremes), for comparison
+"""
+
+from typing import List
+
+import numpy as np
+
+METHODS = ("lttb", "minmax", "stride")
+
+
+def extreme_indices(y: np.ndarray) -> List[int]:
+    """First, last, argmax, argmin and the max-drawdown peak / trough of y."""
+    n = len(y)
+    if n == 0:
+        return []
+    peak_vals = np.maximum.accumulate(y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak_vals > 0, 1.0 - y / peak_vals, 0.0)
+    trough = int(np.argmax(dd))
+    peak = int(np.argmax(y[: trough + 1])) if trough > 0 else 0
+    return sorted({0, n - 1, int(np.argmax(y)), int(np.argmin(y)), peak, trough})
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    # interior points 1..n-2 split into `buckets` contiguous, non-empty ranges
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n) if n_out >= n else np.array(sorted({0, n - 1}), dtype=np.int64)
+    edges = _bucket_edges(n, n_out - 2)
+    # mean of each bucket (and of the last point) via cumulative sums
+    cx, cy = np.concatenate([[0.0], np.cumsum(x)]), np.concatenate([[0.0], np.cumsum(y)])
+    lo, hi = edges[:-1], edges[1:]
+    mean_x = np.append((cx[hi] - cx[lo]) / (hi - lo), x[-1])
+    mean_y = np.append((cy[hi] - cy[lo]) / (hi - lo), y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        bx, by = x[lo[i]:hi[i]], y[lo[i]:hi[i]]
+        area = np.abs((x[a] - mean_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (mean_y[i + 1] - y[a]))
+        a = int(lo[i] + np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    n = len(y)
+    buckets = (n_out - 2) // 2
+    if n_out >= n or buckets < 1:
+        return np.arange(n) if n_out >= n else np.array(sorted({0, n - 1}), dtype=np.int64)
+    edges = _bucket_edges(n, buckets)
+    size = int(np.max(np.diff(edges)))
+    # pad every bucket to the same width, then argmin/argmax along rows
+    pos = edges[:-1, None] + np.arange(size)[None, :]
+    valid = pos < edges[1:, None]
+    pos = np.where(valid, pos, edges[1:, None] - 1)
+    vals = y[pos]
+    lo_i = pos[np.arange(buckets), np.argmin(np.where(valid, vals, np.inf), axis=1)]
+    hi_i = pos[np.arange(buckets), np.argmax(np.where(valid, vals, -np.inf), axis=1)]
+    return np.unique(np.concatenate([[0, n - 1], lo_i, hi_i]))
+
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, max_points: int, method: str = "lttb") -> np.ndarray:
+    """Sorted indices (at most max_points, or all if max_points <= 0) of the points to keep."""
+    if method not in METHODS:
+        raise ValueError(f"unknown downsample method: {method} (expected one of {', '.join(METHODS)})")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if max_points <= 0 or n <= max_points:
+        return np.arange(n)
+    extremes = np.asarray(extreme_indices(y), dtype=np.int64)
+    budget = max(max_points - len(extremes), 2)
+    if method == "lttb":
+        picked = lttb_indices(x, y, budget)
+    elif method == "minmax":
+        picked = minmax_indices(y, budget)
+    else:
+        picked = np.arange(0, n, -(-n // budget))
+    idx = np.union1d(picked, extremes)
+    if len(idx) > max_points:
+        # drop non-extreme points evenly to stay within the budget
+        rest = np.setdiff1d(idx, extremes)
+        keep = rest[np.linspace(0, len(rest) - 1, max(max_points - len(extremes), 0)).astype(np.int64)] if len(rest) else rest
+        idx = np.union1d(keep, extremes)
+    return idx
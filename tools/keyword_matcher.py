@@ -0,0 +1,207 @@
+"""
+Aho–Corasick multi-pattern keyword matching (no deps).
+
+Scenario / intent / rule-query matching used to loop `k.lower() in t_low` over every
+keyword, i.e. O(keywords × text) per request. Here each keyword table is compiled once
+into an automaton and a text is scanned in a single linear pass, reporting every
+keyword occurrence (overlaps included). Matching is per character, so mixed CJK/Latin
+input needs no tokenization.
+
+Call sites:
+- services/rag_service._match_scenarios + _route_investors (SCENARIO_KEYWORDS / INTENT_KEYWORDS)
+- tools/rag_core.run_ensemble_committee (regime inference scenarios)
+- tools/rule_query.filter_by_scenario
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Scenario keyword heuristics (Chinese + English-ish)
+SCENARIO_KEYWORDS: Dict[str, List[str]] = {
+    "市场恐慌": ["恐慌", "暴跌", "崩盘", "踩踏", "流动性危机", "挤兑", "panic", "crash", "selloff", "limit down", "跌停"],
+    "市场狂热": ["狂热", "fomo", "all in", "追高", "过热", "疯涨", "逼空", "挤空", "meme", "热钱"],
+    "经济衰退": ["衰退", "萧条", "失业", "经济下行", "recession", "hard landing", "soft landing"],
+    "利率转向": ["降息", "加息", "利率", "yield", "rates", "转向", "拐点", "会议纪要", "点阵图"],
+    "流动性收紧": ["缩表", "收紧", "紧缩", "流动性", "tga", "rrp", "qt", "qe", "融资", "保证金"],
+    "估值泡沫": ["估值", "泡沫", "过高", "市盈率", "pe", "ps", "pb", "ev/ebitda", "估值扩张"],
+    "创业与产品化": ["创业", "合伙人", "产品化", "股权", "特定知识", "不可替代", "MVP", "startup"],
+    "杠杆与财富": ["杠杆", "代码", "媒体", "劳动力", "财富积累", "所有权", "leverage", "equity"],
+    "幸福哲学": ["幸福", "宁静", "欲望", "习惯", "冥想", "身心系统", "happiness"],
+    "政策与法案": ["政策", "法案", "立法", "补贴", "加税", "披露", "对冲", "policy", "bill", "legislation", "disclosure"],
+    "地产与交易": ["地产", "谈判", "筹码艺术", "地段", "再融资", "地标", "real estate", "negotiation", "deal"],
+    "财商与现金流": ["财商", "现金流", "资产负债", "被动收入", "老鼠赛跑", "esbi", "cash flow", "rich dad"],
+    "叙事与风投": ["叙事", "趋势", "科技风口", "反身性", "非对称", "舆论杠杆", "vc", "narrative", "chamath"],
+    "硬资产": ["黄金", "白银", "比特币", "抗通胀", "印钞", "gold", "silver", "bitcoin", "btc", "inflation"],
+}
+
+# Decision intent keywords -> investor boosts (very novice-friendly)
+INTENT_KEYWORDS: Dict[str, Tuple[List[str], List[str]]] = {
+    "买入/追高": (["买", "买入", "开仓", "追", "追吗", "chase", "enter"], ["warren_buffett", "peter_lynch", "charlie_munger"]),
+    "卖出/止盈": (["卖", "卖出", "止盈", "take profit", "exit"], ["howard_marks", "stanley_druckenmiller", "george_soros"]),
+    "止损/风控": (["止损", "风控", "回撤", "仓位", "max drawdown", "risk", "position sizing"], ["george_soros", "stanley_druckenmiller", "seth_klarman", "naval_ravikant"]),
+    "宏观/政策": (["宏观", "利率", "通胀", "就业", "美元", "政策", "fed", "cpi", "ppi", "法案", "立法", "国会"], ["ray_dalio", "stanley_druckenmiller", "george_soros", "nancy_pelosi"]),
+    "周期/情绪": (["周期", "情绪", "极端", "恐慌", "狂热", "sentiment", "cycle"], ["howard_marks", "ray_dalio", "charlie_munger", "donald_trump"]),
+    # Valuation (novice-friendly)
+    "估值/安全边际": (
+        [
+            "估值",
+            "高估",
+            "低估",
+            "贵不贵",
+            "便不便宜",
+            "值不值",
+            "合理吗",
+            "溢价",
+            "折价",
+            "安全边际",
+            "内在价值",
+            "价值陷阱",
+            "pe",
+            "pb",
+            "ps",
+            "ev/ebitda",
+            "intrinsic value",
+            "undervalued",
+            "overvalued",
+            "cheap",
+            "expensive",
+        ],
+        ["warren_buffett", "seth_klarman", "howard_marks", "charlie_munger"],
+    ),
+    "成长/PEG": (["成长", "peg", "营收增长", "增速", "tenbagger"], ["peter_lynch", "warren_buffett"]),
+    "量化/因子": (["量化", "因子", "模型", "回测", "因子投资", "factor"], ["james_simons", "ed_thorp", "cliff_asness"]),
+    "事件/激进": (["并购", "分拆", "回购", "重组", "股东行动", "proxy fight", "activist"], ["carl_icahn", "seth_klarman"]),
+    "创业/杠杆": (["创业", "产品化", "杠杆", "特定知识", "股权", "所有权", "天使投资", "自由", "wealth"], ["naval_ravikant", "charlie_munger"]),
+    "地产/谈判": (["地产", "房子", "写字楼", "谈判", "筹码", "品牌溢价", "再融资", "杠杆经营", "real estate"], ["donald_trump"]),
+    "期权/披露": (["期权", "看涨", "看跌", "披露", "国会交易", "内幕", "跟单", "options", "leaps"], ["nancy_pelosi", "ed_thorp"]),
+    "财商/通胀": (["财商", "现金流", "硬资产", "通胀", "黄金", "比特币", "资产负债", "被动收入"], ["robert_kiyosaki", "ray_dalio"]),
+    "叙事/科技": (["叙事", "风口", "科技趋势", "反身性", "非对称", "跨周期"], ["chamath_palihapitiya", "naval_ravikant"]),
+}
+
+
+class AhoCorasick:
+    """
+    Minimal Aho–Corasick automaton over characters.
+
+    Patterns map to integer values; `find(text)` returns the set of values whose
+    pattern occurs anywhere in text. Empty patterns always match (same as `"" in s`).
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._always: Set[int] = set()
+        self._built = False
+
+    def add(self, pattern: str, value: int):
+        if self._built:
+            raise RuntimeError("AhoCorasick: cannot add patterns after build()")
+        if not pattern:
+            self._always.add(value)
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(value)
+
+    def build(self) -> "AhoCorasick":
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                # Merge suffix outputs so a scan never has to walk fail links to report.
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    @property
+    def state_count(self) -> int:
+        return len(self._goto)
+
+    def find(self, text: str) -> Set[int]:
+        if not self._built:
+            self.build()
+        found: Set[int] = set(self._always)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text or "":
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class KeywordMatcher:
+    """
+    Compiled keyword tables: {group: {label: [keywords]}} -> one automaton.
+
+    `match(text)` returns {group: [labels]} with labels in table order, where a label
+    matches if any of its keywords occurs in the text (case-insensitive by default).
+    """
+
+    def __init__(self, groups: Mapping[str, Mapping[str, Iterable[str]]], lowercase: bool = True):
+        self.lowercase = lowercase
+        self._groups: List[str] = list(groups.keys())
+        # label id -> (group, label); label ids follow table order
+        self._labels: List[Tuple[str, str]] = []
+        self._ac = AhoCorasick()
+        for group, table in groups.items():
+            for label, keywords in table.items():
+                lid = len(self._labels)
+                self._labels.append((group, label))
+                for k in keywords:
+                    self._ac.add(str(k).lower() if lowercase else str(k), lid)
+        self._ac.build()
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        t = (text or "").lower() if self.lowercase else (text or "")
+        out: Dict[str, List[str]] = {g: [] for g in self._groups}
+        for lid in sorted(self._ac.find(t)):
+            group, label = self._labels[lid]
+            out[group].append(label)
+        return out
+
+    def labels(self, text: str, group: Optional[str] = None) -> List[str]:
+        """Matched labels of one group (default: the first/only group)."""
+        return self.match(text)[group or self._groups[0]]
+
+
+_scenario_intent_matcher: Optional[KeywordMatcher] = None
+
+
+def get_scenario_intent_matcher() -> KeywordMatcher:
+    """Shared automaton over SCENARIO_KEYWORDS + INTENT_KEYWORDS (built on first use)."""
+    global _scenario_intent_matcher
+    if _scenario_intent_matcher is None:
+        _scenario_intent_matcher = KeywordMatcher(
+            {
+                "scenario": SCENARIO_KEYWORDS,
+                "intent": {intent: keys for intent, (keys, _ids) in INTENT_KEYWORDS.items()},
+            }
+        )
+    return _scenario_intent_matcher
+
+
+def match_scenarios_and_intents(text: str) -> Tuple[List[str], List[str]]:
+    """One pass over text -> (matched scenarios, matched intents), both in table order."""
+    m = get_scenario_intent_matcher().match(text)
+    return m["scenario"], m["intent"]
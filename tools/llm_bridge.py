@@ -1,10 +1,13 @@
+import asyncio
 import json
 import os
+import random
 import time
 import urllib.error
 import urllib.request
+import weakref
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 
 class LLMBridgeError(RuntimeError):
@@ -24,6 +27,7 @@ class LLMConfig:
     max_tokens: int = 900
     use_full_url: bool = False  # if true, base_url is full endpoint URL
     anthropic_version: str = "2023-06-01"
+    max_concurrency: int = 16  # acall_chat: in-flight requests per event loop (and pool size)
 
     # nofx-style retryable errors (string match, network-ish)
     retryable_errors: Tuple[str, ...] = (
@@ -93,9 +97,42 @@ class LLMConfig:
             temperature=_f("LLM_TEMPERATURE", 0.2),
             max_tokens=_i("LLM_MAX_TOKENS", 900),
             use_full_url=use_full_url,
+            max_concurrency=_i("LLM_MAX_CONCURRENCY", 16),
         )
 
 
+class _AsyncPool:
+    """Keep-alive aiohttp session + concurrency semaphore, one per event loop."""
+
+    def __init__(self, max_concurrency: int):
+        import aiohttp  # optional dependency (only needed for acall_chat)
+
+        limit = max(1, int(max_concurrency))
+        self.semaphore = asyncio.Semaphore(limit)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=limit, keepalive_timeout=60),
+        )
+
+
+_ASYNC_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncPool]" = weakref.WeakKeyDictionary()
+
+
+def _get_async_pool(cfg: LLMConfig) -> _AsyncPool:
+    loop = asyncio.get_running_loop()
+    pool = _ASYNC_POOLS.get(loop)
+    if pool is None or pool.session.closed:
+        pool = _AsyncPool(cfg.max_concurrency)
+        _ASYNC_POOLS[loop] = pool
+    return pool
+
+
+async def aclose_async_pool():
+    """Close the current loop's pooled session (call on app shutdown)."""
+    pool = _ASYNC_POOLS.pop(asyncio.get_running_loop(), None)
+    if pool is not None and not pool.session.closed:
+        await pool.session.close()
+
+
 class LLMBridge:
     """
     Minimal, dependency-free AI client.
@@ -253,6 +290,140 @@ class LLMBridge:
 
         raise LLMBridgeError(f"LLM call failed after retries: {last_err}")
 
+    def _backoff_s(self, attempt: int) -> float:
+        # linear backoff (same base as call_chat) with +/-50% jitter to avoid retry stampedes
+        return self.cfg.retry_wait_base_s * attempt * random.uniform(0.5, 1.5)
+
+    async def acall_chat(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Async call_chat: pooled keep-alive connections, at most cfg.max_concurrency
+        requests in flight per event loop, async backoff with jitter between retries.
+        """
+        if not self.is_configured():
+            raise LLMBridgeError("LLM not configured: missing LLM_API_KEY/LLM_BASE_URL/LLM_MODEL")
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise LLMBridgeError("acall_chat requires aiohttp (pip install aiohttp)") from e
+
+        url = self._build_url()
+        data = json.dumps(self._build_body(messages)).encode("utf-8")
+        headers = self._build_headers()
+        pool = _get_async_pool(self.cfg)
+        timeout = aiohttp.ClientTimeout(total=self.cfg.timeout_s)
+
+        last_err: Optional[Exception] = None
+        retries = max(1, self.cfg.max_retries)
+        for attempt in range(1, retries + 1):
+            try:
+                async with pool.semaphore:
+                    async with pool.session.post(url, data=data, headers=headers, timeout=timeout) as resp:
+                        status = resp.status
+                        raw = await resp.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_err = e
+                if attempt < retries:
+                    await asyncio.sleep(self._backoff_s(attempt))
+                    continue
+                raise LLMBridgeError(f"LLM network error after retries: {e!r}") from e
+
+            if status >= 400:
+                last_err = LLMBridgeError(f"LLM HTTPError {status}: {raw.decode('utf-8', errors='ignore')}")
+                # retry on 429/5xx
+                if status in (429, 500, 502, 503, 504) and attempt < retries:
+                    await asyncio.sleep(self._backoff_s(attempt))
+                    continue
+                raise last_err
+
+            try:
+                return self._parse_response(raw)
+            except Exception as e:
+                last_err = e
+                if attempt < retries and self._is_retryable_error(e):
+                    await asyncio.sleep(self._backoff_s(attempt))
+                    continue
+                raise
+
+        raise LLMBridgeError(f"LLM call failed after retries: {last_err}")
+
+    def _parse_stream_event(self, payload: str) -> Optional[str]:
+        """One SSE `data:` payload -> text delta (None for non-text events)."""
+        try:
+            evt = json.loads(payload)
+        except Exception as e:
+            raise LLMBridgeError(f"Failed to parse LLM stream event: {e}") from e
+        if not isinstance(evt, dict):
+            return None
+        if self.cfg.provider == "claude":
+            # Anthropic Messages streaming: content_block_delta / text_delta
+            if evt.get("type") == "error":
+                raise LLMBridgeError(f"Claude stream error: {evt.get('error')}")
+            delta = evt.get("delta") or {}
+            if evt.get("type") == "content_block_delta" and isinstance(delta.get("text"), str):
+                return delta["text"]
+            return None
+        choices = evt.get("choices") or []
+        if not choices:
+            return None
+        text = (choices[0].get("delta") or {}).get("content")
+        return text if isinstance(text, str) else None
+
+    async def astream_chat(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Streaming acall_chat: yields assistant text deltas as they arrive
+        (OpenAI-compatible `stream: true` chunks, or Claude content_block_delta events).
+
+        Retries (429/5xx/network) only happen before the first delta is yielded.
+        """
+        if not self.is_configured():
+            raise LLMBridgeError("LLM not configured: missing LLM_API_KEY/LLM_BASE_URL/LLM_MODEL")
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise LLMBridgeError("astream_chat requires aiohttp (pip install aiohttp)") from e
+
+        url = self._build_url()
+        body = self._build_body(messages)
+        body["stream"] = True
+        data = json.dumps(body).encode("utf-8")
+        headers = dict(self._build_headers(), Accept="text/event-stream")
+        pool = _get_async_pool(self.cfg)
+        # no total deadline for a stream; bound connect + gaps between chunks instead
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.cfg.timeout_s, sock_read=self.cfg.timeout_s)
+
+        retries = max(1, self.cfg.max_retries)
+        for attempt in range(1, retries + 1):
+            started = False
+            throttled = False
+            try:
+                async with pool.semaphore:
+                    async with pool.session.post(url, data=data, headers=headers, timeout=timeout) as resp:
+                        if resp.status >= 400:
+                            detail = (await resp.read()).decode("utf-8", errors="ignore")
+                            err = LLMBridgeError(f"LLM HTTPError {resp.status}: {detail}")
+                            if resp.status not in (429, 500, 502, 503, 504) or attempt >= retries:
+                                raise err
+                            throttled = True
+                        else:
+                            async for line in resp.content:
+                                line = line.decode("utf-8", errors="ignore").strip()
+                                if not line.startswith("data:"):
+                                    continue
+                                payload = line[5:].strip()
+                                if payload == "[DONE]":
+                                    break
+                                text = self._parse_stream_event(payload)
+                                if text:
+                                    started = True
+                                    yield text
+                if not throttled:
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if started or attempt >= retries:
+                    raise LLMBridgeError(f"LLM stream error: {e!r}") from e
+            # back off only after the concurrency slot and the pooled connection are released
+            await asyncio.sleep(self._backoff_s(attempt))
+
 
 def extract_json_block(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
     """
@@ -0,0 +1,345 @@
+"""
+Content-addressed LLM response cache (shared across backtest runs).
+
+Key = sha256 over the canonical request: provider, model, temperature, max_tokens and the
+full rendered messages. Any run that sends the same prompt with the same settings reuses
+the stored answer, regardless of run_id.
+
+Layout (root_dir):
+  index.json              compact LRU snapshot: [[key, size_bytes, last_used], ...] oldest first
+  index.log               append-only changes since the snapshot:
+                          ["+", key, size, ts] put / ["t", key, ts] hit / ["-", key] evict
+  objects/<k[:2]>/<k>.json {"key", "provider", "model", "response", "created_at"}
+
+- lookups go through the in-memory index (no per-file stat); the index is an accelerator,
+  not the source of truth: an object missing from it is adopted on miss, an entry whose
+  file is gone is dropped on read; objects/ is only scanned when the index itself is lost
+  or unreadable, or on repair()
+- put() and hits append one line to index.log (O_APPEND, so several processes can share
+  the cache without overwriting each other); the snapshot is rewritten only when the log outgrows
+  it (amortised O(1) per put) or on flush()
+- object writes and snapshot writes are atomic (tmp file + os.replace)
+- size cap: max_entries / max_bytes, least recently used entries are evicted
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.llm_bridge import LLMBridge, LLMConfig
+
+INDEX_VERSION = 1
+
+
+def llm_cache_key(cfg: LLMConfig, messages: List[Dict[str, str]]) -> str:
+    payload = {
+        "provider": cfg.provider,
+        "model": cfg.model,
+        "temperature": cfg.temperature,
+        "max_tokens": cfg.max_tokens,
+        "messages": messages,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: str, data: bytes):
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class LLMResponseCache:
+    # rewrite index.json once index.log is larger than this and than the snapshot itself
+    COMPACT_MIN_BYTES = 256 * 1024
+
+    def __init__(self, root_dir: str, max_entries: int = 20000, max_bytes: int = 512 * 1024 * 1024):
+        self.root_dir = root_dir
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self._lock = threading.Lock()
+        # key -> (size_bytes, last_used); order = LRU -> MRU
+        self._index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._snapshot_bytes = 0
+        self._load_index()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root_dir, "index.json")
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.root_dir, "index.log")
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.root_dir, "objects", key[:2], f"{key}.json")
+
+    def _load_index(self):
+        rows: Dict[str, Tuple[int, float]] = {}
+        snapshot_ok = False
+        try:
+            with open(self.index_path, "rb") as f:
+                raw = f.read()
+            data = json.loads(raw)
+            self._snapshot_bytes = len(raw)
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get("version") == INDEX_VERSION:
+            snapshot_ok = True
+            for row in data.get("entries") or []:
+                try:
+                    rows[str(row[0])] = (int(row[1]), float(row[2]))
+                except Exception:
+                    continue
+        ops = self._read_log()
+        self._replay(rows, ops or [])
+        for key, (size, ts) in sorted(rows.items(), key=lambda kv: kv[1][1]):
+            self._index[key] = (size, ts)
+            self._total_bytes += size
+
+        # index.json + index.log are trusted as is (no per-object stat); stale entries are
+        # dropped on read failure and unindexed objects adopted on miss. Only a lost or
+        # unreadable index (objects/ without index, corrupt snapshot) triggers a full scan.
+        if not snapshot_ok and (os.path.exists(self.index_path) or ops is None):
+            self._repair()
+
+    @staticmethod
+    def _replay(rows: Dict[str, Tuple[int, float]], ops: List[list]):
+        for op in ops:
+            if op[0] == "+":
+                rows[op[1]] = (op[2], op[3])
+            elif op[0] == "t":
+                if op[1] in rows:
+                    rows[op[1]] = (rows[op[1]][0], op[2])
+            else:
+                rows.pop(op[1], None)
+
+    def repair(self) -> Dict[str, int]:
+        """Reconcile the index with objects/ (adopt unindexed files, drop entries without a file)."""
+        with self._lock:
+            return self._repair()
+
+    def _repair(self) -> Dict[str, int]:
+        on_disk = self._scan_objects()
+        dropped = [k for k in self._index if k not in on_disk]
+        for key in dropped:
+            self._forget(key)
+        adopted = [k for k in on_disk if k not in self._index]
+        for key in adopted:
+            size, mtime = on_disk[key]
+            self._index[key] = (size, mtime)
+            self._total_bytes += size
+        if adopted:
+            self._index = OrderedDict(sorted(self._index.items(), key=lambda kv: kv[1][1]))
+        if adopted or dropped or os.path.exists(self.index_path):
+            self._compact()
+        return {"adopted": len(adopted), "dropped": len(dropped)}
+
+    def _scan_objects(self) -> Dict[str, Tuple[int, float]]:
+        out: Dict[str, Tuple[int, float]] = {}
+        try:
+            shards = list(os.scandir(os.path.join(self.root_dir, "objects")))
+        except OSError:
+            return out
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            try:
+                entries = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for e in entries:
+                if e.name.startswith(".tmp-") or not e.name.endswith(".json"):
+                    continue
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                out[e.name[:-5]] = (st.st_size, st.st_mtime)
+        return out
+
+    def _read_log(self) -> Optional[List[list]]:
+        """Parsed index.log ops, or None when there is no log."""
+        ops: List[list] = []
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+        for line in lines:
+            try:
+                op = json.loads(line)
+                if op[0] == "+":
+                    ops.append(["+", str(op[1]), int(op[2]), float(op[3])])
+                elif op[0] == "t":
+                    ops.append(["t", str(op[1]), float(op[2])])
+                elif op[0] == "-":
+                    ops.append(["-", str(op[1])])
+            except Exception:
+                continue  # torn last line of a crashed writer
+        return ops
+
+    def _append_log(self, ops: List[list]):
+        if not ops:
+            return
+        data = "".join(json.dumps(op, separators=(",", ":")) + "\n" for op in ops).encode("utf-8")
+        os.makedirs(self.root_dir, exist_ok=True)
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, data)  # one write per batch: lines from concurrent writers never interleave
+            log_bytes = os.fstat(fd).st_size  # shared by all writers, not just our own appends
+        finally:
+            os.close(fd)
+        # the snapshot is rewritten after at least as many bytes were appended: amortised O(1)
+        if log_bytes > max(self.COMPACT_MIN_BYTES, self._snapshot_bytes):
+            self._compact()
+
+    def _compact(self):
+        # fold changes other writers appended since our load into memory first, so the
+        # snapshot does not drop them; the object file decides when both sides disagree
+        for op in self._read_log() or []:
+            key = op[1]
+            if op[0] == "+" and key not in self._index and os.path.exists(self._object_path(key)):
+                self._index[key] = (op[2], op[3])
+                self._total_bytes += op[2]
+            elif op[0] == "t" and key in self._index and op[2] > self._index[key][1]:
+                self._index[key] = (self._index[key][0], op[2])
+            elif op[0] == "-" and key in self._index and not os.path.exists(self._object_path(key)):
+                self._forget(key)
+        self._index = OrderedDict(sorted(self._index.items(), key=lambda kv: kv[1][1]))
+        entries = [[k, size, round(ts, 3)] for k, (size, ts) in self._index.items()]
+        data = json.dumps({"version": INDEX_VERSION, "entries": entries}, separators=(",", ":")).encode("utf-8")
+        _atomic_write(self.index_path, data)
+        self._snapshot_bytes = len(data)
+        # lines appended between the read above and this truncate are lost from the index
+        # only: a lost "+" object is adopted on its next miss, a lost "-" entry is dropped
+        # when its file fails to open, a lost "t" just ages the entry; repair() rescans
+        with open(self.log_path, "w", encoding="utf-8"):
+            pass
+
+    def flush(self):
+        """Fold index.log into a fresh index.json snapshot."""
+        with self._lock:
+            self._compact()
+
+    def _touch(self, key: str, size: int):
+        old = self._index.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old[0]
+        self._index[key] = (size, time.time())
+        self._total_bytes += size
+
+    def _forget(self, key: str):
+        old = self._index.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old[0]
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._object_path(key)
+        with self._lock:
+            known = key in self._index
+            if not known and not os.path.exists(path):
+                self.misses += 1
+                return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            response = obj["response"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            size = self._index[key][0] if key in self._index else os.path.getsize(path)
+            self._touch(key, size)
+            ts = round(self._index[key][1], 3)
+            # hits are logged too, so eviction stays LRU across processes and runs
+            op = ["t", key, ts] if known else ["+", key, size, ts]
+            self._append_log([op] + self._evict())
+            self.hits += 1
+        return response
+
+    def put(self, key: str, response: str, meta: Optional[Dict[str, Any]] = None):
+        obj = dict(meta or {})
+        obj.update({"key": key, "response": response, "created_at": time.time()})
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        _atomic_write(self._object_path(key), data)
+        with self._lock:
+            self._touch(key, len(data))
+            ops = [["+", key, len(data), round(self._index[key][1], 3)]] + self._evict()
+            self._append_log(ops)
+
+    def _evict(self) -> List[list]:
+        ops: List[list] = []
+        while self._index and (len(self._index) > self.max_entries or self._total_bytes > self.max_bytes):
+            key, (size, _ts) = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.unlink(self._object_path(key))
+            except OSError:
+                pass
+            ops.append(["-", key])
+        return ops
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class CachedLLMBridge(LLMBridge):
+    """LLMBridge whose call_chat goes through an LLMResponseCache (same sync API)."""
+
+    def __init__(self, cfg: Optional[LLMConfig] = None, cache: Optional[LLMResponseCache] = None):
+        super().__init__(cfg)
+        self.cache = cache
+
+    def call_chat(self, messages: List[Dict[str, str]]) -> str:
+        if self.cache is None:
+            return super().call_chat(messages)
+        key = llm_cache_key(self.cfg, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = super().call_chat(messages)
+        self.cache.put(key, response, meta={"provider": self.cfg.provider, "model": self.cfg.model})
+        return response
+
+    async def acall_chat(self, messages: List[Dict[str, str]]) -> str:
+        if self.cache is None:
+            return await super().acall_chat(messages)
+        key = llm_cache_key(self.cfg, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = await super().acall_chat(messages)
+        self.cache.put(key, response, meta={"provider": self.cfg.provider, "model": self.cfg.model})
+        return response
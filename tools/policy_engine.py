@@ -0,0 +1,382 @@
+"""
+Compiled Policy Gate engine (config/policy_gate.yaml -> flat NumPy tables).
+
+The gate used to walk the YAML dicts on every request (`_safe_float` / `_cmp` per rule and
+per overlay key). `compile_policy(policy)` flattens it once:
+
+- regime rules:   feature index / op code / threshold / weight vectors + a (regime x slot)
+                  rule table, so N feature vectors are scored in one pass
+- overlays:       regime / scenario / portfolio multiplier tables over MULTIPLIER_KEYS
+- guardrails:     base / clamp-lo / clamp-hi vectors over GUARDRAIL_KEYS
+
+Results are identical to the original dict walk (same regime, score, confidence, reasons,
+multipliers and absolute guardrails): weights are accumulated in rule order, multipliers
+are applied in the same order, and rounding is done with Python's round().
+
+Feature matrices use `CompiledPolicy.feature_names` as column order; NaN = missing.
+
+Usage:
+    engine = compile_policy(yaml.safe_load(open("config/policy_gate.yaml")))
+    engine.score({"vix": 32})                            # -> regime dict
+    engine.score_batch(engine.features_matrix(rows))     # -> [regime dict, ...]
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+MULTIPLIER_KEYS = ("risk_multiplier", "max_leverage", "min_cash", "max_invest", "max_turnover", "max_corr")
+GUARDRAIL_KEYS = MULTIPLIER_KEYS[1:]
+
+NEUTRAL_REGIME = {"id": "neutral", "label": "中性 / Neutral", "score": 0.0, "confidence": 0.0, "reasons": []}
+
+# op codes (unknown ops never match, same as the old _cmp)
+OP_GT, OP_GE, OP_LT, OP_LE, OP_EQ = range(5)
+_OPS = {">": OP_GT, ">=": OP_GE, "<": OP_LT, "<=": OP_LE, "==": OP_EQ}
+
+def _safe_float(x: Any) -> Optional[float]:
+    try:
+        if x is None:
+            return None
+        return float(x)
+    except Exception:
+        return None
+
+
+def _apply_op(op: int, a: np.ndarray, b: Any) -> np.ndarray:
+    if op == OP_GT:
+        return a > b
+    if op == OP_GE:
+        return a >= b
+    if op == OP_LT:
+        return a < b
+    if op == OP_LE:
+        return a <= b
+    return a == b
+
+
+def _column(values: Any, n: int) -> np.ndarray:
+    """Scalar / sequence -> float64 column of length n (non-numeric -> NaN)."""
+    if np.isscalar(values) or values is None:
+        v = _safe_float(values)
+        return np.full(n, np.nan if v is None else v, dtype=np.float64)
+    try:
+        col = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        col = np.array([np.nan if _safe_float(x) is None else _safe_float(x) for x in values], dtype=np.float64)
+    return np.broadcast_to(col, (n,)) if col.ndim == 0 else col
+
+
+class CompiledPolicy:
+    def __init__(self, policy: Dict[str, Any]):
+        policy = policy or {}
+        self.version = policy.get("version")
+        self._compile_regimes(policy.get("regimes", []) or [])
+        self._compile_overlays(policy)
+
+    # ------------------------------------------------------------------ compile
+
+    def _compile_regimes(self, regimes: List[Any]):
+        feature_names: List[str] = []
+        feature_pos: Dict[str, int] = {}
+        rows: List[List[int]] = []  # regime row -> rule indices (rule order)
+        row_ids: List[Any] = []
+        feats, ops, vals, weights, texts = [], [], [], [], []
+
+        for r in regimes:
+            if not isinstance(r, dict) or not r.get("id"):
+                continue
+            rule_idx: List[int] = []
+            for rule in (r.get("rules", []) or []):
+                feat = rule.get("feature")
+                op = rule.get("op")
+                val = _safe_float(rule.get("value"))
+                w = _safe_float(rule.get("weight")) or 0.0
+                if not feat or not op or val is None or str(op) not in _OPS:
+                    continue
+                name = str(feat)
+                if name not in feature_pos:
+                    feature_pos[name] = len(feature_names)
+                    feature_names.append(name)
+                rule_idx.append(len(feats))
+                feats.append(feature_pos[name])
+                ops.append(_OPS[str(op)])
+                vals.append(val)
+                weights.append(w)
+                texts.append((feat, op, val))
+            rows.append(rule_idx)
+            row_ids.append(r.get("id"))
+
+        self.feature_names: List[str] = feature_names
+        self.feature_index: Dict[str, int] = feature_pos
+        self.rule_feature = np.asarray(feats, dtype=np.int64)
+        self.rule_op = np.asarray(ops, dtype=np.int8)
+        self.rule_value = np.asarray(vals, dtype=np.float64)
+        self.rule_weight = np.asarray(weights, dtype=np.float64)
+        self._rule_text = texts
+        self._rows = rows
+        self._op_cols = {op: np.flatnonzero(self.rule_op == op) for op in set(ops)}
+
+        # (regime row x slot) rule table, -1 padded; weight table 0.0 padded
+        width = max((len(x) for x in rows), default=0)
+        table = np.full((len(rows), width), -1, dtype=np.int64)
+        for i, idx in enumerate(rows):
+            table[i, : len(idx)] = idx
+        self.rule_table = table
+        self.weight_table = np.where(table >= 0, self.rule_weight[np.maximum(table, 0)] if len(weights) else 0.0, 0.0)
+
+        # Regimes are keyed by id: a later regime with the same id (and a positive score)
+        # overrides the earlier one, but keeps the position of the first one that scored.
+        self.regime_ids: List[Any] = []
+        self._regime_rows: List[List[int]] = []
+        for row, rid in enumerate(row_ids):
+            if rid not in self.regime_ids:
+                self.regime_ids.append(rid)
+                self._regime_rows.append([])
+            self._regime_rows[self.regime_ids.index(rid)].append(row)
+        self._has_duplicate_ids = len(self.regime_ids) != len(row_ids)
+
+        self.regime_labels: List[Any] = []
+        for rid in self.regime_ids:
+            label = rid
+            for r in regimes:
+                if isinstance(r, dict) and r.get("id") == rid and r.get("label"):
+                    label = r.get("label")
+                    break
+            self.regime_labels.append(label)
+
+    def _compile_overlays(self, policy: Dict[str, Any]):
+        def vec(d: Any, keys: Sequence[str], default: float, only_present: bool = False) -> np.ndarray:
+            d = d or {}
+            out = []
+            for k in keys:
+                if only_present and k not in d:
+                    out.append(1.0)  # x * 1.0 == x: absent key = untouched
+                else:
+                    out.append(float(_safe_float(d.get(k)) or default))
+            return np.asarray(out, dtype=np.float64)
+
+        # regime id -> multiplier row; empty / unknown regimes fall back to "neutral" (or all 1.0)
+        regime_overlays = policy.get("regime_overlays", {}) or {}
+        self._regime_overlay: Dict[Any, np.ndarray] = {
+            rid: vec(ov, MULTIPLIER_KEYS, 1.0) for rid, ov in regime_overlays.items() if ov
+        }
+        self._fallback_overlay = vec(regime_overlays.get("neutral"), MULTIPLIER_KEYS, 1.0)
+
+        guard_only = lambda d: {k: v for k, v in (d or {}).items() if k in GUARDRAIL_KEYS}  # noqa: E731
+        self._scenario_overlay: Dict[str, np.ndarray] = {
+            s: vec(guard_only(m), MULTIPLIER_KEYS, 1.0, only_present=True)
+            for s, m in (policy.get("scenario_overlays", {}) or {}).items()
+        }
+
+        port: List[Tuple[str, int, float, np.ndarray]] = []
+        for feat, rules in (policy.get("portfolio_overlays", {}) or {}).items():
+            for rule in (rules or []):
+                op = str(rule.get("op") or "")
+                val = _safe_float(rule.get("value"))
+                if not op or val is None or op not in _OPS:
+                    continue
+                port.append((str(feat), _OPS[op], val, vec(guard_only(rule), MULTIPLIER_KEYS, 1.0, only_present=True)))
+        self._portfolio_rules = port
+        self.portfolio_features: List[str] = list(dict.fromkeys(p[0] for p in port))
+
+        base = policy.get("base_guardrails", {}) or {}
+        clamps = policy.get("clamps", {}) or {}
+        self.base_guardrails = np.asarray([float(_safe_float(base.get(k)) or 0.0) for k in GUARDRAIL_KEYS])
+        self.clamp_lo = np.asarray([float(_safe_float((clamps.get(k) or {}).get("min")) or 0.0) for k in GUARDRAIL_KEYS])
+        self.clamp_hi = np.asarray([float(_safe_float((clamps.get(k) or {}).get("max")) or 1e9) for k in GUARDRAIL_KEYS])
+        self._is_min_key = np.asarray([k.startswith("min_") for k in GUARDRAIL_KEYS])
+
+    # ------------------------------------------------------------------ features
+
+    def features_matrix(self, features: Union[Sequence[Mapping[str, Any]], Mapping[str, Any]]) -> np.ndarray:
+        """
+        Rows of feature dicts, or columns {feature: array}, -> (N, F) float64 matrix in
+        `feature_names` order (missing / non-numeric -> NaN).
+        """
+        names = self.feature_names
+        if isinstance(features, Mapping):
+            lengths = [len(v) for v in features.values() if not np.isscalar(v) and v is not None]
+            n = max(lengths, default=1)
+            out = np.full((n, len(names)), np.nan, dtype=np.float64)
+            for j, name in enumerate(names):
+                if name in features:
+                    out[:, j] = _column(features[name], n)
+            return out
+        out = np.full((len(features), len(names)), np.nan, dtype=np.float64)
+        for i, row in enumerate(features):
+            for j, name in enumerate(names):
+                v = _safe_float((row or {}).get(name))
+                if v is not None:
+                    out[i, j] = v
+        return out
+
+    # ------------------------------------------------------------------ scoring
+
+    def score_arrays(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vectorized core. X: (N, F) in feature_names order.
+        Returns hits (N, K) per rule, totals (N, rows) per regime entry, and per sample
+        best (index into regime_ids, -1 = neutral), score and confidence (unrounded).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        n = X.shape[0]
+        vals = X[:, self.rule_feature] if self.rule_feature.size else np.empty((n, 0))
+        hits = np.zeros(vals.shape, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for op, cols in self._op_cols.items():
+                hits[:, cols] = _apply_op(op, vals[:, cols], self.rule_value[cols])
+
+        # accumulate in rule order (adding 0.0 for misses is exact)
+        totals = np.zeros((n, self.rule_table.shape[0]), dtype=np.float64)
+        for j in range(self.rule_table.shape[1]):
+            idx = self.rule_table[:, j]
+            valid = idx >= 0
+            totals += np.where(hits[:, np.maximum(idx, 0)] & valid, self.weight_table[:, j], 0.0)
+
+        U = len(self.regime_ids)
+        scores = np.full((n, U), -np.inf)
+        first_row = np.full((n, U), np.iinfo(np.int64).max, dtype=np.int64)
+        source_row = np.full((n, U), -1, dtype=np.int64)
+        for u, rows in enumerate(self._regime_rows):
+            for row in rows:
+                pos = totals[:, row] > 0
+                scores[:, u] = np.where(pos, totals[:, row], scores[:, u])
+                source_row[:, u] = np.where(pos, row, source_row[:, u])
+                first_row[:, u] = np.where(pos, np.minimum(first_row[:, u], row), first_row[:, u])
+
+        present = source_row >= 0
+        any_present = present.any(axis=1) if U else np.zeros(n, dtype=bool)
+        best_score = scores.max(axis=1) if U else np.full(n, -np.inf)
+        # ties -> first regime that scored (dict insertion order in the original)
+        tie_pos = np.where(present & (scores == best_score[:, None]), first_row, np.iinfo(np.int64).max)
+        best = np.where(any_present, tie_pos.argmin(axis=1) if U else 0, -1)
+
+        if self._has_duplicate_ids:
+            ssum = np.zeros(n)
+            for i in np.flatnonzero(any_present):
+                order = np.argsort(first_row[i][present[i]], kind="stable")
+                ssum[i] = sum(scores[i][present[i]][order].tolist())
+        else:
+            ssum = np.zeros(n)
+            for u in range(U):
+                ssum = ssum + np.where(present[:, u], scores[:, u], 0.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            conf = np.where(ssum > 0, np.where(any_present, best_score, 0.0) / np.where(ssum > 0, ssum, 1.0), 0.0)
+        best_row = np.where(any_present, source_row[np.arange(n), np.maximum(best, 0)], -1)
+        return {
+            "hits": hits,
+            "totals": totals,
+            "best": best,
+            "best_row": best_row,
+            "score": np.where(any_present, best_score, 0.0),
+            "confidence": conf,
+        }
+
+    def _regime_dict(self, X: np.ndarray, arrays: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+        u = int(arrays["best"][i])
+        if u < 0:
+            return dict(NEUTRAL_REGIME, reasons=[])
+        reasons = []
+        for k in self._rows[int(arrays["best_row"][i])]:
+            if arrays["hits"][i, k]:
+                feat, op, val = self._rule_text[k]
+                fv = float(X[i, self.rule_feature[k]])
+                reasons.append(f"{feat} {op} {val} (got {fv})")
+        return {
+            "id": self.regime_ids[u],
+            "label": self.regime_labels[u],
+            "score": round(float(arrays["score"][i]), 4),
+            "confidence": round(float(arrays["confidence"][i]), 4),
+            "reasons": reasons,
+        }
+
+    def score_batch(self, features_matrix: np.ndarray) -> List[Dict[str, Any]]:
+        """(N, F) feature matrix -> N regime dicts (same shape as the single-request gate)."""
+        X = np.asarray(features_matrix, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        arrays = self.score_arrays(X)
+        return [self._regime_dict(X, arrays, i) for i in range(X.shape[0])]
+
+    def score(self, features: Mapping[str, Any]) -> Dict[str, Any]:
+        return self.score_batch(self.features_matrix([features or {}]))[0]
+
+    # ------------------------------------------------------------------ overlay
+
+    def overlay_arrays(
+        self,
+        regime_ids: Sequence[Any],
+        scenarios: Optional[Sequence[Sequence[str]]] = None,
+        portfolio_state: Optional[Mapping[str, Any]] = None,
+        constraints: Optional[Mapping[str, Any]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        regime_ids: N regime ids; scenarios: per-row matched scenario lists;
+        portfolio_state / constraints: {key: scalar or N-array} (NaN / missing = absent).
+        Returns (multipliers (N, len(MULTIPLIER_KEYS)), absolute (N, len(GUARDRAIL_KEYS))).
+        """
+        n = len(regime_ids)
+        mult = np.vstack([self._regime_overlay.get(rid, self._fallback_overlay) for rid in regime_ids]) if n else np.empty((0, len(MULTIPLIER_KEYS)))
+
+        if scenarios is not None:
+            groups: Dict[Tuple[str, ...], List[int]] = {}
+            for i, scen in enumerate(scenarios):
+                if scen:
+                    groups.setdefault(tuple(scen), []).append(i)
+            for scen, rows in groups.items():
+                for s in scen:
+                    m = self._scenario_overlay.get(s)
+                    if m is not None:
+                        mult[rows] *= m
+
+        if portfolio_state:
+            cols = {f: _column(portfolio_state.get(f), n) for f in self.portfolio_features if f in portfolio_state}
+            with np.errstate(invalid="ignore"):
+                for feat, op, val, m in self._portfolio_rules:
+                    if feat not in cols:
+                        continue
+                    hit = _apply_op(op, cols[feat], val)
+                    mult = np.where(hit[:, None], mult * m, mult)
+
+        absolute = self.base_guardrails * mult[:, 1:]
+        absolute = np.maximum(self.clamp_lo, np.minimum(self.clamp_hi, absolute))
+        if constraints:
+            for j, k in enumerate(GUARDRAIL_KEYS):
+                if k not in constraints:
+                    continue
+                user = _column(constraints.get(k), n)
+                absolute[:, j] = np.fmax(absolute[:, j], user) if self._is_min_key[j] else np.fmin(absolute[:, j], user)
+        return mult, absolute
+
+    def overlay_batch(
+        self,
+        regime_ids: Sequence[Any],
+        scenarios: Optional[Sequence[Sequence[str]]] = None,
+        portfolio_state: Optional[Mapping[str, Any]] = None,
+        constraints: Optional[Mapping[str, Any]] = None,
+    ) -> List[Dict[str, Dict[str, float]]]:
+        mult, absolute = self.overlay_arrays(regime_ids, scenarios, portfolio_state, constraints)
+        out = []
+        for i in range(len(regime_ids)):
+            out.append({
+                "multipliers": {k: round(float(v), 6) for k, v in zip(MULTIPLIER_KEYS, mult[i].tolist())},
+                "absolute": {k: round(float(v), 6) for k, v in zip(GUARDRAIL_KEYS, absolute[i].tolist())},
+            })
+        return out
+
+    def overlay(
+        self,
+        regime_id: Any,
+        scenarios: List[str],
+        portfolio_state: Mapping[str, Any],
+        constraints: Mapping[str, Any],
+    ) -> Dict[str, Dict[str, float]]:
+        return self.overlay_batch([regime_id], [scenarios or []], portfolio_state or {}, constraints or {})[0]
+
+
+def compile_policy(policy: Dict[str, Any]) -> CompiledPolicy:
+    return CompiledPolicy(policy)
@@ -0,0 +1,162 @@
+"""
+Policy Gate replay over a historical feature table.
+
+`/api/policy/gate` evaluates one observation at a time and also runs rule retrieval and
+writes an audit line. For research (e.g. 20 years of daily features) this module replays
+only the deterministic part -- regime classification + risk overlay -- over a columnar
+table, using the compiled engine (tools/policy_engine.py) one chunk at a time.
+
+Table layout (CSV / Parquet / Arrow IPC / JSON):
+- date column (default "date"; falls back to the index)
+- feature columns named like the policy rule features (vix, credit_spread_bps, ...)
+- optional portfolio_state columns (the portfolio_overlays keys: drawdown_pct, leverage)
+- optional constraint columns (max_leverage, min_cash, max_invest, max_turnover, max_corr)
+Missing / non-numeric cells are treated as absent, exactly like a missing feature key.
+
+Usage:
+    engine = load_policy_engine()
+    df = replay_policy_frame(engine, read_feature_table("features.csv"))
+"""
+
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from tools.policy_engine import GUARDRAIL_KEYS, MULTIPLIER_KEYS, CompiledPolicy, compile_policy
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_POLICY_PATH = PROJECT_ROOT / "config" / "policy_gate.yaml"
+DEFAULT_CHUNK_SIZE = 1000
+TABLE_FORMATS = ("csv", "parquet", "arrow", "json")
+
+
+def load_policy_engine(path: Union[str, Path] = DEFAULT_POLICY_PATH) -> CompiledPolicy:
+    data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    return compile_policy(data if isinstance(data, dict) else {})
+
+
+def _infer_format(name: str) -> str:
+    suffix = Path(name).suffix.lower().lstrip(".")
+    if suffix in ("pq", "parquet"):
+        return "parquet"
+    if suffix in ("arrow", "feather", "ipc"):
+        return "arrow"
+    if suffix in ("json", "jsonl"):
+        return "json"
+    return "csv"
+
+
+def read_feature_table(source: Union[str, Path, bytes], fmt: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a feature table from a path or raw bytes.
+    Parquet / Arrow need pyarrow (optional dependency); JSON is columnar
+    {"col": [...]} or a list of row objects.
+    """
+    if fmt is None:
+        fmt = "csv" if isinstance(source, bytes) else _infer_format(str(source))
+    fmt = fmt.lower()
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"unsupported table format: {fmt} (expected one of {', '.join(TABLE_FORMATS)})")
+
+    buf: Any = io.BytesIO(source) if isinstance(source, bytes) else source
+    if fmt == "csv":
+        return pd.read_csv(buf)
+    if fmt == "json":
+        raw = source if isinstance(source, bytes) else Path(source).read_bytes()
+        return pd.DataFrame(json.loads(raw.decode("utf-8")))
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(f"{fmt} tables require pyarrow (pip install pyarrow)") from e
+    if fmt == "parquet":
+        return pd.read_parquet(buf)
+    return pd.read_feather(buf)
+
+
+def _date_values(table: pd.DataFrame, date_column: Optional[str]) -> List[Any]:
+    if date_column and date_column in table.columns:
+        col = table[date_column]
+    else:
+        col = pd.Series(table.index, index=table.index)
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return [None if pd.isna(x) else x.strftime("%Y-%m-%d") for x in col]
+    return [None if (isinstance(x, float) and np.isnan(x)) else (x.item() if hasattr(x, "item") else x) for x in col]
+
+
+def _numeric_columns(table: pd.DataFrame, names: Sequence[str]) -> Dict[str, np.ndarray]:
+    return {n: pd.to_numeric(table[n], errors="coerce").to_numpy(dtype=np.float64) for n in names if n in table.columns}
+
+
+def replay_policy(
+    engine: CompiledPolicy,
+    table: pd.DataFrame,
+    date_column: Optional[str] = "date",
+    scenarios: Sequence[str] = (),
+    row_scenarios: Optional[Sequence[Sequence[str]]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    with_reasons: bool = True,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield lists of rows (one list per chunk, in table order):
+      {"date", "regime": {id, label, score, confidence, reasons}, "risk_overlay": {multipliers, absolute}}
+    Same values as /api/policy/gate for the same features / portfolio_state / constraints.
+    `scenarios` applies to every row; `row_scenarios` (one list per row) overrides it.
+    """
+    chunk_size = max(1, int(chunk_size))
+    dates = _date_values(table, date_column)
+    features = _numeric_columns(table, engine.feature_names)
+    portfolio = _numeric_columns(table, engine.portfolio_features)
+    constraints = _numeric_columns(table, GUARDRAIL_KEYS)
+
+    for start in range(0, len(table), chunk_size):
+        stop = min(start + chunk_size, len(table))
+        n = stop - start
+        X = np.full((n, len(engine.feature_names)), np.nan)
+        for name, col in features.items():
+            X[:, engine.feature_index[name]] = col[start:stop]
+        regimes = engine.score_batch(X)
+        if row_scenarios is not None:
+            scen = [list(s or []) for s in row_scenarios[start:stop]]
+        else:
+            scen = [list(scenarios)] * n
+        overlays = engine.overlay_batch(
+            [r["id"] or "neutral" for r in regimes],
+            scen,
+            {k: v[start:stop] for k, v in portfolio.items()},
+            {k: v[start:stop] for k, v in constraints.items()},
+        )
+        rows = []
+        for i in range(n):
+            regime = regimes[i]
+            if not with_reasons:
+                regime = {k: v for k, v in regime.items() if k != "reasons"}
+            rows.append({"date": dates[start + i], "regime": regime, "risk_overlay": overlays[i]})
+        yield rows
+
+
+def replay_policy_frame(engine: CompiledPolicy, table: pd.DataFrame, **kwargs: Any) -> pd.DataFrame:
+    """Flat DataFrame: date, regime, label, score, confidence, mult_<key>..., abs_<key>..."""
+    kwargs.setdefault("with_reasons", False)
+    records = []
+    for chunk in replay_policy(engine, table, **kwargs):
+        for row in chunk:
+            rec = {
+                "date": row["date"],
+                "regime": row["regime"]["id"],
+                "label": row["regime"]["label"],
+                "score": row["regime"]["score"],
+                "confidence": row["regime"]["confidence"],
+            }
+            if "reasons" in row["regime"]:
+                rec["reasons"] = "; ".join(row["regime"]["reasons"])
+            for k in MULTIPLIER_KEYS:
+                rec[f"mult_{k}"] = row["risk_overlay"]["multipliers"][k]
+            for k in GUARDRAIL_KEYS:
+                rec[f"abs_{k}"] = row["risk_overlay"]["absolute"][k]
+            records.append(rec)
+    return pd.DataFrame.from_records(records)
@@ -0,0 +1,231 @@
+"""
+Local columnar price store for backtests (memory-mapped NumPy, no extra dependency).
+
+`BacktestEngine.load_prices` used to call yf.download on every run; sweeps and CI kept
+re-downloading the same SPY/SHY/GLD/BIL history. The store keeps one file per ticker and
+only downloads date ranges that are not covered yet.
+
+Layout (root_dir):
+  <TICKER>/prices.npy   structured array [("date", int64 days since epoch), ("close", float64)],
+                        sorted by date, loaded with mmap_mode="r"
+  <TICKER>/meta.json    {"version", "covered": [[start, end), ...] as ISO dates, "updated_at"}
+
+- coverage is tracked separately from rows, so weekends / holidays at the edges of a range
+  are not re-requested; a download that returns no bars for a ticker (outage, unknown
+  ticker: yf.download does not raise) marks nothing; otherwise the span before the first
+  bar counts as covered (pre-listing history is known to be empty) but coverage never
+  extends more than EDGE_GAP_DAYS past the last returned bar; today's (still moving) bar
+  is never marked as covered
+- missing ranges are fetched per ticker group in one download call and merged in
+  (new rows win on overlapping dates); writes are atomic (tmp file + os.replace)
+- offline mode (offline=True or IMH_PRICES_OFFLINE=1) never touches the network and
+  returns whatever is cached
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+STORE_VERSION = 1
+PRICE_DTYPE = np.dtype([("date", "<i8"), ("close", "<f8")])
+_EPOCH = date(1970, 1, 1)
+# longest run of calendar days without a bar that still counts as a market closure
+# (long weekend + holiday) at the end of a fetched range
+EDGE_GAP_DAYS = 5
+
+# fetcher(tickers, start, end) -> DataFrame of closes (DatetimeIndex, one column per ticker), end exclusive
+Fetcher = Callable[[List[str], str, str], pd.DataFrame]
+
+
+def _to_day(d) -> int:
+    return (pd.Timestamp(d).date() - _EPOCH).days
+
+
+def _from_day(n: int) -> str:
+    return (_EPOCH + timedelta(days=int(n))).isoformat()
+
+
+def _atomic_write(path: str, write: Callable) -> None:
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    out: List[Tuple[int, int]] = []
+    for s, e in sorted(r for r in ranges if r[1] > r[0]):
+        if out and s <= out[-1][1]:
+            out[-1] = (out[-1][0], max(out[-1][1], e))
+        else:
+            out.append((s, e))
+    return out
+
+
+def _subtract_ranges(start: int, end: int, covered: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    missing, cur = [], start
+    for s, e in covered:
+        if e <= cur or s >= end:
+            continue
+        if s > cur:
+            missing.append((cur, s))
+        cur = max(cur, e)
+        if cur >= end:
+            break
+    if cur < end:
+        missing.append((cur, end))
+    return missing
+
+
+def yfinance_fetcher(tickers: List[str], start: str, end: str) -> pd.DataFrame:
+    import yfinance as yf
+
+    data = yf.download(tickers, start=start, end=end, progress=False)
+    if "Close" in data:
+        data = data["Close"]
+    if isinstance(data, pd.Series):
+        data = data.to_frame(tickers[0])
+    return data
+
+
+class PriceStore:
+    def __init__(self, root_dir: str, offline: Optional[bool] = None, fetcher: Optional[Fetcher] = None):
+        self.root_dir = root_dir
+        if offline is None:
+            offline = os.getenv("IMH_PRICES_OFFLINE", "").strip().lower() in ("1", "true", "yes")
+        self.offline = bool(offline)
+        self.fetcher = fetcher or yfinance_fetcher
+        self.fetch_calls = 0
+
+    def _dir(self, ticker: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_.=" else "_" for c in ticker)
+        return os.path.join(self.root_dir, safe)
+
+    def _load(self, ticker: str) -> np.ndarray:
+        path = os.path.join(self._dir(ticker), "prices.npy")
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return np.empty(0, dtype=PRICE_DTYPE)
+
+    def _covered(self, ticker: str) -> List[Tuple[int, int]]:
+        try:
+            with open(os.path.join(self._dir(ticker), "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if not isinstance(meta, dict) or meta.get("version") != STORE_VERSION:
+            return []
+        return _merge_ranges([(_to_day(s), _to_day(e)) for s, e in meta.get("covered") or []])
+
+    def missing_ranges(self, ticker: str, start: str, end: str) -> List[Tuple[str, str]]:
+        """[start, end) ranges (ISO dates, end exclusive like yf.download) not in the store."""
+        miss = _subtract_ranges(_to_day(start), _to_day(end), self._covered(ticker))
+        return [(_from_day(s), _from_day(e)) for s, e in miss]
+
+    def _write(self, ticker: str, rows: np.ndarray, covered: List[Tuple[int, int]]) -> None:
+        d = self._dir(ticker)
+        _atomic_write(os.path.join(d, "prices.npy"), lambda f: np.save(f, rows))
+        meta = {
+            "version": STORE_VERSION,
+            "ticker": ticker,
+            "covered": [[_from_day(s), _from_day(e)] for s, e in covered],
+            "rows": int(len(rows)),
+            "updated_at": time.time(),
+        }
+        _atomic_write(os.path.join(d, "meta.json"), lambda f: f.write(json.dumps(meta, indent=2).encode("utf-8")))
+
+    def _merge(self, ticker: str, series: pd.Series, fetched: Tuple[int, int]) -> bool:
+        """Merge fetched bars; False (nothing written) if the download had no bars for `ticker`."""
+        series = pd.to_numeric(series, errors="coerce").dropna()
+        if not len(series):
+            return False
+        new = np.empty(len(series), dtype=PRICE_DTYPE)
+        idx = pd.DatetimeIndex(series.index)
+        if idx.tz is not None:
+            idx = idx.tz_localize(None)
+        new["date"] = (idx.normalize() - pd.Timestamp("1970-01-01")).days
+        new["close"] = series.to_numpy(dtype=np.float64)
+        old = np.array(self._load(ticker))
+        rows = np.concatenate([new, old]) if len(old) else new
+        # keep the first occurrence per date (= freshly fetched), then sort by date
+        _, first = np.unique(rows["date"], return_index=True)
+        rows = rows[np.sort(first)]
+        rows = rows[np.argsort(rows["date"], kind="stable")]
+        # a download that returned bars vouches for its whole leading gap (before listing,
+        # or a closure: known empty), but a truncated download leaves its tail missing, so
+        # coverage ends at the last bar unless the trailing gap is a closure (EDGE_GAP_DAYS)
+        s, e = fetched
+        last = int(new["date"].max())
+        if e - (last + 1) > EDGE_GAP_DAYS:
+            e = last + 1
+        # today's bar is still moving: never mark it (or the future) as covered
+        e = min(e, _to_day(datetime.now().date()))
+        self._write(ticker, rows, _merge_ranges(self._covered(ticker) + [(s, e)]))
+        return True
+
+    def update(self, tickers: Sequence[str], start: str, end: str) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Download the missing ranges (no-op offline). Returns {ticker: ranges still missing}
+        (offline, or the download failed / returned no bars; retried on the next call).
+        """
+        todo = {t: self.missing_ranges(t, start, end) for t in tickers}
+        todo = {t: r for t, r in todo.items() if r}
+        if not todo or self.offline:
+            return todo
+        # one download call per distinct missing range (usually the same for all tickers)
+        groups: Dict[Tuple[str, str], List[str]] = {}
+        for t, ranges in todo.items():
+            for r in ranges:
+                groups.setdefault(r, []).append(t)
+        failed: Dict[str, List[Tuple[str, str]]] = {}
+        for (s, e), group in groups.items():
+            print(f"Fetching prices for {group} from {s} to {e}...")
+            self.fetch_calls += 1
+            try:
+                data = self.fetcher(list(group), s, e)
+            except Exception as ex:
+                print(f"Warning: price download failed for {group} {s}..{e}: {type(ex).__name__}: {ex}")
+                data = None
+            for t in group:
+                col = data[t] if (data is not None and t in getattr(data, "columns", [])) else pd.Series(dtype=float)
+                if not self._merge(t, col, (_to_day(s), _to_day(e))):
+                    failed.setdefault(t, []).append((s, e))
+        if failed:
+            return {t: self.missing_ranges(t, start, end) for t in failed}
+        return {}
+
+    def get_close(self, tickers: Sequence[str], start: str, end: str) -> pd.DataFrame:
+        """Close prices for [start, end): DatetimeIndex "Date", one column per ticker (NaN where missing)."""
+        missing = self.update(tickers, start, end)
+        if missing:
+            state = "offline" if self.offline else "download failed"
+            print(f"Warning: price store {state}, missing ranges not fetched: {missing}")
+        lo, hi = _to_day(start), _to_day(end)
+        cols = {}
+        for t in tickers:
+            rows = self._load(t)
+            a, b = np.searchsorted(rows["date"], [lo, hi], side="left") if len(rows) else (0, 0)
+            part = rows[a:b]
+            cols[t] = pd.Series(
+                np.asarray(part["close"]),
+                index=pd.to_datetime(np.asarray(part["date"]), unit="D"),
+            )
+        df = pd.DataFrame(cols, columns=list(tickers))
+        df.index.name = "Date"
+        return df
@@ -1,13 +1,16 @@
 import os
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import yaml
 import json
 import re
 
 from tools.reasoning_core import get_master_personality, get_personality_description
 from tools.llm_bridge import LLMBridge, extract_json_block
+from tools.keyword_matcher import KeywordMatcher
 from pydantic import BaseModel
 
 # ---------------- Master Reasoning Board (Ensemble) Schemas ----------------
@@ -110,6 +113,22 @@ def _normalize_target_allocation(raw: Any) -> Dict[str, int]:
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Scenario keywords used to infer the adjudication regime in run_ensemble_committee.
+REGIME_SCENARIO_KEYWORDS: Dict[str, List[str]] = {
+    "市场恐慌": ["恐慌", "暴跌", "崩盘", "流动性危机", "panic", "crash", "selloff"],
+    "市场狂热": ["狂热", "fomo", "overheated", "追高"],
+    "经济衰退": ["衰退", "萧条", "recession"],
+    "流动性收紧": ["紧缩", "qt", "tightening"],
+}
+_regime_scenario_matcher: Optional[KeywordMatcher] = None
+
+
+def _get_regime_scenario_matcher() -> KeywordMatcher:
+    global _regime_scenario_matcher
+    if _regime_scenario_matcher is None:
+        _regime_scenario_matcher = KeywordMatcher({"scenario": REGIME_SCENARIO_KEYWORDS})
+    return _regime_scenario_matcher
+
 
 def _top_experts_from_hits(hits: List[tuple], top_n_docs: int = 20, top_k_experts: int = 3) -> List[str]:
     """
@@ -344,18 +363,65 @@ def run_ensemble_committee(
     Complete ensemble flow: retrieval -> LLM synthesis -> adjudication.
     Returns the tiered response as a dict.
     """
-    from tools.llm_bridge import LLMBridge, extract_json_block
-    from tools.reasoning_core import (
-        get_master_personality,
-        ALLOCATION_POLICY,
-        EnsembleAdjudicator,
-        ExpertOpinion as AdjudicatorOpinion,
-        SharpePrimaryAllocator,
-    )
-    
     if bridge is None:
         bridge = LLMBridge()
 
+    prep = _prepare_committee(vectorstore, query, top_n_rules, top_k_experts)
+    raw = bridge.call_chat(prep["messages"])
+    return _finalize_committee(raw, query, prep, bridge, top_n_rules, top_k_experts)
+
+
+async def arun_ensemble_committee(
+    vectorstore: Any,
+    query: str,
+    bridge: Optional[LLMBridge] = None,
+    top_n_rules: int = 20,
+    top_k_experts: int = 3,
+) -> Dict[str, Any]:
+    """
+    Async run_ensemble_committee: only retrieval runs in a worker thread; the LLM call
+    goes through LLMBridge.acall_chat (pooled, concurrency-limited) without holding one.
+    """
+    import asyncio
+
+    if bridge is None:
+        bridge = LLMBridge()
+
+    prep = await asyncio.to_thread(_prepare_committee, vectorstore, query, top_n_rules, top_k_experts)
+    raw = await bridge.acall_chat(prep["messages"])
+    return _finalize_committee(raw, query, prep, bridge, top_n_rules, top_k_experts)
+
+
+async def astream_ensemble_committee(
+    vectorstore: Any,
+    query: str,
+    bridge: Optional[LLMBridge] = None,
+    top_n_rules: int = 20,
+    top_k_experts: int = 3,
+):
+    """
+    Streaming run_ensemble_committee. Yields (event, data):
+    - ("retrieval", {experts, rule_hits}) as soon as retrieval finishes
+    - ("delta", {"text": ...}) for each LLM token chunk
+    - ("final", tiered response dict) after adjudication
+    """
+    import asyncio
+
+    if bridge is None:
+        bridge = LLMBridge()
+
+    prep = await asyncio.to_thread(_prepare_committee, vectorstore, query, top_n_rules, top_k_experts)
+    yield "retrieval", {"experts": prep["experts"], "rule_hits": prep["rule_hits"]}
+
+    parts: List[str] = []
+    async for text in bridge.astream_chat(prep["messages"]):
+        parts.append(text)
+        yield "delta", {"text": text}
+
+    yield "final", _finalize_committee("".join(parts), query, prep, bridge, top_n_rules, top_k_experts)
+
+
+def _prepare_committee(vectorstore: Any, query: str, top_n_rules: int, top_k_experts: int) -> Dict[str, Any]:
     # Step 1: retrieve rule hits + select experts
     prep = ensemble_reasoning(
         vectorstore=vectorstore,
@@ -365,16 +431,36 @@ def run_ensemble_committee(
     )
     experts = prep.get("experts") or []
     rule_hits = prep.get("rule_hits") or []
-    experts_personality = {eid: get_master_personality(eid) for eid in experts}
 
-    # Step 2: call LLM to synthesize structured JSON
+    # Step 2 (input): committee prompt for the LLM to synthesize structured JSON
     messages = build_committee_prompt(
         query=query,
         experts=experts,
         evidence=rule_hits,
         require_quant=True,
     )
-    raw = bridge.call_chat(messages)
+    return {"experts": experts, "rule_hits": rule_hits, "messages": messages}
+
+
+def _finalize_committee(
+    raw: str,
+    query: str,
+    prep: Dict[str, Any],
+    bridge: LLMBridge,
+    top_n_rules: int,
+    top_k_experts: int,
+) -> Dict[str, Any]:
+    from tools.reasoning_core import (
+        get_master_personality,
+        ALLOCATION_POLICY,
+        EnsembleAdjudicator,
+        ExpertOpinion as AdjudicatorOpinion,
+        SharpePrimaryAllocator,
+    )
+
+    experts = prep["experts"]
+    rule_hits = prep["rule_hits"]
+    experts_personality = {eid: get_master_personality(eid) for eid in experts}
 
     parsed, rest = extract_json_block(raw)
     if parsed is None:
@@ -390,19 +476,8 @@ def run_ensemble_committee(
 
     # Step 2.5: hybrid adjudication (deterministic overlay)
     def _match_scenarios_local(text: str) -> List[str]:
-        # Light copy of _match_scenarios from rag_service
-        t_low = (text or "").lower()
-        scenario_keywords = {
-            "市场恐慌": ["恐慌", "暴跌", "崩盘", "流动性危机", "panic", "crash", "selloff"],
-            "市场狂热": ["狂热", "fomo", "overheated", "追高"],
-            "经济衰退": ["衰退", "萧条", "recession"],
-            "流动性收紧": ["紧缩", "qt", "tightening"],
-        }
-        matched = []
-        for scen, keys in scenario_keywords.items():
-            if any(k in t_low for k in keys):
-                matched.append(scen)
-        return matched
+        # Light copy of _match_scenarios from rag_service (compiled once, one pass)
+        return _get_regime_scenario_matcher().labels(text)
 
     def _infer_regime_id(text: str) -> str:
         scen = _match_scenarios_local(text)
@@ -740,10 +815,222 @@ def load_vectorstore(persist_dir: str):
         embedding_function=get_embeddings(),
     )
 
+# ---------------- Query embedding cache ----------------
+class EmbeddingCache:
+    """
+    Bounded, thread-safe LRU: (embedding model, normalized query) -> embedding vector.
+
+    Query embedding (CPU MiniLM) is the largest per-request cost; policy_gate, /query and
+    ensemble_reasoning frequently embed the same text (e.g. dashboard refreshes).
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max(0, int(max_size))
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[Tuple[float, ...]]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def put(self, key: Tuple[str, str], vec: List[float]) -> Tuple[float, ...]:
+        frozen = tuple(float(x) for x in vec)
+        if self.max_size <= 0:
+            return frozen
+        with self._lock:
+            self._data[key] = frozen
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return frozen
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+EMBEDDING_CACHE_TYPE = "query_embedding"
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """全局查询向量缓存（大小由 IMH_EMBED_CACHE_SIZE 控制，0 = 关闭）"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        try:
+            size = int(os.getenv("IMH_EMBED_CACHE_SIZE") or 1024)
+        except ValueError:
+            size = 1024
+        _embedding_cache = EmbeddingCache(max_size=size)
+    return _embedding_cache
+
+
+def normalize_query(query: str) -> str:
+    """Cache key normalization: trim + collapse whitespace (MiniLM tokenization ignores both)."""
+    return " ".join((query or "").split())
+
+
+def _track_embedding_cache(hit: bool):
+    # services.metrics needs prometheus_client (optional); metrics must never break retrieval.
+    try:
+        from services.metrics import track_cache_hit, track_cache_miss, update_cache_size
+    except Exception:
+        return
+    try:
+        if hit:
+            track_cache_hit(EMBEDDING_CACHE_TYPE)
+        else:
+            track_cache_miss(EMBEDDING_CACHE_TYPE)
+            update_cache_size(EMBEDDING_CACHE_TYPE, len(get_embedding_cache()))
+    except Exception:
+        pass
+
+
+def _embedding_model_key(embeddings: Any) -> str:
+    return str(getattr(embeddings, "model_name", None) or type(embeddings).__name__)
+
+
+def embed_query_cached(embeddings: Any, query: str) -> List[float]:
+    """embeddings.embed_query with the LRU cache in front (key = model + normalized query)."""
+    text = normalize_query(query)
+    cache = get_embedding_cache()
+    key = (_embedding_model_key(embeddings), text)
+    vec = cache.get(key)
+    _track_embedding_cache(vec is not None)
+    if vec is None:
+        vec = cache.put(key, embeddings.embed_query(text))
+    return list(vec)
+
+
 def query_vectorstore(vectorstore, query: str, k: int = 5, filter_dict: dict = None):
-    """查询向量存储，支持元数据过滤"""
-    return vectorstore.similarity_search_with_score(
-        query, 
-        k=k,
-        filter=filter_dict
-    )
+    """查询向量存储，支持元数据过滤（查询向量经 LRU 缓存）"""
+    embeddings = getattr(vectorstore, "_embedding_function", None)
+    by_vector = getattr(vectorstore, "similarity_search_by_vector_with_relevance_scores", None)
+    if embeddings is None or by_vector is None:
+        return vectorstore.similarity_search_with_score(
+            query, 
+            k=k,
+            filter=filter_dict
+        )
+    return by_vector(embed_query_cached(embeddings, query), k=k, filter=filter_dict)
+
+
+def _is_asymmetric(embeddings: Any) -> bool:
+    # instruct / BGE-style models embed queries and documents differently
+    return any(getattr(embeddings, attr, None) for attr in ("query_instruction", "embed_instruction"))
+
+
+def embed_queries_cached(embeddings: Any, queries: List[str]) -> List[List[float]]:
+    """
+    Batch form of embed_query_cached: cache misses (deduplicated) are embedded with a
+    single embeddings.embed_documents call. Returns vectors in input order.
+
+    embed_documents vectors are cached under their own key namespace ("<model>#documents"),
+    so they are never served to embed_query_cached (or vice versa). Asymmetric models
+    (query_instruction / embed_instruction) embed each miss with embed_query instead.
+    """
+    cache = get_embedding_cache()
+    asymmetric = _is_asymmetric(embeddings)
+    model = _embedding_model_key(embeddings) + ("" if asymmetric else "#documents")
+    texts = [normalize_query(q) for q in queries]
+    vecs: Dict[str, Tuple[float, ...]] = {}
+    missing: List[str] = []
+    for text in texts:
+        if text in vecs or text in missing:
+            continue
+        vec = cache.get((model, text))
+        _track_embedding_cache(vec is not None)
+        if vec is None:
+            missing.append(text)
+        else:
+            vecs[text] = vec
+    if missing:
+        fresh = [embeddings.embed_query(t) for t in missing] if asymmetric else embeddings.embed_documents(missing)
+        for text, vec in zip(missing, fresh):
+            vecs[text] = cache.put((model, text), vec)
+    return [list(vecs[text]) for text in texts]
+
+
+def _collection_results_to_hits(results: Dict[str, Any], i: int, k: int) -> List[tuple]:
+    try:
+        from langchain.schema import Document  # type: ignore
+    except Exception:
+        from langchain_core.documents import Document  # type: ignore
+
+    docs = (results.get("documents") or [[]])[i]
+    metas = (results.get("metadatas") or [[]])[i]
+    dists = (results.get("distances") or [[]])[i]
+    hits = []
+    for doc, meta, dist in list(zip(docs, metas, dists))[:k]:
+        hits.append((Document(page_content=doc or "", metadata=meta or {}), dist))
+    return hits
+
+
+def query_vectorstore_batch(vectorstore, requests: List[Dict[str, Any]]) -> List[List[tuple]]:
+    """
+    Batch retrieval: requests = [{query, k, filter_dict}, ...].
+    - all queries are embedded together (embed_queries_cached -> one embed_documents call)
+    - similarity searches run once per distinct filter (Chroma collection.query with
+      all query vectors of that group, n_results = max k of the group)
+    Returns hits per request, in request order.
+    """
+    out: List[List[tuple]] = [[] for _ in requests]
+    if not requests:
+        return out
+
+    embeddings = getattr(vectorstore, "_embedding_function", None)
+    if embeddings is None or not hasattr(embeddings, "embed_documents"):
+        # No embedding access (e.g. custom stores): fall back to per-query search.
+        for i, r in enumerate(requests):
+            out[i] = query_vectorstore(vectorstore, r.get("query") or "", k=int(r.get("k") or 5), filter_dict=r.get("filter_dict"))
+        return out
+
+    vectors = embed_queries_cached(embeddings, [r.get("query") or "" for r in requests])
+
+    groups: Dict[str, List[int]] = {}
+    for i, r in enumerate(requests):
+        gkey = json.dumps(r.get("filter_dict"), sort_keys=True, ensure_ascii=False)
+        groups.setdefault(gkey, []).append(i)
+
+    collection = getattr(vectorstore, "_collection", None)
+    for idxs in groups.values():
+        filter_dict = requests[idxs[0]].get("filter_dict")
+        ks = [max(1, int(requests[i].get("k") or 5)) for i in idxs]
+        if collection is not None and hasattr(collection, "query"):
+            results = collection.query(
+                query_embeddings=[vectors[i] for i in idxs],
+                n_results=max(ks),
+                where=filter_dict or None,
+                include=["documents", "metadatas", "distances"],
+            )
+            for j, (i, k) in enumerate(zip(idxs, ks)):
+                out[i] = _collection_results_to_hits(results, j, k)
+        else:
+            for i, k in zip(idxs, ks):
+                out[i] = vectorstore.similarity_search_by_vector_with_relevance_scores(vectors[i], k=k, filter=filter_dict)
+    return out
+
@@ -1,10 +1,13 @@
 import json
+import threading
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from pathlib import Path
 
 import yaml
 
+from tools.config_registry import get_config_registry
+
 @dataclass
 class ExpertOpinion:
     investor_id: str
@@ -58,24 +61,6 @@ PROJECT_ROOT = Path(__file__).parent.parent
 REASONING_CONFIG_PATH = PROJECT_ROOT / "config" / "reasoning_config.yaml"
 
 
-def _load_reasoning_config() -> Dict[str, Any]:
-    if not REASONING_CONFIG_PATH.exists():
-        return {}
-    try:
-        data = yaml.safe_load(REASONING_CONFIG_PATH.read_text(encoding="utf-8")) or {}
-        return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
-
-
-_CFG: Dict[str, Any] = _load_reasoning_config()
-
-if isinstance(_CFG.get("personality_descriptions"), dict):
-    PERSONALITY_DESCRIPTIONS = {**PERSONALITY_DESCRIPTIONS, **_CFG["personality_descriptions"]}
-
-if isinstance(_CFG.get("master_personalities"), dict):
-    MASTER_PERSONALITIES = {**MASTER_PERSONALITIES, **_CFG["master_personalities"]}
-
 # Deterministic allocation policy (used to generate primary.target_allocation).
 # Goal: improve risk-adjusted returns (Sharpe) by reducing LLM numeric noise and
 # dampening aggressive shifts under expert conflicts.
@@ -106,32 +91,86 @@ ALLOCATION_POLICY: Dict[str, Any] = {
     },
 }
 
-if isinstance(_CFG.get("allocation_policy"), dict):
-    ap = _CFG.get("allocation_policy") or {}
-    if isinstance(ap.get("regime_bases"), dict):
-        ALLOCATION_POLICY["regime_bases"] = {**ALLOCATION_POLICY["regime_bases"], **ap.get("regime_bases")}
-    for k in (
-        "objective",
-        "amplitude",
-        "conflict_damping",
-        "mapping_mode",
-        "exp_up",
-        "exp_down",
-        "scale_up",
-        "scale_down",
-        "min_cash",
-        "max_cash",
-    ):
-        if k in ap:
-            ALLOCATION_POLICY[k] = ap.get(k)
+_DEFAULT_PERSONALITY_DESCRIPTIONS = dict(PERSONALITY_DESCRIPTIONS)
+_DEFAULT_MASTER_PERSONALITIES = dict(MASTER_PERSONALITIES)
+_DEFAULT_ALLOCATION_POLICY = json.loads(json.dumps(ALLOCATION_POLICY))
+_APPLY_LOCK = threading.Lock()
+
+
+def _apply_reasoning_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuild PERSONALITY_DESCRIPTIONS / MASTER_PERSONALITIES / ALLOCATION_POLICY (and the
+    EnsembleAdjudicator tables) from the defaults + reasoning_config.yaml.
+
+    The new dicts are built completely and then swapped in (rebinding, never clear() +
+    update()), so concurrent readers in worker threads always see a full table: the old
+    one or the new one. Read them through the module / class attribute, not a saved reference.
+    """
+    global PERSONALITY_DESCRIPTIONS, MASTER_PERSONALITIES, ALLOCATION_POLICY
+    cfg = cfg if isinstance(cfg, dict) else {}
+
+    descriptions = dict(_DEFAULT_PERSONALITY_DESCRIPTIONS)
+    if isinstance(cfg.get("personality_descriptions"), dict):
+        descriptions.update(cfg["personality_descriptions"])
+
+    masters = dict(_DEFAULT_MASTER_PERSONALITIES)
+    if isinstance(cfg.get("master_personalities"), dict):
+        masters.update(cfg["master_personalities"])
+
+    policy = json.loads(json.dumps(_DEFAULT_ALLOCATION_POLICY))
+    if isinstance(cfg.get("allocation_policy"), dict):
+        ap = cfg.get("allocation_policy") or {}
+        if isinstance(ap.get("regime_bases"), dict):
+            policy["regime_bases"] = {**policy["regime_bases"], **ap.get("regime_bases")}
+        for k in (
+            "objective",
+            "amplitude",
+            "conflict_damping",
+            "mapping_mode",
+            "exp_up",
+            "exp_down",
+            "scale_up",
+            "scale_down",
+            "min_cash",
+            "max_cash",
+        ):
+            if k in ap:
+                policy[k] = ap.get(k)
+
+    weights = dict(_DEFAULT_REGIME_WEIGHTS)
+    if isinstance(cfg.get("regime_weights"), dict):
+        weights.update(cfg["regime_weights"])
+
+    categories = dict(_DEFAULT_EXPERT_CATEGORIES)
+    if isinstance(cfg.get("expert_categories"), dict):
+        categories.update(cfg["expert_categories"])
+
+    with _APPLY_LOCK:
+        PERSONALITY_DESCRIPTIONS = descriptions
+        MASTER_PERSONALITIES = masters
+        ALLOCATION_POLICY = policy
+        EnsembleAdjudicator.REGIME_WEIGHTS = weights
+        EnsembleAdjudicator.EXPERT_CATEGORIES = categories
+    return cfg
+
+
+def _refresh_reasoning_config() -> None:
+    try:
+        _CONFIG.compiled("reasoning")
+    except Exception:
+        # unreadable on first load: keep built-in defaults (same as before)
+        pass
 
 
 def get_master_personality(investor_id: str) -> str:
+    _refresh_reasoning_config()
     return MASTER_PERSONALITIES.get(str(investor_id or "").strip(), ExpertPersonality.ANALYST)
 
 
 def get_personality_description(personality: str) -> str:
-    return PERSONALITY_DESCRIPTIONS.get(personality, PERSONALITY_DESCRIPTIONS[ExpertPersonality.ANALYST])
+    _refresh_reasoning_config()
+    descriptions = PERSONALITY_DESCRIPTIONS  # one snapshot for both lookups
+    return descriptions.get(personality, descriptions[ExpertPersonality.ANALYST])
 
 
 class EnsembleAdjudicator:
@@ -186,11 +225,8 @@ class EnsembleAdjudicator:
         "cliff_asness": "quant"
     }
 
-    # Allow overriding via config file (if present)
-    if isinstance(_CFG.get("regime_weights"), dict):
-        REGIME_WEIGHTS = {**REGIME_WEIGHTS, **_CFG["regime_weights"]}
-    if isinstance(_CFG.get("expert_categories"), dict):
-        EXPERT_CATEGORIES = {**EXPERT_CATEGORIES, **_CFG["expert_categories"]}
+    # Overridable via reasoning_config.yaml (regime_weights / expert_categories),
+    # swapped in as new dicts by _apply_reasoning_config.
 
     @classmethod
     def adjudicate(cls, regime_id: str, opinions: List[ExpertOpinion]) -> Dict[str, Any]:
@@ -206,7 +242,8 @@ class EnsembleAdjudicator:
                 "resolution": "No expert opinions to adjudicate."
             }
 
-        regime_weights = cls.REGIME_WEIGHTS.get(regime_id, cls.REGIME_WEIGHTS["neutral"])
+        all_weights, categories = cls.REGIME_WEIGHTS, cls.EXPERT_CATEGORIES  # one snapshot per call
+        regime_weights = all_weights.get(regime_id, all_weights["neutral"])
         
         weighted_sum = 0.0
         total_weight = 0.0
@@ -218,7 +255,7 @@ class EnsembleAdjudicator:
         neg_impacts = []
 
         for op in opinions:
-            category = cls.EXPERT_CATEGORIES.get(op.investor_id, "value")
+            category = categories.get(op.investor_id, "value")
             weight = regime_weights.get(category, 0.5) * op.confidence
             
             impact_value = op.impact * weight
@@ -325,6 +362,7 @@ class SharpePrimaryAllocator:
         conflict_detected: bool = False,
         disagreement_score: Optional[float] = None,
     ) -> Dict[str, int]:
+        _refresh_reasoning_config()
         ap = ALLOCATION_POLICY or {}
 
         # Regime base
@@ -452,3 +490,11 @@ class SharpePrimaryAllocator:
         # Final normalize
         return cls._normalize_int_alloc(out)
 
+
+# reasoning_config.yaml is hot-reloaded through the shared config registry
+# (registered last: _apply_reasoning_config also patches EnsembleAdjudicator tables).
+_DEFAULT_REGIME_WEIGHTS = dict(EnsembleAdjudicator.REGIME_WEIGHTS)
+_DEFAULT_EXPERT_CATEGORIES = dict(EnsembleAdjudicator.EXPERT_CATEGORIES)
+_CONFIG = get_config_registry()
+_CONFIG.register("reasoning", REASONING_CONFIG_PATH, compile=_apply_reasoning_config)
+_refresh_reasoning_config()
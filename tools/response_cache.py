@@ -0,0 +1,89 @@
+"""
+Bounded in-memory response cache with TTL and version-based invalidation.
+
+Used for whole /api/policy/gate responses: the response is a pure function of the
+request (after feature auto-fill), the loaded configs and the vectorstore content, so the
+caller passes those as `version` and the request digest as `key`.
+
+- LRU eviction at `max_entries`; entries older than `ttl_s` are treated as misses
+- a different `version` on get/put drops every entry (policy edit, vectorstore sync),
+  so stale responses are never served and never linger in memory
+- max_entries <= 0 or ttl_s <= 0 disables the cache (get always misses, put is a no-op)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512, ttl_s: float = 300.0):
+        self.max_entries = int(max_entries)
+        self.ttl_s = float(ttl_s)
+        # key -> (expires_at monotonic, value); order = LRU -> MRU
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_s > 0
+
+    def _check_version(self, version: Hashable) -> None:
+        # caller holds the lock
+        if version != self._version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._version = version
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, version: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._version = None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,385 @@
+"""
+Precompiled investor router index.
+
+`services/rag_service._route_investors` used to rebuild the intent table, walk every
+investor in `config/investor_index.yaml` and regex-split their key concepts on every
+request. `RouterIndex` does that work once per index load:
+
+- every routing token (quick-lookup questions, valuation keywords, investor names,
+  tags_zh / style / best_for / key_concepts / fund) is mapped to the routing rules it
+  feeds, i.e. (investor_id, weight, reason);
+- a query is scanned once over the raw text and once over the lowercased text with
+  Aho–Corasick automatons (tools/keyword_matcher.py); scenarios and intents come from
+  the shared scenario/intent automaton;
+- matched rules are replayed in the original rule order, so scores (including float
+  accumulation order), rankings and reasons are identical to the reference router.
+
+`route_reference` keeps the original per-request scan for parity tests and
+`scripts/bench_router.py`.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from tools.keyword_matcher import INTENT_KEYWORDS, SCENARIO_KEYWORDS, AhoCorasick, match_scenarios_and_intents
+
+# Explicit over/under valuation routing (stronger signal)
+UNDERVAL_KEYS = ["低估", "便宜", "折价", "underpriced", "undervalued", "cheap"]
+OVERVAL_KEYS = ["高估", "太贵", "贵", "溢价", "overpriced", "overvalued", "expensive"]
+UNDERVAL_INVESTORS = ["seth_klarman", "warren_buffett", "howard_marks"]
+OVERVAL_INVESTORS = ["charlie_munger", "michael_burry", "howard_marks", "george_soros"]
+
+# Ticker hints (AAPL/TSLA/NVDA etc.) -> treat as stock selection
+TICKER_RE = re.compile(r"\b[A-Z]{1,5}\b")
+TICKER_INVESTORS = ["warren_buffett", "peter_lynch", "charlie_munger"]
+
+# Fill-ins when keywords are too weak to produce enough candidates.
+DEFAULT_INVESTORS = ["warren_buffett", "charlie_munger", "howard_marks", "ray_dalio", "seth_klarman"]
+
+_KEY_CONCEPT_PAREN_RE = re.compile(r"\(([^)]+)\)")
+
+# Haystacks a pattern is matched against.
+RAW = 0  # stripped text, case-sensitive
+LOW = 1  # stripped text, lowercased
+
+Add = Tuple[str, float, str]
+
+
+def investor_field_tokens(inv: Dict[str, Any]) -> List[str]:
+    """
+    Routing tokens for one investor: tags_zh / style / best_for / key_concepts / fund.
+    Deduplicated with set() exactly like the original router, so the reason string
+    lists matched tokens in the same order.
+    """
+    fields: List[str] = []
+    for k in ("tags_zh", "style", "best_for"):
+        vals = inv.get(k) or []
+        if isinstance(vals, list):
+            fields.extend([str(x) for x in vals if x])
+
+    # key_concepts items may contain "moat (护城河)" -> both tokens
+    key_concepts = inv.get("key_concepts") or []
+    if isinstance(key_concepts, list):
+        for x in key_concepts:
+            s = str(x)
+            fields.append(s)
+            m = _KEY_CONCEPT_PAREN_RE.search(s)
+            if m:
+                fields.append(m.group(1))
+
+    # fund/company
+    fund = inv.get("fund")
+    if fund:
+        fields.append(str(fund))
+
+    return list(set(fields))
+
+
+def _keywords_reason(matched: List[str]) -> str:
+    return f"匹配关键词：{', '.join(matched[:6])}" + ("…" if len(matched) > 6 else "")
+
+
+def build_route_output(
+    investors: List[Dict[str, Any]],
+    scores: Dict[str, float],
+    reasons: Dict[str, List[str]],
+    top_k: int,
+    matched_scenarios: List[str],
+    by_id: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Rank scored investors and pad with defaults (shared by both router implementations)."""
+    if by_id is None:
+        by_id = {inv.get("id"): inv for inv in investors if inv.get("id")}
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    target_n = max(1, min(int(top_k or 5), 10))
+    out: List[Dict[str, Any]] = []
+    for iid, sc in ranked[:target_n]:
+        inv = by_id.get(iid) or {}
+        out.append(
+            {
+                "investor_id": iid,
+                "chinese_name": inv.get("chinese_name") or iid,
+                "full_name": inv.get("full_name") or iid,
+                "nationality": inv.get("nationality"),
+                "fund": inv.get("fund"),
+                "intro_zh": inv.get("intro_zh"),
+                "score": round(sc, 3),
+                "reasons": reasons.get(iid, [])[:5],
+                "matched_scenarios": matched_scenarios,
+            }
+        )
+
+    # Ensure we always return enough candidates for novices (fill with sensible defaults).
+    existing = {x.get("investor_id") for x in out}
+    if len(out) < target_n:
+        for iid in DEFAULT_INVESTORS:
+            if len(out) >= target_n:
+                break
+            if iid in existing:
+                continue
+            inv = by_id.get(iid) or {}
+            out.append(
+                {
+                    "investor_id": iid,
+                    "chinese_name": inv.get("chinese_name") or iid,
+                    "full_name": inv.get("full_name") or iid,
+                    "nationality": inv.get("nationality"),
+                    "fund": inv.get("fund"),
+                    "intro_zh": inv.get("intro_zh"),
+                    "score": 0.0,
+                    "reasons": ["信息不足/关键词不明显，补齐通用组合（价值/周期/宏观/风控）"],
+                    "matched_scenarios": matched_scenarios,
+                }
+            )
+    return out
+
+
+class RouterIndex:
+    """
+    Compiled form of `investor_index.yaml` for `_route_investors`.
+
+    Rules are stored in the exact order the original router applied them:
+    quick_lookup -> scenario consult_order -> intents -> valuation -> ticker -> investors.
+    Scenario and intent boosts are keyed by label (matched by the shared automaton);
+    every other rule is either "fixed" (fires when any of its patterns occurs) or "keywords"
+    (per-investor field tokens; weight scales with the number of matched tokens).
+    """
+
+    def __init__(self, index: Dict[str, Any]):
+        idx = index or {}
+        self.investors: List[Dict[str, Any]] = idx.get("investors", []) or []
+        self.by_id: Dict[str, Dict[str, Any]] = {inv.get("id"): inv for inv in self.investors if inv.get("id")}
+
+        # rule = (kind, payload); kind in {"fixed", "keywords"}
+        self._rules: List[Tuple[str, Any]] = []
+        self._patterns: Dict[Tuple[int, str], int] = {}
+        # pattern id -> [(rule_idx, token_idx)]; token_idx = -1 for fixed rules
+        self._postings: List[List[Tuple[int, int]]] = []
+        self._automatons = (AhoCorasick(), AhoCorasick())
+
+        quick_lookup = (idx.get("quick_lookup", {}) or {}).get("by_question", {}) or {}
+        for q, ids in quick_lookup.items():
+            if not q:
+                continue
+            ri = self._add_rule("fixed", [(iid, 3.5, f"匹配快速问题「{q}」") for iid in (ids or [])])
+            self._post(RAW, q, ri)
+        self._n_quick = len(self._rules)
+
+        self._scenario_adds: Dict[str, List[Add]] = {}
+        for scen, route in (idx.get("scenario_routing", {}) or {}).items():
+            consult = (route or {}).get("consult_order", []) or []
+            self._scenario_adds[scen] = [
+                (iid, 3.0 - min(rank, 3) * 0.5, f"匹配情境「{scen}」") for rank, iid in enumerate(consult)
+            ]
+
+        self._intent_adds: Dict[str, List[Add]] = {
+            intent: [(iid, 1.8, f"匹配意图「{intent}」") for iid in ids] for intent, (_keys, ids) in INTENT_KEYWORDS.items()
+        }
+
+        ri = self._add_rule("fixed", [(iid, 2.6, "判断是否低估/有安全边际") for iid in UNDERVAL_INVESTORS])
+        for k in UNDERVAL_KEYS:
+            self._post(LOW, k.lower(), ri)
+        ri = self._add_rule("fixed", [(iid, 2.6, "判断是否高估/泡沫与风险") for iid in OVERVAL_INVESTORS])
+        for k in OVERVAL_KEYS:
+            self._post(LOW, k.lower(), ri)
+        self._n_pre_ticker = len(self._rules)
+        self._ticker_adds: List[Add] = [(iid, 1.2, "识别到代码/股票缩写，偏向选股视角") for iid in TICKER_INVESTORS]
+
+        for inv in self.investors:
+            iid = inv.get("id")
+            if not iid:
+                continue
+            cn = (inv.get("chinese_name") or "").strip()
+            en = (inv.get("full_name") or "").strip()
+            if cn:
+                self._post(RAW, cn, self._add_rule("fixed", [(iid, 5.0, "文本中直接提到该大师姓名")]))
+            if en:
+                self._post(LOW, en.lower(), self._add_rule("fixed", [(iid, 5.0, "文本中直接提到该大师英文名")]))
+
+            tokens = [tok for tok in investor_field_tokens(inv) if tok]
+            if not tokens:
+                continue
+            ri = self._add_rule("keywords", (iid, tokens))
+            for ti, token in enumerate(tokens):
+                token_low = token.lower()
+                if len(token) >= 2:
+                    self._post(RAW, token, ri, ti)
+                if len(token_low) >= 3:
+                    self._post(LOW, token_low, ri, ti)
+
+        for ac in self._automatons:
+            ac.build()
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self._postings)
+
+    def _add_rule(self, kind: str, payload: Any) -> int:
+        self._rules.append((kind, payload))
+        return len(self._rules) - 1
+
+    def _post(self, haystack: int, pattern: str, rule_idx: int, token_idx: int = -1):
+        key = (haystack, pattern)
+        pid = self._patterns.get(key)
+        if pid is None:
+            pid = len(self._postings)
+            self._patterns[key] = pid
+            self._postings.append([])
+            self._automatons[haystack].add(pattern, pid)
+        self._postings[pid].append((rule_idx, token_idx))
+
+    def _match_rules(self, t: str, t_low: str) -> Dict[int, Set[int]]:
+        """Scan both haystacks once; return rule_idx -> matched token indices."""
+        hits: Dict[int, Set[int]] = {}
+        for haystack, text in ((RAW, t), (LOW, t_low)):
+            for pid in self._automatons[haystack].find(text):
+                for ri, ti in self._postings[pid]:
+                    hits.setdefault(ri, set()).add(ti)
+        return hits
+
+    def score(
+        self, text: str, matched_scenarios: Iterable[str], matched_intents: Iterable[str]
+    ) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        t = (text or "").strip()
+        hits = self._match_rules(t, t.lower())
+
+        scores: Dict[str, float] = {}
+        reasons: Dict[str, List[str]] = {}
+
+        def add_all(adds: List[Add]):
+            for iid, delta, why in adds:
+                scores[iid] = scores.get(iid, 0.0) + delta
+                reasons.setdefault(iid, []).append(why)
+
+        def add_labels():
+            for scen in matched_scenarios:
+                add_all(self._scenario_adds.get(scen, []))
+            for intent in matched_intents:
+                add_all(self._intent_adds.get(intent, []))
+
+        scenarios_done = False
+        ticker_done = False
+        for ri in sorted(hits):
+            if not scenarios_done and ri >= self._n_quick:
+                add_labels()
+                scenarios_done = True
+            if not ticker_done and ri >= self._n_pre_ticker:
+                if TICKER_RE.search(text or ""):
+                    add_all(self._ticker_adds)
+                ticker_done = True
+
+            kind, payload = self._rules[ri]
+            if kind == "fixed":
+                add_all(payload)
+            else:
+                iid, tokens = payload
+                matched = [tokens[ti] for ti in sorted(hits[ri])]
+                add_all([(iid, min(3.0, 0.6 * len(matched)), _keywords_reason(matched))])
+
+        if not scenarios_done:
+            add_labels()
+        if not ticker_done and TICKER_RE.search(text or ""):
+            add_all(self._ticker_adds)
+        return scores, reasons
+
+    def route(
+        self,
+        text: str,
+        top_k: int = 5,
+        matched_scenarios: Optional[List[str]] = None,
+        matched_intents: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank investors for text. Scenarios/intents default to one pass of the shared
+        automaton; callers that already matched them can pass them in.
+        """
+        if matched_scenarios is None or matched_intents is None:
+            scen, intents = match_scenarios_and_intents(text)
+            matched_scenarios = scen if matched_scenarios is None else matched_scenarios
+            matched_intents = intents if matched_intents is None else matched_intents
+        matched_scenarios = list(matched_scenarios)
+        scores, reasons = self.score(text, matched_scenarios, matched_intents)
+        return build_route_output(self.investors, scores, reasons, top_k, matched_scenarios, by_id=self.by_id)
+
+
+def route_reference(
+    index: Dict[str, Any],
+    text: str,
+    top_k: int = 5,
+    matched_scenarios: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Original per-request router (no precompilation).
+    Kept as the parity baseline for RouterIndex; do not use on the request path.
+    """
+    idx = index or {}
+    investors = idx.get("investors", []) or []
+    scenario_routing = idx.get("scenario_routing", {}) or {}
+    t = (text or "").strip()
+    t_low = t.lower()
+
+    if matched_scenarios is None:
+        matched_scenarios = [
+            scen for scen, keys in SCENARIO_KEYWORDS.items() if any(k.lower() in t_low for k in keys)
+        ]
+    matched_scenarios = list(matched_scenarios)
+
+    quick_lookup = (idx.get("quick_lookup", {}) or {}).get("by_question", {}) or {}
+
+    scores: Dict[str, float] = {}
+    reasons: Dict[str, List[str]] = {}
+
+    def add(iid: str, delta: float, why: str):
+        scores[iid] = scores.get(iid, 0.0) + delta
+        reasons.setdefault(iid, []).append(why)
+
+    for q, ids in quick_lookup.items():
+        if q and q in t:
+            for iid in (ids or []):
+                add(iid, 3.5, f"匹配快速问题「{q}」")
+
+    for scen in matched_scenarios:
+        route = scenario_routing.get(scen, {}) or {}
+        consult = route.get("consult_order", []) or []
+        for rank, iid in enumerate(consult):
+            add(iid, 3.0 - min(rank, 3) * 0.5, f"匹配情境「{scen}」")
+
+    for intent, (keys, ids) in INTENT_KEYWORDS.items():
+        if any(k.lower() in t_low for k in keys):
+            for iid in ids:
+                add(iid, 1.8, f"匹配意图「{intent}」")
+
+    if any(k.lower() in t_low for k in UNDERVAL_KEYS):
+        for iid in UNDERVAL_INVESTORS:
+            add(iid, 2.6, "判断是否低估/有安全边际")
+    if any(k.lower() in t_low for k in OVERVAL_KEYS):
+        for iid in OVERVAL_INVESTORS:
+            add(iid, 2.6, "判断是否高估/泡沫与风险")
+
+    if re.search(r"\b[A-Z]{1,5}\b", text or ""):
+        for iid in TICKER_INVESTORS:
+            add(iid, 1.2, "识别到代码/股票缩写，偏向选股视角")
+
+    for inv in investors:
+        iid = inv.get("id")
+        if not iid:
+            continue
+
+        cn = (inv.get("chinese_name") or "").strip()
+        en = (inv.get("full_name") or "").strip()
+        if cn and cn in t:
+            add(iid, 5.0, "文本中直接提到该大师姓名")
+        if en and en.lower() in t_low:
+            add(iid, 5.0, "文本中直接提到该大师英文名")
+
+        matched = []
+        for token in investor_field_tokens(inv):
+            if not token:
+                continue
+            token_low = token.lower()
+            if (len(token) >= 2 and token in t) or (len(token_low) >= 3 and token_low in t_low):
+                matched.append(token)
+        if matched:
+            add(iid, min(3.0, 0.6 * len(matched)), _keywords_reason(matched))
+
+    return build_route_output(investors, scores, reasons, top_k, matched_scenarios)
@@ -16,7 +16,13 @@ import argparse
 import json
 import os
 import sys
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+
+# 允许以脚本方式运行（python tools/rule_query.py）时导入 tools.*
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.keyword_matcher import KeywordMatcher
 
 # 规则文件路径
 RULES_FILE = os.path.join(
@@ -95,18 +101,25 @@ def filter_by_keyword(rules: List[Dict], keyword: str) -> List[Dict]:
     return results
 
 
+@lru_cache(maxsize=64)
+def _scenario_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """场景关键词编译为 Aho–Corasick 自动机（每组关键词只编译一次）"""
+    return KeywordMatcher({"scenario": {"match": keywords}})
+
+
 def filter_by_scenario(rules: List[Dict], scenario: str) -> List[Dict]:
-    """按场景过滤（使用预定义的关键词映射）"""
+    """按场景过滤（使用预定义的关键词映射，单次线性扫描每条规则）"""
     keywords = SCENARIO_KEYWORDS.get(scenario, [scenario])
+    matcher = _scenario_matcher(tuple(keywords))
     
     results = []
     for r in rules:
-        when = r.get("when", "").lower()
-        then = r.get("then", "").lower()
-        because = (r.get("because") or "").lower()
+        when = r.get("when", "")
+        then = r.get("then", "")
+        because = r.get("because") or ""
         combined = f"{when} {then} {because}"
         
-        if any(kw.lower() in combined for kw in keywords):
+        if matcher.labels(combined):
             results.append(r)
     
     return results
@@ -0,0 +1,285 @@
+"""
+Persistent backtest run catalog (SQLite) behind `/api/backtest/runs` and the static index builder.
+
+Listing used to stat up to seven files and parse metrics_A/B.json for every run directory on
+every request. The catalog keeps one row per run (modes, metrics, mtime) plus a flat
+(run_id, mode, metric, value) table so the listing can page, sort by a metric and filter in SQL.
+
+Freshness:
+- `update_run(run_id)` is called by the runner when a run finishes
+- `reconcile()` rescans the root by mtime (directory + metrics files only, no JSON parsing
+  unless something changed), throttled to once per `reconcile_interval_s`; deleted run
+  directories are dropped
+
+Sort keys: "last_modified_ts" (default), "run_id", or "<mode>.<metric>" (e.g. "A.sharpe_ratio").
+Filters: "<mode>.<metric><op><number>" with op in >=, <=, >, <, = (e.g. "B.max_drawdown>=-0.2").
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+CATALOG_VERSION = 1
+CATALOG_FILENAME = ".run_catalog.sqlite"
+MODES = ("A", "B")
+RUN_MARKER_FILES = (
+    "metrics_A.json",
+    "metrics_B.json",
+    "equity_curve_A.csv",
+    "equity_curve_B.csv",
+    "history_A.csv",
+    "history_B.csv",
+    "comparison.md",
+)
+DEFAULT_RECONCILE_INTERVAL_S = float(os.getenv("IMH_RUN_CATALOG_RECONCILE_S", "5"))
+
+_FILTER_RE = re.compile(r"^\s*([A-Za-z0-9_]+)\.([A-Za-z0-9_]+)\s*(>=|<=|>|<|=)\s*([-+0-9.eE]+)\s*$")
+_SORT_RE = re.compile(r"^([A-Za-z0-9_]+)\.([A-Za-z0-9_]+)$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    is_run INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    modes TEXT NOT NULL,
+    metrics TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, mode, name)
+);
+CREATE INDEX IF NOT EXISTS idx_run_metrics_sort ON run_metrics (mode, name, value);
+CREATE INDEX IF NOT EXISTS idx_runs_mtime ON runs (is_run, mtime);
+CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _iso(ts: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts or 0.0))
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8") or "{}")
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def parse_filter(expr: str) -> Tuple[str, str, str, float]:
+    m = _FILTER_RE.match(expr or "")
+    if not m:
+        raise ValueError(f"invalid filter {expr!r} (expected e.g. 'A.sharpe_ratio>=1')")
+    return m.group(1), m.group(2), m.group(3), float(m.group(4))
+
+
+class RunCatalog:
+    def __init__(
+        self,
+        root_dir: Union[str, Path],
+        db_path: Optional[str] = None,
+        root_label: Optional[str] = None,
+        marker_files: Sequence[str] = RUN_MARKER_FILES,
+        reconcile_interval_s: float = DEFAULT_RECONCILE_INTERVAL_S,
+    ):
+        self.root_dir = Path(root_dir)
+        self.root_label = root_label if root_label is not None else self.root_dir.name
+        self.marker_files = tuple(marker_files)
+        self.reconcile_interval_s = reconcile_interval_s
+        self._reconciled_at = float("-inf")
+        self._lock = threading.RLock()
+        if db_path is None:
+            self.root_dir.mkdir(parents=True, exist_ok=True)
+            db_path = str(self.root_dir / CATALOG_FILENAME)
+        self.db_path = db_path
+        # ":memory:" databases live as long as their connection, so keep a single one
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        with self._lock, self._conn:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM catalog_meta WHERE key='version'").fetchone()
+            if row is None or row[0] != str(CATALOG_VERSION):
+                self._conn.execute("DELETE FROM runs")
+                self._conn.execute("DELETE FROM run_metrics")
+                self._conn.execute("INSERT OR REPLACE INTO catalog_meta VALUES ('version', ?)", (str(CATALOG_VERSION),))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- indexing ----------
+
+    def _signature(self, run_dir: Path) -> str:
+        # Directory mtime moves on file create/rename/delete; metrics files can be rewritten in place.
+        return ":".join(str(_mtime_ns(p)) for p in (run_dir, run_dir / "metrics_A.json", run_dir / "metrics_B.json"))
+
+    def _scan_run(self, run_dir: Path) -> Dict[str, Any]:
+        modes: List[str] = []
+        metrics: Dict[str, Any] = {}
+        for mode in MODES:
+            m = _read_json(run_dir / f"metrics_{mode}.json")
+            if m is not None:
+                modes.append(mode)
+                metrics[mode] = m
+        is_run = bool(metrics) or any((run_dir / fn).exists() for fn in self.marker_files)
+        try:
+            mtime = float(run_dir.stat().st_mtime)
+        except OSError:
+            mtime = 0.0
+        return {"is_run": is_run, "mtime": mtime, "modes": modes, "metrics": metrics}
+
+    def _upsert(self, run_id: str, signature: str, info: Dict[str, Any]) -> None:
+        c = self._conn
+        c.execute(
+            "INSERT OR REPLACE INTO runs (run_id, signature, is_run, mtime, modes, metrics) VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, signature, int(info["is_run"]), info["mtime"], json.dumps(info["modes"]),
+             json.dumps(info["metrics"], ensure_ascii=False)),
+        )
+        c.execute("DELETE FROM run_metrics WHERE run_id = ?", (run_id,))
+        rows = [
+            (run_id, mode, str(k), float(v))
+            for mode, m in info["metrics"].items()
+            for k, v in m.items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool)
+        ]
+        c.executemany("INSERT OR REPLACE INTO run_metrics VALUES (?, ?, ?, ?)", rows)
+
+    def _delete(self, run_ids: Sequence[str]) -> None:
+        for rid in run_ids:
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (rid,))
+            self._conn.execute("DELETE FROM run_metrics WHERE run_id = ?", (rid,))
+
+    def update_run(self, run_id: str) -> None:
+        """(Re)index one run directory now, e.g. right after the runner finished it."""
+        run_dir = self.root_dir / run_id
+        with self._lock, self._conn:
+            if not run_dir.is_dir():
+                self._delete([run_id])
+                return
+            self._upsert(run_id, self._signature(run_dir), self._scan_run(run_dir))
+
+    def reconcile(self, force: bool = False) -> Dict[str, int]:
+        """Bring the catalog in line with the directory tree (throttled unless force=True)."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._reconciled_at < self.reconcile_interval_s:
+                return {"scanned": 0, "updated": 0, "removed": 0}
+            self._reconciled_at = now
+            known = dict(self._conn.execute("SELECT run_id, signature FROM runs").fetchall())
+            stats = {"scanned": 0, "updated": 0, "removed": 0}
+            seen = set()
+            try:
+                entries = list(os.scandir(self.root_dir))
+            except OSError:
+                entries = []
+            with self._conn:
+                for entry in entries:
+                    if entry.name.startswith(".") or not entry.is_dir():
+                        continue
+                    stats["scanned"] += 1
+                    seen.add(entry.name)
+                    run_dir = Path(entry.path)
+                    sig = self._signature(run_dir)
+                    if known.get(entry.name) == sig:
+                        continue
+                    self._upsert(entry.name, sig, self._scan_run(run_dir))
+                    stats["updated"] += 1
+                gone = [rid for rid in known if rid not in seen]
+                self._delete(gone)
+                stats["removed"] = len(gone)
+            return stats
+
+    # ---------- querying ----------
+
+    def list_runs(
+        self,
+        offset: int = 0,
+        limit: int = 0,
+        sort: str = "last_modified_ts",
+        order: str = "desc",
+        mode: Optional[str] = None,
+        q: Optional[str] = None,
+        filters: Sequence[str] = (),
+        reconcile: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        {"root", "total", "offset", "limit", "runs": [{run_id, root, last_modified_ts,
+        last_modified_iso, modes, metrics}]}; limit <= 0 returns every matching run.
+        Runs without the sort metric come last. Raises ValueError on a bad sort / filter.
+        """
+        if reconcile:
+            self.reconcile()
+        direction = "ASC" if str(order).lower() == "asc" else "DESC"
+        where = ["r.is_run = 1"]
+        params: List[Any] = []
+        if mode:
+            where.append("EXISTS (SELECT 1 FROM json_each(r.modes) WHERE json_each.value = ?)")
+            params.append(mode)
+        if q:
+            where.append("instr(lower(r.run_id), ?) > 0")
+            params.append(q.lower())
+        for expr in filters or ():
+            f_mode, f_name, op, value = parse_filter(expr)
+            where.append(
+                f"EXISTS (SELECT 1 FROM run_metrics f WHERE f.run_id = r.run_id AND f.mode = ? AND f.name = ? AND f.value {op} ?)"
+            )
+            params.extend([f_mode, f_name, value])
+
+        join, join_params = "", []
+        if sort in ("last_modified_ts", "mtime", "", None):
+            order_by = f"r.mtime {direction}, r.run_id"
+        elif sort == "run_id":
+            order_by = f"r.run_id {direction}"
+        else:
+            m = _SORT_RE.match(sort)
+            if not m:
+                raise ValueError(f"invalid sort {sort!r} (expected last_modified_ts, run_id or <mode>.<metric>)")
+            join = "LEFT JOIN run_metrics s ON s.run_id = r.run_id AND s.mode = ? AND s.name = ?"
+            join_params = [m.group(1), m.group(2)]
+            order_by = f"s.value IS NULL, s.value {direction}, r.mtime DESC"
+
+        where_sql = " AND ".join(where)
+        page = ""
+        page_params: List[Any] = []
+        if limit and limit > 0:
+            page = " LIMIT ? OFFSET ?"
+            page_params = [int(limit), max(0, int(offset))]
+        elif offset:
+            page = " LIMIT -1 OFFSET ?"
+            page_params = [max(0, int(offset))]
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM runs r WHERE {where_sql}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT r.run_id, r.mtime, r.modes, r.metrics FROM runs r {join} WHERE {where_sql} ORDER BY {order_by}{page}",
+                join_params + params + page_params,
+            ).fetchall()
+        runs = [
+            {
+                "run_id": run_id,
+                "root": self.root_label,
+                "last_modified_ts": mtime,
+                "last_modified_iso": _iso(mtime),
+                "modes": json.loads(modes),
+                "metrics": json.loads(metrics),
+            }
+            for run_id, mtime, modes, metrics in rows
+        ]
+        return {"root": self.root_label, "total": int(total), "offset": max(0, int(offset)), "limit": int(limit), "runs": runs}
@@ -0,0 +1,307 @@
+"""
+Binary sidecar for backtest run outputs (equity curve + rebalance history).
+
+The CSVs (equity_curve_<mode>.csv / history_<mode>.csv) stay the canonical, human /
+static-UI readable outputs. Next to them the runner writes a compact columnar copy that
+`/api/backtest/runs/{run_id}` memory-maps instead of re-parsing CSV on every request:
+
+  <run_dir>/.sidecar/<mode>/
+    equity_dates.npy     int64   days since 1970-01-01
+    equity.npy           float64
+    history_dates.npy    int64   days since 1970-01-01
+    history_equity.npy   float64 (NaN = missing)
+    history_alloc.npy    float64 (rows, len(buckets)), NaN = bucket absent in that row
+    history_text.json    other history columns, columnar {"brief": [...], ...}
+    meta.json            {"version", "buckets", "history_columns", ...} -- written last
+
+Runs that predate the sidecar are converted once from their CSVs on first read (the
+allocation column is pandas' dict repr; it is parsed with a flat key/number regex).
+A read must not look like a modification: the run directory's mtime (which the run
+catalog sorts and signs by) is restored after the conversion, and when the sidecar
+cannot be written (read-only results root) the CSVs are served from memory instead.
+"""
+
+import csv
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.downsample import downsample_indices
+
+SIDECAR_VERSION = 1
+SIDECAR_DIR = ".sidecar"
+_HISTORY_FIXED = ("date", "allocation", "equity")
+_ALLOC_PAIR_RE = re.compile(r"""["']([^"']+)["']\s*:\s*([-+]?(?:\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+|nan|inf))""")
+
+
+def sidecar_dir(run_dir: Path, mode: str) -> Path:
+    return Path(run_dir) / SIDECAR_DIR / mode
+
+
+def _days(values: Any) -> np.ndarray:
+    idx = pd.DatetimeIndex(pd.to_datetime(values))
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return np.asarray((idx.normalize() - pd.Timestamp("1970-01-01")).days, dtype=np.int64)
+
+
+def format_days(days: np.ndarray) -> List[str]:
+    return np.datetime_as_string(np.asarray(days, dtype="datetime64[D]"), unit="D").tolist()
+
+
+def _atomic_write(path: Path, write: Callable) -> None:
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _save(d: Path, name: str, arr: np.ndarray) -> None:
+    _atomic_write(d / name, lambda f: np.save(f, arr))
+
+
+def _save_json(d: Path, name: str, obj: Any) -> None:
+    _atomic_write(d / name, lambda f: f.write(json.dumps(obj, ensure_ascii=False).encode("utf-8")))
+
+
+def parse_allocation(value: Any) -> Optional[Dict[str, float]]:
+    """dict / JSON / pandas dict repr ("{'stocks': 60, ...}") -> {bucket: float}."""
+    if isinstance(value, dict):
+        return {str(k): float(v) for k, v in value.items()}
+    if not isinstance(value, str) or not value.strip():
+        return None
+    pairs = _ALLOC_PAIR_RE.findall(value)
+    return {k: float(v) for k, v in pairs} if pairs else None
+
+
+def _build_sidecar(
+    mode: str, equity_curve: pd.Series, history: Optional[pd.DataFrame]
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any], Dict[str, Any]]:
+    """(arrays by file name, history text columns, meta) for one mode."""
+    curve = pd.to_numeric(equity_curve, errors="coerce").dropna()
+    history = history if history is not None else pd.DataFrame()
+    n = len(history)
+    allocs = [parse_allocation(a) for a in history["allocation"]] if "allocation" in history else [None] * n
+    buckets: List[str] = []
+    for a in allocs:
+        for k in a or {}:
+            if k not in buckets:
+                buckets.append(k)
+    alloc = np.full((n, len(buckets)), np.nan)
+    for i, a in enumerate(allocs):
+        for k, v in (a or {}).items():
+            alloc[i, buckets.index(k)] = v
+    dates = _days(history["date"]) if "date" in history else np.zeros(n, dtype=np.int64)
+    eq = pd.to_numeric(history["equity"], errors="coerce").to_numpy(dtype=np.float64) if "equity" in history else np.full(n, np.nan)
+    text = {
+        c: [None if (isinstance(v, float) and np.isnan(v)) else (v.item() if hasattr(v, "item") else v) for v in history[c]]
+        for c in history.columns
+        if c not in _HISTORY_FIXED
+    }
+    arrays = {
+        "equity_dates.npy": _days(curve.index),
+        "equity.npy": curve.to_numpy(dtype=np.float64),
+        "history_dates.npy": dates,
+        "history_equity.npy": eq,
+        "history_alloc.npy": alloc,
+    }
+    meta = {
+        "version": SIDECAR_VERSION,
+        "mode": mode,
+        "buckets": buckets,
+        "history_columns": [str(c) for c in history.columns],
+        "has_history_dates": "date" in history,
+        "equity_points": int(len(curve)),
+        "history_rows": int(n),
+    }
+    return arrays, text, meta
+
+
+def _write_built(d: Path, arrays: Dict[str, np.ndarray], text: Dict[str, Any], meta: Dict[str, Any]) -> None:
+    d.mkdir(parents=True, exist_ok=True)
+    for name, arr in arrays.items():
+        _save(d, name, arr)
+    _save_json(d, "history_text.json", text)
+    _save_json(d, "meta.json", meta)  # last: marks the sidecar complete
+
+
+def write_run_sidecar(run_dir: Any, mode: str, equity_curve: pd.Series, history: Optional[pd.DataFrame] = None) -> Path:
+    """Write the sidecar for one mode (call after the CSVs so it is never older than them)."""
+    d = sidecar_dir(Path(run_dir), mode)
+    _write_built(d, *_build_sidecar(mode, equity_curve, history))
+    return d
+
+
+def _legacy_csvs(run_dir: Path, mode: str) -> Tuple[Path, Path]:
+    return run_dir / f"equity_curve_{mode}.csv", run_dir / f"history_{mode}.csv"
+
+
+def _read_legacy_equity(path: Path) -> pd.Series:
+    dates, values = [], []
+    if path.exists():
+        with path.open("r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) < 2 or not str(row[0]).strip():
+                    continue
+                try:
+                    v = float(row[1])
+                except ValueError:
+                    continue
+                dates.append(str(row[0]).strip())
+                values.append(v)
+    return pd.Series(values, index=pd.to_datetime(dates), dtype=float)
+
+
+def _load_meta(d: Path) -> Optional[Dict[str, Any]]:
+    try:
+        meta = json.loads((d / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) and meta.get("version") == SIDECAR_VERSION else None
+
+
+class _Sidecar:
+    """Opened sidecar: memory-mapped files, or in-memory arrays when it could not be written."""
+
+    def __init__(self, meta: Dict[str, Any], d: Path, built: Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]] = None):
+        self.meta = meta
+        self.d = d
+        self._built = built
+
+    def array(self, name: str) -> np.ndarray:
+        if self._built is not None:
+            return self._built[0][name]
+        return np.load(self.d / name, mmap_mode="r")
+
+    def text(self) -> Dict[str, Any]:
+        if self._built is not None:
+            return self._built[1]
+        return json.loads((self.d / "history_text.json").read_text(encoding="utf-8"))
+
+
+def _convert_legacy(run_dir: Path, mode: str, d: Path) -> Optional[_Sidecar]:
+    eq_csv, hist_csv = _legacy_csvs(run_dir, mode)
+    try:
+        history = pd.read_csv(hist_csv) if hist_csv.exists() else None
+    except (pd.errors.EmptyDataError, pd.errors.ParserError):
+        history = None
+    arrays, text, meta = _build_sidecar(mode, _read_legacy_equity(eq_csv), history)
+    try:
+        st = run_dir.stat()
+    except OSError:
+        st = None
+    try:
+        _write_built(d, arrays, text, meta)
+    except OSError:
+        # read-only results root etc.: serve this request from memory
+        return _Sidecar(meta, d, (arrays, text))
+    finally:
+        # creating .sidecar/ bumps the run dir mtime; a read must not reorder the run catalog
+        if st is not None:
+            try:
+                os.utime(run_dir, ns=(st.st_atime_ns, st.st_mtime_ns))
+            except OSError:
+                pass
+    loaded = _load_meta(d)
+    return _Sidecar(loaded, d) if loaded is not None else _Sidecar(meta, d, (arrays, text))
+
+
+def _open(run_dir: Any, mode: str) -> Optional[_Sidecar]:
+    run_dir = Path(run_dir)
+    d = sidecar_dir(run_dir, mode)
+    eq_csv, hist_csv = _legacy_csvs(run_dir, mode)
+    sources = [p for p in (eq_csv, hist_csv) if p.exists()]
+    meta = _load_meta(d)
+    if meta is not None:
+        built = (d / "meta.json").stat().st_mtime_ns
+        if all(p.stat().st_mtime_ns <= built for p in sources):
+            return _Sidecar(meta, d)
+    if not sources:
+        return _Sidecar(meta, d) if meta is not None else None
+    return _convert_legacy(run_dir, mode, d)
+
+
+def open_run_sidecar(run_dir: Any, mode: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the sidecar meta for run_dir/mode, (re)building it from the CSVs when it is
+    missing or older than them. None if the run has no outputs for this mode.
+    """
+    sc = _open(run_dir, mode)
+    return sc.meta if sc is not None else None
+
+
+def read_equity(
+    run_dir: Any,
+    mode: str,
+    max_points: int = 800,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    method: str = "lttb",
+) -> List[Dict[str, Any]]:
+    """
+    Equity curve [{date, equity}] within [start, end] (inclusive ISO dates, optional),
+    downsampled to at most max_points with tools/downsample.py (keeps peaks, troughs
+    and the max-drawdown points). Only the window is read from the memory map.
+    """
+    sc = _open(run_dir, mode)
+    if sc is None:
+        return []
+    dates, values = sc.array("equity_dates.npy"), sc.array("equity.npy")
+    lo = int(np.searchsorted(dates, _days([start])[0], side="left")) if start else 0
+    hi = int(np.searchsorted(dates, _days([end])[0], side="right")) if end else len(dates)
+    dates, values = dates[lo:hi], np.asarray(values[lo:hi])
+    idx = downsample_indices(dates, values, max_points, method)
+    return [{"date": s, "equity": v} for s, v in zip(format_days(dates[idx]), values[idx].tolist())]
+
+
+def read_history(run_dir: Any, mode: str, max_rows: int = 500) -> List[Dict[str, Any]]:
+    """First max_rows history rows: {date, <text columns>, allocation: {bucket: w}, equity}."""
+    sc = _open(run_dir, mode)
+    if sc is None:
+        return []
+    meta = sc.meta
+    n = int(meta.get("history_rows") or 0)
+    if max_rows > 0:
+        n = min(n, max_rows)
+    if n == 0:
+        return []
+    buckets = list(meta.get("buckets") or [])
+    columns = list(meta.get("history_columns") or [])
+    dates = format_days(sc.array("history_dates.npy")[:n]) if meta.get("has_history_dates") else [None] * n
+    equity = sc.array("history_equity.npy")[:n].tolist()
+    alloc = np.asarray(sc.array("history_alloc.npy")[:n])
+    present = ~np.isnan(alloc)
+    text: Dict[str, Any] = {}
+    if any(c not in _HISTORY_FIXED for c in columns):
+        text = sc.text()
+    text = {c: list(text.get(c) or [None] * n)[:n] for c in columns if c not in _HISTORY_FIXED}
+
+    out: List[Dict[str, Any]] = []
+    for i in range(n):
+        row: Dict[str, Any] = {}
+        for c in columns:
+            if c == "date":
+                row[c] = dates[i]
+            elif c == "allocation":
+                row[c] = {b: float(alloc[i, j]) for j, b in enumerate(buckets) if present[i, j]} if present[i].any() else None
+            elif c == "equity":
+                row[c] = None if np.isnan(equity[i]) else equity[i]
+            else:
+                row[c] = text[c][i]
+        out.append(row)
+    return out
@@ -0,0 +1,189 @@
+"""
+Incremental vectorstore sync (manifest of chunk ids + content hashes).
+
+The Chroma collection used to be either loaded as-is or rebuilt from scratch, so editing
+one investor markdown meant a full re-embed (minutes) or a stale index. Here every
+document gets a stable id:
+
+- investor chunks: `doc:<chunk_id>`  (chunk_id = "<investor_id>#<idx>", see split_investor_documents)
+- decision rules:  `rule:<rule_id>`
+
+and a sha256 over page_content + metadata. The manifest (`imh_manifest.json`, stored in
+the persist dir next to the Chroma files) records {id: hash}; a sync only embeds new or
+changed ids and deletes removed ones.
+
+Entry points:
+- startup: services/rag_service._init_vectorstore_bg (open_and_sync)
+- CLI:     python scripts/sync_vectorstore.py [--dry-run] [--full]
+- admin:   POST /api/admin/vectorstore/sync
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+MANIFEST_NAME = "imh_manifest.json"
+MANIFEST_VERSION = 1
+ADD_BATCH_SIZE = 256
+
+
+def manifest_path(persist_dir: str) -> str:
+    return os.path.join(persist_dir, MANIFEST_NAME)
+
+
+def document_id(doc: Any) -> str:
+    meta = getattr(doc, "metadata", {}) or {}
+    if meta.get("chunk_id"):
+        return f"doc:{meta['chunk_id']}"
+    if meta.get("rule_id"):
+        return f"rule:{meta['rule_id']}"
+    # no natural key: fall back to content address
+    return f"sha:{document_hash(doc)[:32]}"
+
+
+def document_hash(doc: Any) -> str:
+    payload = {
+        "content": getattr(doc, "page_content", "") or "",
+        "metadata": getattr(doc, "metadata", {}) or {},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def index_documents(documents: List[Any]) -> Dict[str, Tuple[str, Any]]:
+    """documents -> {id: (hash, doc)}; duplicate ids get a `~n` suffix (stable in input order)."""
+    out: Dict[str, Tuple[str, Any]] = {}
+    for doc in documents:
+        base = document_id(doc)
+        did, n = base, 1
+        while did in out:
+            n += 1
+            did = f"{base}~{n}"
+        out[did] = (document_hash(doc), doc)
+    return out
+
+
+def load_manifest(persist_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path(persist_dir), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def write_manifest(persist_dir: str, chunks: Dict[str, str], embedding_model: str):
+    os.makedirs(persist_dir, exist_ok=True)
+    data = {"version": MANIFEST_VERSION, "embedding_model": embedding_model, "chunks": chunks}
+    fd, tmp = tempfile.mkstemp(dir=persist_dir, prefix=".manifest-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, manifest_path(persist_dir))
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def plan_sync(
+    manifest: Optional[Dict[str, Any]],
+    indexed: Dict[str, Tuple[str, Any]],
+    embedding_model: str = "",
+    full: bool = False,
+) -> Dict[str, Any]:
+    """
+    Diff the manifest against the current corpus.
+    full rebuild when forced, when there is no manifest (store built before manifests,
+    with random ids) or when the embedding model changed.
+    """
+    old: Dict[str, str] = dict((manifest or {}).get("chunks") or {})
+    rebuild = (
+        full
+        or manifest is None
+        or bool(embedding_model and manifest.get("embedding_model") not in ("", None, embedding_model))
+    )
+    if rebuild:
+        return {"full_rebuild": True, "add": list(indexed), "update": [], "delete": [], "unchanged": 0}
+    add = [i for i in indexed if i not in old]
+    update = [i for i, (h, _doc) in indexed.items() if i in old and old[i] != h]
+    delete = [i for i in old if i not in indexed]
+    return {
+        "full_rebuild": False,
+        "add": add,
+        "update": update,
+        "delete": delete,
+        "unchanged": len(indexed) - len(add) - len(update),
+    }
+
+
+def _embedding_model_name(vectorstore: Any) -> str:
+    emb = getattr(vectorstore, "_embedding_function", None)
+    return str(getattr(emb, "model_name", "") or type(emb).__name__ if emb is not None else "")
+
+
+def sync_vectorstore(
+    vectorstore: Any,
+    documents: List[Any],
+    persist_dir: str,
+    full: bool = False,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Bring the collection in line with `documents`, embedding only new/changed chunks.
+    Returns counts: {full_rebuild, added, updated, deleted, unchanged, dry_run}.
+    """
+    indexed = index_documents(documents)
+    model = _embedding_model_name(vectorstore)
+    plan = plan_sync(load_manifest(persist_dir), indexed, embedding_model=model, full=full)
+
+    stats = {
+        "full_rebuild": plan["full_rebuild"],
+        "added": len(plan["add"]),
+        "updated": len(plan["update"]),
+        "deleted": len(plan["delete"]),
+        "unchanged": plan["unchanged"],
+        "dry_run": bool(dry_run),
+    }
+    if dry_run:
+        return stats
+
+    to_delete = list(plan["delete"])
+    if plan["full_rebuild"]:
+        # drop whatever is in the collection (legacy random ids included)
+        existing = (vectorstore.get(include=[]) or {}).get("ids") or []
+        to_delete = list(existing)
+        stats["deleted"] = len(to_delete)
+    for i in range(0, len(to_delete), ADD_BATCH_SIZE):
+        vectorstore.delete(ids=to_delete[i : i + ADD_BATCH_SIZE])
+
+    # add_documents(ids=...) upserts, so changed chunks are replaced in place
+    to_write = plan["add"] + plan["update"]
+    for i in range(0, len(to_write), ADD_BATCH_SIZE):
+        batch = to_write[i : i + ADD_BATCH_SIZE]
+        vectorstore.add_documents([indexed[d][1] for d in batch], ids=batch)
+
+    write_manifest(persist_dir, {d: h for d, (h, _doc) in indexed.items()}, model)
+    return stats
+
+
+def build_corpus() -> List[Any]:
+    """Same corpus as the startup build: split investor docs + decision rules."""
+    from tools.rag_core import load_decision_rules, load_investor_documents, split_investor_documents
+
+    return split_investor_documents(load_investor_documents()) + load_decision_rules()
+
+
+def open_and_sync(persist_dir: str, full: bool = False, dry_run: bool = False) -> Tuple[Any, Dict[str, Any]]:
+    """Open (or create) the persisted Chroma store and sync it with the corpus."""
+    from tools.rag_core import load_vectorstore
+
+    vectorstore = load_vectorstore(persist_dir)
+    stats = sync_vectorstore(vectorstore, build_corpus(), persist_dir, full=full, dry_run=dry_run)
+    return vectorstore, stats